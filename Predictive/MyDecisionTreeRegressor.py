@@ -72,7 +72,8 @@ class MyDecisionTreeRegressor:
         left = self._build_tree(X[X[:, best_feat] <= best_thresh], y[X[:, best_feat] <= best_thresh], depth + 1)
         right = self._build_tree(X[X[:, best_feat] > best_thresh], y[X[:, best_feat] > best_thresh], depth + 1)
 
-        return {'feat': best_feat, 'thresh': best_thresh, 'left': left, 'right': right}
+        # 同时记录内部节点的均值，供按决策路径解释预测（特征贡献）使用
+        return {'feat': best_feat, 'thresh': best_thresh, 'left': left, 'right': right, 'value': float(np.mean(y))}
 
     def predict(self, X):
         # 对输入矩阵中的每一行数据，沿着树结构向下寻找对应的叶子节点
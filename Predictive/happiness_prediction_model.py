@@ -16,6 +16,13 @@ import pickle
 import os
 from datetime import datetime
 import warnings
+
+try:
+    from Predictive.tree_explainer import TreeEnsembleExplainer
+    from Predictive.prediction_uncertainty import build_conformal_calibration
+except ImportError:
+    from tree_explainer import TreeEnsembleExplainer
+    from prediction_uncertainty import build_conformal_calibration
 warnings.filterwarnings('ignore')
 
 # 数据库配置
@@ -307,6 +314,14 @@ class HappinessPredictionModel:
             return dict(sorted_importance)
         return None
 
+    def build_calibration(self, model, X_cal, y_cal):
+        """基于各棵树预测值的离散程度计算共形校准信息（非树模型返回None）"""
+        explainer = TreeEnsembleExplainer.from_model(model, len(self.feature_columns))
+        if explainer is None:
+            return None
+        tree_predictions, _ = explainer.evaluate(np.asarray(X_cal))
+        return build_conformal_calibration(tree_predictions, y_cal)
+
     def save_model(self, model, model_name, metrics):
         """保存模型"""
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
@@ -401,6 +416,9 @@ class HappinessPredictionModel:
         # 8. 获取特征重要性
         rf_feature_importance = self.get_feature_importance(rf_model, "随机森林")
 
+        # 计算随机森林预测区间的共形校准信息（测试集未参与训练）
+        rf_calibration = self.build_calibration(rf_model, X_test, y_test)
+
         # 9. 比较模型性能并选择最佳模型
         models_metrics = {
             'random_forest': rf_metrics,
@@ -435,7 +453,8 @@ class HappinessPredictionModel:
                 print(".4f")
 
         # 13. 保存模型信息到文件
-        self.save_model_info(best_model_name, models_metrics, rf_feature_importance, saved_models)
+        self.save_model_info(best_model_name, models_metrics, rf_feature_importance, saved_models,
+                             {'random_forest': rf_calibration})
 
         print("\n" + "=" * 60)
         print("模型训练完成！")
@@ -445,7 +464,7 @@ class HappinessPredictionModel:
 
         return best_model_name, model_path
 
-    def save_model_info(self, best_model_name, all_metrics, feature_importance, model_paths):
+    def save_model_info(self, best_model_name, all_metrics, feature_importance, model_paths, calibrations=None):
         """保存模型信息到文件"""
         # 将路径转换为相对路径（仅保存文件名）
         relative_paths = {}
@@ -471,6 +490,9 @@ class HappinessPredictionModel:
             'feature_columns': self.feature_columns,
             'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
+        for model_name, calibration in (calibrations or {}).items():
+            if calibration and model_name in info['all_models']:
+                info['all_models'][model_name]['calibration'] = calibration
 
         info_path = os.path.join(self.model_dir, 'model_info.json')
         with open(info_path, 'w', encoding='utf-8') as f:
@@ -6,9 +6,19 @@
 import json
 import pickle
 import numpy as np
+import pandas as pd
 import os
 from datetime import datetime
 
+try:
+    from Predictive.tree_explainer import TreeEnsembleExplainer
+    from Predictive.prediction_uncertainty import ForestUncertainty
+    from Predictive.shadow_evaluator import ShadowEvaluator
+except ImportError:
+    from tree_explainer import TreeEnsembleExplainer
+    from prediction_uncertainty import ForestUncertainty
+    from shadow_evaluator import ShadowEvaluator
+
 class HappinessPredictor:
     """幸福感预测服务类"""
 
@@ -17,6 +27,7 @@ class HappinessPredictor:
         self.scaler = None
         self.feature_columns = None
         self.model_info = None
+        self.shadow = None  # 影子模型评估器（可选）
 
         # 如果未指定路径，使用相对于当前文件的路径
         if model_info_path is None:
@@ -73,6 +84,17 @@ class HappinessPredictor:
                             if self.scaler is None:
                                 self.scaler = model_data['scaler']
                                 self.feature_columns = model_data['feature_columns']
+                            # 树模型在加载时预先展开决策路径，用于按需解释预测
+                            explainer = TreeEnsembleExplainer.from_model(
+                                model_data['model'], len(model_data['feature_columns'])
+                            )
+                            self.models[model_name]['explainer'] = explainer
+                            # 树模型根据各棵树的离散程度和训练时保存的共形残差估计不确定性
+                            if explainer is not None:
+                                self.models[model_name]['uncertainty'] = ForestUncertainty(
+                                    model_info.get('calibration'),
+                                    model_info.get('metrics', {}).get('rmse')
+                                )
                     except (ModuleNotFoundError, AttributeError) as e:
                         print(f"警告: 模型 {model_name} 加载失败（版本不兼容）: {e}")
                         print(f"  跳过此模型，继续加载其他模型...")
@@ -103,105 +125,218 @@ class HappinessPredictor:
             traceback.print_exc()
             raise
 
-    def preprocess_input(self, input_data):
-        """预处理输入数据"""
-        try:
-            # 创建特征字典
-            features = {}
-
-            # 映射输入字段到模型特征
-            field_mapping = {
-                'education': 'edu',
-                'income': 'income',
-                'health': 'health',
-                'marital_status': 'marital',
-                'age': 'age',
-                'gender': 'gender',
-                'family_income': 'familyIncome',
-                'work_status': 'workStatus',
-                'floor_area': 'floorArea'
-            }
-
-            # 提取特征值
-            for input_field, model_field in field_mapping.items():
-                if input_field in input_data:
-                    value = input_data[input_field]
-                    # 转换为数值类型
-                    if value is not None:
-                        features[model_field] = float(value)
-                    else:
-                        features[model_field] = 0.0  # 缺失值用0填充
-                else:
-                    features[model_field] = 0.0  # 缺失字段用0填充
+    def enable_shadow(self, shadow_model_info_path, sample_rate=0.1, algorithm='auto', flush_interval=60):
+        """
+        启用影子模型：按 sample_rate 抽取线上预测请求，在后台线程中用影子模型重新预测并对比
+
+        Args:
+            shadow_model_info_path: 影子模型的 model_info.json 路径
+            sample_rate: 抽样比例 (0-1)
+            algorithm: 影子模型使用的算法
+            flush_interval: 对比统计写入数据库的间隔（秒）
+        """
+        shadow_predictor = HappinessPredictor(shadow_model_info_path)
+        self.shadow = ShadowEvaluator(
+            shadow_predictor,
+            sample_rate=sample_rate,
+            algorithm=algorithm,
+            flush_interval=flush_interval
+        )
+        print(f"影子模型已启用: {self.shadow.shadow_model} ({self.shadow.shadow_version})，抽样比例 {sample_rate}")
+        return self.shadow
+
+    def extract_features(self, input_data):
+        """将单条输入数据映射为模型特征字典"""
+        # 创建特征字典
+        features = {}
+
+        # 映射输入字段到模型特征
+        field_mapping = {
+            'education': 'edu',
+            'income': 'income',
+            'health': 'health',
+            'marital_status': 'marital',
+            'age': 'age',
+            'gender': 'gender',
+            'family_income': 'familyIncome',
+            'work_status': 'workStatus',
+            'floor_area': 'floorArea'
+        }
 
-            # 确保所有特征都存在
-            for col in self.feature_columns:
-                if col not in features:
-                    features[col] = 0.0
+        # 提取特征值
+        for input_field, model_field in field_mapping.items():
+            if input_field in input_data:
+                value = input_data[input_field]
+                # 转换为数值类型
+                if value is not None:
+                    features[model_field] = float(value)
+                else:
+                    features[model_field] = 0.0  # 缺失值用0填充
+            else:
+                features[model_field] = 0.0  # 缺失字段用0填充
 
-            # 转换为DataFrame并标准化（确保列顺序与训练时一致）
-            import pandas as pd
+        # 确保所有特征都存在
+        for col in self.feature_columns:
+            if col not in features:
+                features[col] = 0.0
 
-            # 创建DataFrame时直接指定列名和顺序
-            features_df = pd.DataFrame([features], columns=self.feature_columns)
+        return features
 
-            # 使用训练时的scaler进行标准化
-            features_scaled = self.scaler.transform(features_df)
+    def scale_features(self, feature_rows):
+        """将多条特征字典一次性转换为标准化后的特征矩阵"""
+        # 创建DataFrame时直接指定列名和顺序（确保列顺序与训练时一致）
+        features_df = pd.DataFrame(feature_rows, columns=self.feature_columns)
 
-            return features_scaled
+        # 使用训练时的scaler进行标准化
+        return self.scaler.transform(features_df)
 
+    def preprocess_input(self, input_data):
+        """预处理输入数据"""
+        try:
+            return self.scale_features([self.extract_features(input_data)])
         except Exception as e:
             raise ValueError(f"输入数据预处理失败: {e}")
 
-    def predict(self, input_data, algorithm='auto'):
-        """进行幸福感预测"""
+    def resolve_model_name(self, algorithm):
+        """根据算法参数选择模型"""
+        if algorithm == 'auto':
+            return self.model_info['best_model']
+        elif algorithm in self.models:
+            return algorithm
+        raise ValueError(f"不支持的算法: {algorithm}")
+
+    def explain_linear(self, model, features_scaled):
+        """
+        线性模型的特征贡献：标准化特征的均值为0，贡献即 系数 * 特征值
+
+        Returns:
+            tuple: (predictions, base_value, contributions)，模型不是线性模型时返回 None
+        """
+        if getattr(model, 'coef_', None) is None:
+            return None
+        contributions = np.asarray(features_scaled, dtype=np.float64) * np.ravel(model.coef_)
+        base_value = float(np.ravel(model.intercept_)[0])
+        return base_value + contributions.sum(axis=1), base_value, contributions
+
+    def predict_matrix(self, model_name, features_scaled, explain=False):
+        """
+        对标准化后的特征矩阵进行预测
+
+        Returns:
+            tuple: (原始预测值数组, 实际使用的模型名,
+                    解释信息 (base_value, contributions) 或 None,
+                    不确定性估计 或 None)
+        """
+        model_info = self.models[model_name]
+        model = model_info['model']
+
+        explainer = model_info.get('explainer')
+        if explainer is not None:
+            # 树模型：一次遍历同时得到每棵树的预测值（用于不确定性）和可选的特征贡献
+            tree_predictions, contributions = explainer.evaluate(features_scaled, explain)
+            uncertainty = model_info['uncertainty'].estimate(tree_predictions)
+            explained = (explainer.base_value, contributions) if explain else None
+            return uncertainty['mean'], model_name, explained, uncertainty
+
+        if explain:
+            explained = self.explain_linear(model, features_scaled)
+            if explained is not None:
+                predictions, base_value, contributions = explained
+                return predictions, model_name, (base_value, contributions), None
+
         try:
-            # 选择算法
-            if algorithm == 'auto':
-                model_name = self.model_info['best_model']
-            elif algorithm in self.models:
-                model_name = algorithm
+            predictions = model.predict(features_scaled)
+        except AttributeError as e:
+            if 'monotonic_cst' in str(e):
+                # 如果遇到monotonic_cst错误，使用线性回归作为备选
+                print(f"模型 {model_name} 出现兼容性问题，使用线性回归作为备选")
+                if 'linear_regression' in self.models:
+                    alt_model = self.models['linear_regression']['model']
+                    predictions = alt_model.predict(features_scaled)
+                    model_name = 'linear_regression_fallback'
+                else:
+                    raise ValueError(f"模型 {model_name} 出现兼容性问题，且无备选模型")
             else:
-                raise ValueError(f"不支持的算法: {algorithm}")
+                raise
+
+        return np.asarray(predictions), model_name, None, None
 
-            model_info = self.models[model_name]
-            model = model_info['model']
+    def format_explanation(self, base_value, raw_prediction, contributions, approximate=False):
+        """整理单个样本的特征贡献（按绝对值从大到小排序）"""
+        items = sorted(zip(self.feature_columns, contributions), key=lambda x: abs(x[1]), reverse=True)
+        return {
+            'base_value': round(float(base_value), 4),
+            'raw_prediction': round(float(raw_prediction), 4),
+            # 旧版本手写决策树模型没有保存内部节点均值，base_value 和贡献为近似值
+            'approximate': approximate,
+            'contributions': [
+                {'feature': feature, 'contribution': round(float(value), 4)}
+                for feature, value in items
+            ]
+        }
+
+    def build_result(self, raw_prediction, selected_model, used_model, algorithm,
+                     explanation=None, uncertainty=None):
+        """组装单个样本的预测结果"""
+        # 使用模型的R²分数作为置信度（R² > 0 表示模型比简单平均值预测更好）
+        confidence = float(self.models[selected_model]['metrics'].get('r2_score', 0))
+
+        # 确保预测值在合理范围内
+        prediction = int(max(1, min(5, round(raw_prediction))))
+
+        result = {
+            'prediction': prediction,
+            'confidence': round(confidence, 4),
+            'model_name': used_model,
+            'algorithm': algorithm,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'features_used': self.feature_columns.copy()
+        }
+        if uncertainty is not None:
+            # 树模型：预测等级在校准后的等级分布中的概率（与模型整体的 confidence 含义不同）
+            result['prediction_probability'] = uncertainty['distribution'][str(prediction)]
+            result['uncertainty'] = uncertainty
+        if explanation is not None:
+            result['explanation'] = explanation
+
+        return result
+
+    def format_row(self, model_name, row, predictions, explained, uncertainty):
+        """将批量计算结果中的第 row 个样本整理为 (explanation, uncertainty)"""
+        explanation = None
+        if explained is not None:
+            base_value, contributions = explained
+            explainer = self.models[model_name].get('explainer')
+            approximate = explainer is not None and explainer.approximate
+            explanation = self.format_explanation(base_value, predictions[row], contributions[row], approximate)
+
+        row_uncertainty = None
+        if uncertainty is not None:
+            row_uncertainty = self.models[model_name]['uncertainty'].format_row(uncertainty, row)
+
+        return explanation, row_uncertainty
+
+    def predict(self, input_data, algorithm='auto', explain=False):
+        """进行幸福感预测"""
+        try:
+            # 选择算法
+            model_name = self.resolve_model_name(algorithm)
 
             # 预处理输入数据
             features_scaled = self.preprocess_input(input_data)
 
             # 进行预测
-            try:
-                prediction = model.predict(features_scaled)[0]
-            except AttributeError as e:
-                if 'monotonic_cst' in str(e):
-                    # 如果遇到monotonic_cst错误，使用线性回归作为备选
-                    print(f"模型 {model_name} 出现兼容性问题，使用线性回归作为备选")
-                    if 'linear_regression' in self.models:
-                        alt_model = self.models['linear_regression']['model']
-                        prediction = alt_model.predict(features_scaled)[0]
-                        model_name = 'linear_regression_fallback'
-                    else:
-                        raise ValueError(f"模型 {model_name} 出现兼容性问题，且无备选模型")
-                else:
-                    raise
-
-            # 计算预测置信度
-            # 对于回归问题，使用模型的R²分数作为模型整体的置信度指标
-            # R² > 0 表示模型比简单平均值预测更好
-            confidence = float(model_info['metrics'].get('r2_score', 0))
+            predictions, used_model, explained, uncertainty = self.predict_matrix(
+                model_name, features_scaled, explain
+            )
+            explanation, row_uncertainty = self.format_row(model_name, 0, predictions, explained, uncertainty)
 
-            # 确保预测值在合理范围内
-            prediction = max(1, min(5, round(prediction)))
+            result = self.build_result(predictions[0], model_name, used_model, algorithm,
+                                       explanation, row_uncertainty)
 
-            result = {
-                'prediction': int(prediction),
-                'confidence': round(confidence, 4),
-                'model_name': model_name,
-                'algorithm': algorithm,
-                'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'features_used': self.feature_columns.copy()
-            }
+            # 抽样交给影子模型在后台评估，不阻塞当前请求
+            if self.shadow is not None:
+                self.shadow.submit(input_data, result)
 
             return result
 
@@ -223,18 +358,67 @@ class HappinessPredictor:
             'timestamp': self.model_info['timestamp']
         }
 
-    def batch_predict(self, input_data_list, algorithm='auto'):
-        """批量预测"""
+    def predict_rows(self, model_name, feature_rows, algorithm, explain=False):
+        """对多条特征字典一次性预测，返回对应的预测结果列表"""
+        features_scaled = self.scale_features(feature_rows)
+        predictions, used_model, explained, uncertainty = self.predict_matrix(
+            model_name, features_scaled, explain
+        )
         results = []
-        for input_data in input_data_list:
+        for row in range(len(feature_rows)):
+            explanation, row_uncertainty = self.format_row(
+                model_name, row, predictions, explained, uncertainty
+            )
+            results.append(self.build_result(predictions[row], model_name, used_model, algorithm,
+                                             explanation, row_uncertainty))
+        return results
+
+    def batch_predict(self, input_data_list, algorithm='auto', explain=False):
+        """
+        批量预测（所有有效样本合并为一个矩阵，只调用一次模型）
+        整批预测失败时（例如个别样本含 NaN/inf）逐条重新预测，只有出错的样本返回错误
+        """
+        results = [None] * len(input_data_list)
+
+        # 逐条提取特征，记录无法解析的样本
+        feature_rows = []
+        positions = []
+        for i, input_data in enumerate(input_data_list):
             try:
-                result = self.predict(input_data, algorithm)
-                results.append(result)
+                feature_rows.append(self.extract_features(input_data))
+                positions.append(i)
             except Exception as e:
-                results.append({
-                    'error': str(e),
+                results[i] = {
+                    'error': f"预测失败: 输入数据预处理失败: {e}",
                     'input_data': input_data
-                })
+                }
+
+        if not feature_rows:
+            return results
+
+        try:
+            model_name = self.resolve_model_name(algorithm)
+        except Exception as e:
+            for i in positions:
+                results[i] = {'error': f"预测失败: {e}", 'input_data': input_data_list[i]}
+            return results
+
+        try:
+            for i, result in zip(positions, self.predict_rows(model_name, feature_rows, algorithm, explain)):
+                results[i] = result
+        except Exception as e:
+            print(f"批量预测失败，逐条重新预测: {e}")
+            for features, i in zip(feature_rows, positions):
+                try:
+                    results[i] = self.predict_rows(model_name, [features], algorithm, explain)[0]
+                except Exception as row_error:
+                    results[i] = {'error': f"预测失败: {row_error}", 'input_data': input_data_list[i]}
+
+        # 批量预测与单条预测一样按采样率交给影子模型评估
+        if self.shadow is not None:
+            for input_data, result in zip(input_data_list, results):
+                if 'error' not in result:
+                    self.shadow.submit(input_data, result)
 
         return results
 
@@ -0,0 +1,110 @@
+"""
+森林预测不确定性估计
+基于各棵树预测值的离散程度，结合训练时保存的归一化共形残差（normalized conformal），
+为每次预测给出预测区间以及 1-5 各幸福感等级的概率分布。
+"""
+
+from statistics import NormalDist
+
+import numpy as np
+
+# 幸福感等级
+HAPPINESS_LEVELS = np.arange(1, 6)
+
+# 残差分位点所在的概率水平（等间隔中点，可视为等权重的残差样本）
+QUANTILE_LEVELS = (np.arange(101) + 0.5) / 101
+
+
+def build_conformal_calibration(tree_predictions, y_true):
+    """
+    训练阶段：在未参与训练的样本上计算归一化残差分位数
+
+    Args:
+        tree_predictions: (n_trees, n_samples) 每棵树在校准集上的预测值
+        y_true: 校准集真实标签
+
+    Returns:
+        dict: 可直接写入 model_info.json 的校准信息
+    """
+    tree_predictions = np.asarray(tree_predictions, dtype=np.float64)
+    y_true = np.asarray(y_true, dtype=np.float64)
+
+    mean = tree_predictions.mean(axis=0)
+    std = tree_predictions.std(axis=0)
+    # 平滑项：避免各树完全一致时离散度为0导致区间退化
+    beta = max(float(np.median(std)), 1e-6)
+
+    scores = (y_true - mean) / (std + beta)
+    return {
+        'method': 'normalized_conformal',
+        'beta': round(beta, 6),
+        'n_samples': int(len(y_true)),
+        'residual_quantiles': [round(float(q), 6) for q in np.quantile(scores, QUANTILE_LEVELS)]
+    }
+
+
+class ForestUncertainty:
+    """
+    单个森林模型的不确定性估计器：
+    有校准信息时使用共形残差分位数；否则退化为正态假设，并以模型整体 RMSE 作为平滑项。
+    """
+
+    def __init__(self, calibration=None, fallback_rmse=None, interval_level=0.9):
+        self.interval_level = interval_level
+        if calibration and calibration.get('residual_quantiles'):
+            self.calibrated = True
+            self.beta = float(calibration['beta'])
+            self.quantiles = np.asarray(calibration['residual_quantiles'], dtype=np.float64)
+        else:
+            self.calibrated = False
+            self.beta = float(fallback_rmse or 1.0)
+            normal = NormalDist()
+            self.quantiles = np.array([normal.inv_cdf(p) for p in QUANTILE_LEVELS])
+
+        # 预先计算区间两端对应的残差分位数
+        tail = (1 - interval_level) / 2
+        self.lower_q, self.upper_q = np.interp([tail, 1 - tail], QUANTILE_LEVELS, self.quantiles)
+
+    def estimate(self, tree_predictions):
+        """
+        根据每棵树的预测值批量计算不确定性
+
+        Args:
+            tree_predictions: (n_trees, n_samples)
+
+        Returns:
+            dict: mean / std / lower / upper 为 (n_samples,) 数组（区间裁剪到 1-5 的评分范围内），
+                  distribution 为 (n_samples, 5) 的等级概率矩阵
+        """
+        mean = tree_predictions.mean(axis=0)
+        std = tree_predictions.std(axis=0)
+        scale = std + self.beta
+
+        # 每个样本的 101 个等权重候选值 -> 取整到等级后统计频率
+        candidates = mean[:, None] + self.quantiles[None, :] * scale[:, None]
+        levels = np.clip(np.rint(candidates), HAPPINESS_LEVELS[0], HAPPINESS_LEVELS[-1])
+        distribution = (levels[:, :, None] == HAPPINESS_LEVELS).mean(axis=1)
+
+        return {
+            'mean': mean,
+            'std': std,
+            'lower': np.clip(mean + self.lower_q * scale, HAPPINESS_LEVELS[0], HAPPINESS_LEVELS[-1]),
+            'upper': np.clip(mean + self.upper_q * scale, HAPPINESS_LEVELS[0], HAPPINESS_LEVELS[-1]),
+            'distribution': distribution
+        }
+
+    def format_row(self, estimate, row):
+        """整理单个样本的不确定性信息"""
+        return {
+            'std': round(float(estimate['std'][row]), 4),
+            'interval': {
+                'level': self.interval_level,
+                'lower': round(float(estimate['lower'][row]), 4),
+                'upper': round(float(estimate['upper'][row]), 4)
+            },
+            'distribution': {
+                str(level): round(float(p), 4)
+                for level, p in zip(HAPPINESS_LEVELS, estimate['distribution'][row])
+            },
+            'calibrated': self.calibrated
+        }
@@ -0,0 +1,232 @@
+"""
+影子模型评估
+在后台线程中用新训练的模型（影子模型）对一部分线上预测请求重新打分，
+统计与主模型的一致率和预测漂移，并定期写入 py_prediction_shadow_metrics 表。
+请求线程只做一次随机抽样和一次非阻塞入队，不等待影子模型计算。
+"""
+
+import atexit
+import json
+import math
+import queue
+import random
+import threading
+import time
+from datetime import datetime
+
+LEVELS = [1, 2, 3, 4, 5]
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS py_prediction_shadow_metrics (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        primaryModel VARCHAR(100) NOT NULL,
+        shadowModel VARCHAR(100) NOT NULL,
+        shadowVersion VARCHAR(50) DEFAULT NULL,
+        sampleCount INT NOT NULL,
+        agreementRate DECIMAL(6,4) DEFAULT NULL,
+        withinOneRate DECIMAL(6,4) DEFAULT NULL,
+        meanDiff DECIMAL(8,4) DEFAULT NULL,
+        meanAbsDiff DECIMAL(8,4) DEFAULT NULL,
+        psi DECIMAL(10,6) DEFAULT NULL,
+        primaryDistribution VARCHAR(255) DEFAULT NULL,
+        shadowDistribution VARCHAR(255) DEFAULT NULL,
+        errorCount INT NOT NULL DEFAULT 0,
+        droppedCount INT NOT NULL DEFAULT 0,
+        windowStart DATETIME NOT NULL,
+        windowEnd DATETIME NOT NULL,
+        createTime DATETIME NOT NULL,
+        INDEX idx_shadow_window (shadowModel, windowEnd)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+def population_stability_index(expected, actual, eps=1e-4):
+    """计算两组等级计数之间的 PSI（预测分布漂移指标）"""
+    expected_total = sum(expected) or 1
+    actual_total = sum(actual) or 1
+    psi = 0.0
+    for e, a in zip(expected, actual):
+        pe = max(e / expected_total, eps)
+        pa = max(a / actual_total, eps)
+        psi += (pa - pe) * math.log(pa / pe)
+    return psi
+
+
+class _WindowStats:
+    """一个统计窗口内的累计量"""
+
+    def __init__(self):
+        self.start = datetime.now()
+        self.count = 0
+        self.agree = 0
+        self.within_one = 0
+        self.sum_diff = 0.0
+        self.sum_abs_diff = 0.0
+        self.errors = 0
+        self.dropped = 0  # 本窗口内因队列满或停止时未处理而丢弃的样本数
+        self.primary_counts = [0] * len(LEVELS)
+        self.shadow_counts = [0] * len(LEVELS)
+
+    def add(self, primary, shadow):
+        diff = shadow - primary
+        self.count += 1
+        self.agree += int(diff == 0)
+        self.within_one += int(abs(diff) <= 1)
+        self.sum_diff += diff
+        self.sum_abs_diff += abs(diff)
+        self.primary_counts[primary - 1] += 1
+        self.shadow_counts[shadow - 1] += 1
+
+    def summary(self):
+        n = self.count or 1
+        return {
+            'sample_count': self.count,
+            'agreement_rate': round(self.agree / n, 4) if self.count else None,
+            'within_one_rate': round(self.within_one / n, 4) if self.count else None,
+            'mean_diff': round(self.sum_diff / n, 4) if self.count else None,
+            'mean_abs_diff': round(self.sum_abs_diff / n, 4) if self.count else None,
+            'psi': round(population_stability_index(self.primary_counts, self.shadow_counts), 6)
+            if self.count else None,
+            'primary_distribution': dict(zip(map(str, LEVELS), self.primary_counts)),
+            'shadow_distribution': dict(zip(map(str, LEVELS), self.shadow_counts)),
+            'error_count': self.errors,
+            'dropped_count': self.dropped,
+            'window_start': self.start.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+
+class ShadowEvaluator:
+    """影子模型评估器"""
+
+    def __init__(self, shadow_predictor, sample_rate=0.1, algorithm='auto',
+                 queue_size=1000, flush_interval=60):
+        self.shadow_predictor = shadow_predictor
+        self.sample_rate = sample_rate
+        self.algorithm = algorithm
+        self.flush_interval = flush_interval
+        self.shadow_model = shadow_predictor.model_info['best_model'] if algorithm == 'auto' else algorithm
+        self.shadow_version = shadow_predictor.model_info.get('timestamp')
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._window = _WindowStats()
+        self._totals = _WindowStats()
+        self._primary_model = None
+        self._dropped = 0
+        self._table_ready = False
+        self._stopped = threading.Event()
+
+        self._thread = threading.Thread(target=self._run, name='shadow-evaluator', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, input_data, primary_result):
+        """请求线程调用：按采样率抽样后非阻塞入队，队列满时直接丢弃"""
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return
+        try:
+            self._queue.put_nowait((dict(input_data), primary_result['prediction'], primary_result['model_name']))
+        except queue.Full:
+            self._record_dropped(1)
+
+    def _record_dropped(self, count):
+        with self._lock:
+            self._dropped += count
+            self._window.dropped += count
+
+    def get_stats(self):
+        """获取当前窗口与累计的对比统计"""
+        with self._lock:
+            return {
+                'shadow_model': self.shadow_model,
+                'shadow_version': self.shadow_version,
+                'sample_rate': self.sample_rate,
+                'queue_size': self._queue.qsize(),
+                'dropped': self._dropped,
+                'current_window': self._window.summary(),
+                'total': self._totals.summary()
+            }
+
+    def stop(self):
+        """停止后台线程并写入最后一个窗口（队列中尚未处理的样本计为丢弃）"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=5)
+        remaining = 0
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+            remaining += 1
+        if remaining:
+            self._record_dropped(remaining)
+        self._flush()
+
+    def _run(self):
+        """后台线程：消费队列、调用影子模型并定期落库"""
+        next_flush = time.monotonic() + self.flush_interval
+        while not self._stopped.is_set():
+            try:
+                input_data, primary_prediction, primary_model = self._queue.get(timeout=1)
+                self._evaluate(input_data, primary_prediction, primary_model)
+            except queue.Empty:
+                pass
+
+            if time.monotonic() >= next_flush:
+                self._flush()
+                next_flush = time.monotonic() + self.flush_interval
+
+    def _evaluate(self, input_data, primary_prediction, primary_model):
+        try:
+            shadow_result = self.shadow_predictor.predict(input_data, self.algorithm)
+        except Exception as e:
+            print(f"影子模型预测失败: {e}")
+            with self._lock:
+                self._window.errors += 1
+                self._totals.errors += 1
+            return
+
+        with self._lock:
+            self._primary_model = primary_model
+            self._window.add(primary_prediction, shadow_result['prediction'])
+            self._totals.add(primary_prediction, shadow_result['prediction'])
+
+    def _flush(self):
+        """将当前窗口的统计写入指标表，并开启新窗口"""
+        with self._lock:
+            window = self._window
+            if window.count == 0 and window.errors == 0 and window.dropped == 0:
+                return
+            self._window = _WindowStats()
+            primary_model = self._primary_model
+
+        summary = window.summary()
+        try:
+            from utils.db_utils import get_db_connection
+
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    if not self._table_ready:
+                        cursor.execute(CREATE_TABLE_SQL)
+                        self._table_ready = True
+                    sql = """
+                        INSERT INTO py_prediction_shadow_metrics
+                        (primaryModel, shadowModel, shadowVersion, sampleCount, agreementRate, withinOneRate,
+                         meanDiff, meanAbsDiff, psi, primaryDistribution, shadowDistribution,
+                         errorCount, droppedCount, windowStart, windowEnd, createTime)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW(), NOW())
+                    """
+                    params = [
+                        primary_model or '', self.shadow_model, self.shadow_version,
+                        summary['sample_count'], summary['agreement_rate'], summary['within_one_rate'],
+                        summary['mean_diff'], summary['mean_abs_diff'], summary['psi'],
+                        json.dumps(summary['primary_distribution']),
+                        json.dumps(summary['shadow_distribution']),
+                        summary['error_count'], summary['dropped_count'], window.start
+                    ]
+                    cursor.execute(sql, params)
+                    conn.commit()
+        except Exception as e:
+            print(f"写入影子模型评估指标失败: {e}")
@@ -18,6 +18,8 @@ from sklearn.preprocessing import StandardScaler
 
 from Predictive.MyDecisionTreeRegressor import SuperiorRandomForest
 from Predictive.SuperiorLinearRegression import SuperiorLinearRegression
+from Predictive.tree_explainer import TreeEnsembleExplainer
+from Predictive.prediction_uncertainty import build_conformal_calibration
 
 warnings.filterwarnings('ignore')
 
@@ -243,6 +245,13 @@ class SimpleImprovedModel:
             print(f"  测试集 R²: {test_r2:.4f} | RMSE: {test_rmse:.4f} | MAE: {test_mae:.4f}")
             print(f"  交叉验证 RMSE: {cv_rmse:.4f}")
             
+            # 树模型：在测试集（未参与训练）上计算共形残差，供预测服务给出预测区间
+            explainer = TreeEnsembleExplainer.from_model(model, len(self.feature_columns))
+            if explainer is not None:
+                tree_predictions, _ = explainer.evaluate(np.asarray(X_test))
+                results[name]['calibration'] = build_conformal_calibration(tree_predictions, y_test)
+                print(f"  ✓ 已计算预测区间校准信息 ({len(y_test)} 个样本)")
+
             # 判断
             if train_r2 - test_r2 > 0.1:
                 print(f"  ⚠️  可能过拟合 (差距 {train_r2-test_r2:.4f})")
@@ -318,6 +327,8 @@ class SimpleImprovedModel:
                 },
                 'path': model_filename
             }
+            if 'calibration' in metrics:
+                model_info['all_models'][name]['calibration'] = metrics['calibration']
             
             print(f"✓ 保存 {name}: {model_filename}")
         
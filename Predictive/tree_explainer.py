@@ -0,0 +1,166 @@
+"""
+树模型预测解释器
+基于决策路径计算每个特征对单次预测的贡献（Saabas 方法）：
+沿样本经过的路径，把每次分裂前后节点均值的变化量记到分裂特征上，
+使得 预测值 = 根节点均值(base_value) + 各特征贡献之和。
+
+注意：旧版本的手写决策树（MyDecisionTreeRegressor 在记录内部节点均值之前训练的模型）
+没有保存内部节点的样本均值，也没有保存各节点的样本数，加载时只能用左右子节点均值的
+简单平均近似（不按样本数加权）。这类模型的 base_value 和各特征贡献是近似值，
+贡献之和仍然等于预测值，但各特征之间的分配会有偏差，解释结果中会标记 approximate；
+用当前代码重新训练模型即可得到精确值。
+"""
+
+import numpy as np
+
+
+class _FlatTree:
+    """
+    扁平化的单棵回归树：
+    将树结构展开为若干个按节点编号索引的数组，并在加载时预先计算好每条边的贡献增量，
+    预测时对整批样本按层向量化推进，避免逐样本递归。
+    """
+
+    def __init__(self, feature, threshold, left, right, value, cast_float32=False):
+        self.feature = np.asarray(feature, dtype=np.intp)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left = np.asarray(left, dtype=np.intp)
+        self.right = np.asarray(right, dtype=np.intp)
+        self.value = np.asarray(value, dtype=np.float64)
+        self.is_leaf = self.left < 0
+        # 内部节点均值是否为近似值（旧版本手写决策树）
+        self.approximate = False
+        # sklearn 的树在比较前会把输入转为 float32，这里保持一致以得到相同的叶子
+        self.cast_float32 = cast_float32
+
+        # 预计算：走向左/右子节点时节点均值的变化量（叶子节点不会被使用，置0）
+        internal = ~self.is_leaf
+        self.delta_left = np.zeros_like(self.value)
+        self.delta_right = np.zeros_like(self.value)
+        self.delta_left[internal] = self.value[self.left[internal]] - self.value[internal]
+        self.delta_right[internal] = self.value[self.right[internal]] - self.value[internal]
+
+    @classmethod
+    def from_dict_tree(cls, root):
+        """从手写决策树（MyDecisionTreeRegressor.tree 嵌套字典）构建"""
+        feature, threshold, left, right, value = [], [], [], [], []
+        approximate = [False]
+
+        def visit(node):
+            idx = len(feature)
+            feature.append(-1)
+            threshold.append(0.0)
+            left.append(-1)
+            right.append(-1)
+            value.append(0.0)
+
+            if not isinstance(node, dict):
+                value[idx] = float(node)
+                return idx
+
+            left_idx = visit(node['left'])
+            right_idx = visit(node['right'])
+            feature[idx] = int(node['feat'])
+            threshold[idx] = float(node['thresh'])
+            left[idx] = left_idx
+            right[idx] = right_idx
+            if 'value' in node:
+                value[idx] = float(node['value'])
+            else:
+                # 旧版本模型未保存内部节点均值和样本数，只能用左右子节点均值的简单平均近似
+                value[idx] = (value[left_idx] + value[right_idx]) / 2
+                approximate[0] = True
+            return idx
+
+        visit(root)
+        tree = cls(feature, threshold, left, right, value)
+        tree.approximate = approximate[0]
+        return tree
+
+    @classmethod
+    def from_sklearn_tree(cls, tree_):
+        """从 sklearn 的 Tree 对象（estimator.tree_）构建"""
+        return cls(
+            tree_.feature, tree_.threshold,
+            tree_.children_left, tree_.children_right,
+            tree_.value[:, 0, 0],
+            cast_float32=True
+        )
+
+    def walk(self, X, contributions=None, weight=1.0):
+        """
+        批量遍历：返回每个样本落入叶子的值。
+        若传入 contributions 矩阵，则把路径上的贡献增量（乘以 weight）累加进去。
+        """
+        Xt = X.astype(np.float32).astype(np.float64) if self.cast_float32 else X
+        node = np.zeros(X.shape[0], dtype=np.intp)
+        active = np.arange(X.shape[0])
+
+        # 每轮推进一层，循环次数等于树深度
+        while active.size:
+            cur = node[active]
+            internal = ~self.is_leaf[cur]
+            active = active[internal]
+            cur = cur[internal]
+            if not active.size:
+                break
+
+            feat = self.feature[cur]
+            go_left = Xt[active, feat] <= self.threshold[cur]
+            if contributions is not None:
+                delta = np.where(go_left, self.delta_left[cur], self.delta_right[cur])
+                contributions[active, feat] += delta * weight
+            node[active] = np.where(go_left, self.left[cur], self.right[cur])
+
+        return self.value[node]
+
+
+class TreeEnsembleExplainer:
+    """
+    树集成模型解释器：
+    支持手写的 SuperiorRandomForest 以及 sklearn 的 ExtraTrees / RandomForest / 单棵回归树。
+    """
+
+    def __init__(self, trees, n_features):
+        self.trees = trees
+        self.n_features = n_features
+        # 森林的基准值：所有树根节点均值的平均
+        self.base_value = float(np.mean([tree.value[0] for tree in trees]))
+        # 任意一棵树的内部节点均值是近似值时，base_value 和特征贡献都是近似值
+        self.approximate = any(tree.approximate for tree in trees)
+
+    @staticmethod
+    def from_model(model, n_features):
+        """根据模型类型构建解释器，不支持的模型返回 None"""
+        trees = None
+        if hasattr(model, 'trees') and model.trees and all(hasattr(t, 'tree') for t in model.trees):
+            trees = [_FlatTree.from_dict_tree(t.tree) for t in model.trees]
+        elif hasattr(model, 'estimators_') and all(hasattr(e, 'tree_') for e in model.estimators_):
+            trees = [_FlatTree.from_sklearn_tree(e.tree_) for e in model.estimators_]
+        elif hasattr(model, 'tree_'):
+            trees = [_FlatTree.from_sklearn_tree(model.tree_)]
+
+        if not trees:
+            return None
+        return TreeEnsembleExplainer(trees, n_features)
+
+    def evaluate(self, X, explain=False):
+        """
+        对批量样本遍历所有树（单次遍历）
+
+        Args:
+            X: 标准化后的特征矩阵 (n_samples, n_features)
+            explain: 是否同时累计特征贡献
+
+        Returns:
+            tuple: (tree_predictions, contributions)
+                tree_predictions: (n_trees, n_samples) 每棵树的预测值
+                contributions: (n_samples, n_features) 各特征贡献，explain=False 时为 None
+        """
+        X = np.asarray(X, dtype=np.float64)
+        weight = 1.0 / len(self.trees)
+        contributions = np.zeros((X.shape[0], self.n_features)) if explain else None
+        tree_predictions = np.empty((len(self.trees), X.shape[0]))
+        for i, tree in enumerate(self.trees):
+            tree_predictions[i] = tree.walk(X, contributions, weight)
+        return tree_predictions, contributions
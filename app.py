@@ -9,6 +9,10 @@ app = Flask(__name__)
 # 配置应用
 app.config.from_object('config.config')
 
+# 会话数据保存在服务端，Cookie 中只有签名的会话ID
+from utils.session_store import init_session
+init_session(app)
+
 # 确保上传目录存在
 if not os.path.exists(UPLOAD_FOLDER):
     os.makedirs(UPLOAD_FOLDER)
@@ -37,6 +41,14 @@ app.register_blueprint(prediction_bp, url_prefix='/api/prediction')
 # 初始化预测器
 init_predictor()
 
+# 构建公告关键词检索的倒排索引
+from service.announcement_service import AnnouncementService
+AnnouncementService.warm_search_index()
+
+# 构建调查统计的位图索引
+from service.happiness_survey_service import HappinessSurveyService
+HappinessSurveyService.warm_stats_index()
+
 @app.before_request
 def check_timestamp():
     try:
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据导入基准测试
+按完整版数据的字段结构（field_mapping_complete）生成 1万 / 10万 / 100万 行的模拟问卷CSV，
+分别导入本地 MySQL（写入临时的 *_bench 表，结束后删除）或 SQLite 替身数据库，
+输出各阶段的 行/秒、字节/秒 和峰值内存，可追加写入 JSON Lines 文件用于跟踪性能回退。
+
+用法：
+    python benchmark_import.py                       # SQLite，10k/100k/1M
+    python benchmark_import.py --rows 10000 --backend mysql --mode load_data
+    python benchmark_import.py --streaming --output benchmark_results.jsonl
+    python benchmark_import.py --smoke                # 冒烟测试：SQLite 导入少量数据，失败时返回非0退出码
+"""
+
+import argparse
+import json
+import os
+import re
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from csv_encoding import read_csv_auto
+from data_cleaning_import import HappinessDataImporter, logger
+
+BENCH_TABLE = 'py_happiness_survey_complete_bench'
+
+# 完整版CSV中不需要映射（字段名与数据库一致）的列
+UNMAPPED_COLUMNS = [
+    'id', 'happiness', 'province', 'city', 'county', 'gender', 'birth', 'nationality', 'religion',
+    'edu', 'income', 'political', 'health', 'depression', 'hukou', 'socialize', 'relax', 'learn',
+    'equity', 'class', 'family_income', 'house', 'car', 'marital', 'view'
+]
+# 文本列：绝大多数为空
+TEXT_COLUMNS = ['edu_other', 'property_other', 'invest_other']
+# 年份列
+YEAR_COLUMNS = ['birth', 's_birth', 'f_birth', 'm_birth', 'marital_1st', 'join_party']
+# 收入列
+INCOME_COLUMNS = ['income', 'family_income', 's_income']
+TEXT_SAMPLES = np.array(['其他', '自学', '私塾', '股票基金', '出租房屋', 'other'], dtype=object)
+
+
+def survey_columns():
+    """生成与完整版CSV一致的列顺序"""
+    columns = list(UNMAPPED_COLUMNS)
+    # 映射表中同一数据库字段可能对应多个CSV列名（如 socia_outing / social_outing），只保留第一个
+    targets = set()
+    for col, target in HappinessDataImporter().field_mapping_complete.items():
+        if col != 'data_source' and col not in columns and target not in targets:
+            columns.append(col)
+            targets.add(target)
+    columns.insert(columns.index('province'), 'survey_type')
+    columns.insert(columns.index('gender'), 'survey_time')
+    return list(dict.fromkeys(columns))
+
+
+def generate_chunk(columns, start_id, rows, rng):
+    """生成一块模拟数据：负值表示缺失（与真实问卷编码一致），文本列大部分为空"""
+    data = {}
+    for col in columns:
+        if col == 'id':
+            data[col] = np.arange(start_id, start_id + rows)
+        elif col == 'survey_time':
+            month = rng.integers(7, 10, rows)
+            day = rng.integers(1, 29, rows)
+            hour = rng.integers(8, 21, rows)
+            minute = rng.integers(0, 60, rows)
+            data[col] = [f"2015/{m}/{d} {h}:{mi:02d}" for m, d, h, mi in zip(month, day, hour, minute)]
+        elif col in TEXT_COLUMNS:
+            values = np.full(rows, None, dtype=object)
+            filled = rng.random(rows) < 0.03
+            values[filled] = rng.choice(TEXT_SAMPLES, filled.sum())
+            data[col] = values
+        else:
+            if col in YEAR_COLUMNS:
+                values = rng.integers(1920, 2000, rows)
+            elif col in INCOME_COLUMNS:
+                values = rng.integers(0, 200, rows) * 1000
+            elif col in ('province', 'city', 'county'):
+                values = rng.integers(1, 100, rows)
+            else:
+                values = rng.integers(1, 6, rows)
+            missing = rng.random(rows) < 0.05
+            values[missing] = rng.choice([-1, -2, -3, -8], missing.sum())
+            data[col] = values
+    return pd.DataFrame(data, columns=columns)
+
+
+def generate_csv(path, rows, encoding, seed=42, chunk_rows=100000):
+    """分块生成模拟CSV（已存在同名文件时直接复用）"""
+    if os.path.exists(path):
+        logger.info(f"复用已生成的模拟数据: {path}")
+        return path
+
+    start = time.perf_counter()
+    rng = np.random.default_rng(seed)
+    columns = survey_columns()
+    tmp_path = path + '.tmp'
+    for offset in range(0, rows, chunk_rows):
+        chunk = generate_chunk(columns, offset + 1, min(chunk_rows, rows - offset), rng)
+        chunk.to_csv(tmp_path, mode='a' if offset else 'w', header=not offset, index=False, encoding=encoding)
+    os.replace(tmp_path, path)
+    logger.info(f"已生成{rows}行模拟数据: {path} ({os.path.getsize(path) / 1024 / 1024:.1f}MB)，"
+                f"耗时{time.perf_counter() - start:.1f}秒")
+    return path
+
+
+class SQLiteCursor:
+    """为 SQLite 提供导入器用到的 PyMySQL 游标接口（%s 占位符、executemany、字典结果）"""
+
+    def __init__(self, connection):
+        self._cursor = connection.cursor()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @staticmethod
+    def parameter(value):
+        """把参数转为 SQLite 支持的类型（NumPy 标量取原生值，时间等其他类型转为字符串）"""
+        if isinstance(value, np.generic):
+            value = value.item()
+        if value is None or isinstance(value, (int, float, str, bytes)):
+            return value
+        return str(value)
+
+    @staticmethod
+    def translate(query):
+        """%s 占位符改为 ?，TRUNCATE TABLE 改为 DELETE FROM"""
+        query = re.sub(r'^\s*TRUNCATE\s+TABLE', 'DELETE FROM', query, flags=re.IGNORECASE)
+        return query.replace('%s', '?')
+
+    def execute(self, query, args=None):
+        self._cursor.execute(self.translate(query), tuple(map(self.parameter, args)) if args else ())
+        return self._cursor.rowcount
+
+    def executemany(self, query, args):
+        self._cursor.executemany(self.translate(query), (tuple(map(self.parameter, row)) for row in args))
+        return self._cursor.rowcount
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        return dict(zip([d[0] for d in self._cursor.description], row)) if row else None
+
+    def fetchall(self):
+        names = [d[0] for d in self._cursor.description]
+        return [dict(zip(names, row)) for row in self._cursor.fetchall()]
+
+    def close(self):
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """SQLite 替身连接：支持 with 语句，退出时关闭"""
+
+    def __init__(self, path):
+        self._connection = sqlite3.connect(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def cursor(self):
+        return SQLiteCursor(self._connection)
+
+    def commit(self):
+        self._connection.commit()
+
+    def rollback(self):
+        self._connection.rollback()
+
+    def close(self):
+        self._connection.close()
+
+
+class SQLiteBackend:
+    """SQLite 替身：按清洗后的数据类型建表"""
+
+    name = 'sqlite'
+
+    def __init__(self, work_dir):
+        self.path = os.path.join(work_dir, 'benchmark.sqlite3')
+
+    def prepare(self, importer, csv_path):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        sample = importer.preprocess_complete_data(read_csv_auto(csv_path, nrows=1000), 'train')
+        definitions = []
+        for col, dtype in sample.dtypes.items():
+            if col == 'id':
+                definitions.append('`id` INTEGER PRIMARY KEY')
+            else:
+                sql_type = 'REAL' if dtype.kind in 'iuf' else 'TEXT'
+                definitions.append(f'`{col}` {sql_type}')
+        definitions += ['`createTime` TEXT DEFAULT CURRENT_TIMESTAMP', '`updateTime` TEXT DEFAULT CURRENT_TIMESTAMP']
+        with SQLiteConnection(self.path) as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"CREATE TABLE {BENCH_TABLE} ({', '.join(definitions)})")
+            connection.commit()
+        importer.get_db_connection = lambda: SQLiteConnection(self.path)
+
+    def cleanup(self, importer):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class MySQLBackend:
+    """本地 MySQL：按正式表结构创建临时测试表，测试结束后删除，不影响正式数据"""
+
+    name = 'mysql'
+
+    def prepare(self, importer, csv_path):
+        with importer.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+                cursor.execute(f"CREATE TABLE {BENCH_TABLE} LIKE py_happiness_survey_complete")
+            connection.commit()
+
+    def cleanup(self, importer):
+        with importer.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {BENCH_TABLE}")
+            connection.commit()
+
+
+def run_benchmark(rows, args, backend, work_dir):
+    """对一个数据规模执行一次导入并返回分阶段统计"""
+    csv_path = generate_csv(os.path.join(work_dir, f'synthetic_complete_{rows}.csv'), rows, args.encoding)
+
+    importer = HappinessDataImporter()
+    importer.import_mode = args.mode
+    importer.chunk_size = args.chunk_size
+    backend.prepare(importer, csv_path)
+    importer.profiler.reset()
+
+    try:
+        if args.streaming:
+            importer.stream_import_files([(csv_path, 'train')], BENCH_TABLE, importer.preprocess_complete_data)
+        else:
+            df = importer.read_csv_file(csv_path, low_memory=False)
+            df = importer.preprocess_complete_data(df, 'train', copy=False)
+            with importer.get_db_connection() as connection:
+                importer.insert_dataframe(df, BENCH_TABLE, connection, verify_table_count=False)
+            del df
+
+        importer.create_indexes_and_constraints({'py_happiness_survey_complete': BENCH_TABLE})
+
+        with importer.get_db_connection() as connection:
+            loaded = importer.count_rows(BENCH_TABLE, connection)
+        if loaded != rows:
+            raise ValueError(f"导入行数不一致: 预期{rows}，实际{loaded}")
+
+        result = importer.profiler.report(f"基准测试: {rows}行 ({backend.name}, {args.mode}"
+                                          f"{', streaming' if args.streaming else ''})")
+    finally:
+        backend.cleanup(importer)
+
+    result.update({
+        'rows': rows,
+        'file_bytes': os.path.getsize(csv_path),
+        'backend': backend.name,
+        'mode': args.mode,
+        'streaming': args.streaming,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    })
+    return result
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='幸福感数据导入基准测试')
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000],
+                        help='模拟数据行数，可指定多个')
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite',
+                        help='sqlite: 临时 SQLite 替身；mysql: 使用 config.py 中的数据库（写入临时测试表）')
+    parser.add_argument('--mode', choices=['insert', 'load_data'], default='insert', help='导入方式')
+    parser.add_argument('--streaming', action='store_true', help='使用流式导入')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='流式导入每块行数')
+    parser.add_argument('--encoding', default='gbk', help='模拟CSV的编码（与真实完整版数据一致）')
+    parser.add_argument('--work-dir', default=None, help='模拟数据目录，默认使用系统临时目录，生成的数据会被复用')
+    parser.add_argument('--output', default=None, help='将结果追加写入该 JSON Lines 文件')
+    parser.add_argument('--smoke', action='store_true',
+                        help='冒烟测试：在临时目录中用 SQLite 导入 500 行（忽略 --rows/--backend/--mode/--work-dir）')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.smoke:
+        args.rows, args.backend, args.mode = [500], 'sqlite', 'insert'
+        args.work_dir = tempfile.mkdtemp(prefix='happiness_import_smoke_')
+        try:
+            for streaming in (False, True):
+                args.streaming = streaming
+                run_benchmark(500, args, SQLiteBackend(args.work_dir), args.work_dir)
+        finally:
+            shutil.rmtree(args.work_dir, ignore_errors=True)
+        print("[OK] 冒烟测试通过")
+        return
+
+    if args.backend == 'sqlite' and args.mode == 'load_data':
+        print("[ERROR] SQLite 替身不支持 LOAD DATA，请使用 --mode insert 或 --backend mysql")
+        sys.exit(1)
+
+    work_dir = args.work_dir or os.path.join(tempfile.gettempdir(), 'happiness_import_benchmark')
+    os.makedirs(work_dir, exist_ok=True)
+    backend = SQLiteBackend(work_dir) if args.backend == 'sqlite' else MySQLBackend()
+
+    results = []
+    for rows in args.rows:
+        result = run_benchmark(rows, args, backend, work_dir)
+        results.append(result)
+        if args.output:
+            with open(args.output, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    print("\n" + "=" * 60)
+    print(f"{'行数':>10}{'总耗时(s)':>12}{'行/秒':>12}{'峰值内存(MB)':>14}")
+    for result in results:
+        peak = result['total_peak_rss_bytes']
+        print(f"{result['rows']:>10}{result['wall_seconds']:>12.2f}"
+              f"{result['rows'] / result['wall_seconds']:>12.0f}"
+              f"{(peak / 1024 / 1024 if peak else float('nan')):>14.1f}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,7 +4,6 @@
 比较数据字段和数据库表字段，找出不匹配的地方
 """
 
-import pandas as pd
 import pymysql
 import os
 import sys
@@ -14,6 +13,7 @@ project_root = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
 from config.config import DB_CONFIG
+from csv_encoding import detect_encoding, read_csv_auto
 
 def compare_fields():
     """比较数据字段和数据库表字段"""
@@ -26,19 +26,11 @@ def compare_fields():
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
     train_file = os.path.join(data_dir, 'happiness_train_complete.csv')
 
-    encodings_to_try = ['utf-8', 'gbk', 'gb2312']
-    df = None
-
-    for encoding in encodings_to_try:
-        try:
-            df = pd.read_csv(train_file, nrows=1, encoding=encoding)
-            print(f"成功使用 {encoding} 编码读取数据")
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if df is None:
-        print("无法读取数据文件")
+    try:
+        df = read_csv_auto(train_file, nrows=1)
+        print(f"成功使用 {detect_encoding(train_file)} 编码读取数据")
+    except Exception as e:
+        print(f"无法读取数据文件: {e}")
         return
 
     data_columns = set(df.columns)
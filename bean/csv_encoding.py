@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV 文件编码识别与读取工具
+只读取文件开头的有限字节样本来判断编码（先检查BOM，再对样本做严格解码），
+并按文件的修改时间和大小缓存判断结果，之后只做一次完整解析。
+"""
+
+import codecs
+import io
+import logging
+import os
+
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# 候选编码（按优先级），latin1 可以解码任意字节，作为兜底
+CANDIDATE_ENCODINGS = ('utf-8', 'gbk', 'gb2312', 'cp1252', 'latin1')
+
+BOM_ENCODINGS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+SAMPLE_SIZE = 64 * 1024  # 初始样本大小
+MAX_SAMPLE_SIZE = 1024 * 1024  # 样本全为ASCII时逐步扩大样本的上限
+
+# 文件绝对路径 -> (mtime_ns, size, encoding)
+_encoding_cache = {}
+
+
+def _sniff(sample, final):
+    """根据字节样本判断编码；样本被截断时（final=False）允许末尾出现不完整的多字节字符"""
+    for bom, encoding in BOM_ENCODINGS:
+        if sample.startswith(bom):
+            return encoding
+
+    for encoding in CANDIDATE_ENCODINGS:
+        decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+        try:
+            decoder.decode(sample, final=final)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return CANDIDATE_ENCODINGS[-1]
+
+
+def _read_sample(file_path, file_size, sample_size):
+    """读取样本；样本全为ASCII（无法区分编码）时逐步扩大，直到出现非ASCII字节或达到上限"""
+    with open(file_path, 'rb') as f:
+        if sample_size is None:
+            return f.read()
+        sample = f.read(sample_size)
+        while sample.isascii() and len(sample) < min(file_size, MAX_SAMPLE_SIZE):
+            sample += f.read(len(sample))
+        return sample
+
+
+def detect_encoding(file_path, sample_size=SAMPLE_SIZE):
+    """
+    识别文件编码（结果按文件修改时间和大小缓存）
+
+    Args:
+        file_path: 文件路径
+        sample_size: 样本字节数，None 表示解码整个文件
+
+    Returns:
+        str: 编码名称
+    """
+    key = os.path.abspath(file_path)
+    stat = os.stat(key)
+    cached = _encoding_cache.get(key)
+    if sample_size is not None and cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[2]
+
+    sample = _read_sample(key, stat.st_size, sample_size)
+    encoding = _sniff(sample, final=len(sample) >= stat.st_size)
+    _encoding_cache[key] = (stat.st_mtime_ns, stat.st_size, encoding)
+    logger.info(f"识别文件编码: {os.path.basename(key)} -> {encoding}")
+    return encoding
+
+
+def read_csv_auto(file_path, data=None, **kwargs):
+    """
+    自动识别编码后读取CSV（只做一次完整解析）。
+    极少数情况下样本之后才出现无法解码的字节，此时对整个文件重新识别编码后再解析一次。
+
+    Args:
+        file_path: 文件路径（用于识别编码）
+        data: 已读入内存的文件内容（bytes），传入时直接从内存解析
+    """
+    def parse(encoding):
+        source = io.BytesIO(data) if data is not None else file_path
+        return pd.read_csv(source, encoding=encoding, **kwargs)
+
+    encoding = detect_encoding(file_path)
+    try:
+        return parse(encoding)
+    except UnicodeDecodeError:
+        logger.warning(f"{encoding} 编码无法解码 {file_path} 的后续内容，对整个文件重新识别编码")
+        encoding = detect_encoding(file_path, sample_size=None)
+        return parse(encoding)
@@ -8,16 +8,29 @@
 import pandas as pd
 import numpy as np
 import pymysql
+import csv
+import hashlib
+import io
 import logging
+import math
 import os
+import queue
 import sys
-from datetime import datetime
+import tempfile
+import threading
+import time
+import zlib
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import date, datetime
 
 # 添加项目根目录到Python路径
 project_root = os.path.dirname(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from config.config import DB_CONFIG
+from csv_encoding import detect_encoding, read_csv_auto
+from import_profiler import ImportProfiler
 
 # 配置日志
 logging.basicConfig(
@@ -30,13 +43,72 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# 增量导入状态表：记录每个源文件的校验和以及每行数据的内容哈希
+CREATE_FILE_STATE_SQL = """
+    CREATE TABLE IF NOT EXISTS py_import_file_state (
+        tableName VARCHAR(100) NOT NULL,
+        fileName VARCHAR(255) NOT NULL,
+        checksum CHAR(64) NOT NULL,
+        rowCount INT NOT NULL DEFAULT 0,
+        updateTime DATETIME NOT NULL,
+        PRIMARY KEY (tableName, fileName)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+CREATE_ROW_HASHES_SQL = """
+    CREATE TABLE IF NOT EXISTS py_import_row_hashes (
+        tableName VARCHAR(100) NOT NULL,
+        rowId BIGINT NOT NULL,
+        dataSource VARCHAR(20) NOT NULL,
+        rowHash BIGINT UNSIGNED NOT NULL,
+        PRIMARY KEY (tableName, rowId),
+        INDEX idx_row_hashes_source (tableName, dataSource)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+# 估算批量插入语句字节数时，数值列抽样的行数
+STATEMENT_SAMPLE_ROWS = 1000
+
+# 暂存表按列校验：参与校验的列类型
+CHECKSUM_INT_TYPES = ('tinyint', 'smallint', 'mediumint', 'int', 'bigint')
+CHECKSUM_APPROX_TYPES = ('decimal', 'float', 'double')
+CHECKSUM_DATE_TYPES = ('date', 'datetime', 'timestamp')
+CHECKSUM_TYPES = CHECKSUM_INT_TYPES + CHECKSUM_APPROX_TYPES + CHECKSUM_DATE_TYPES + (
+    'char', 'varchar', 'tinytext', 'text', 'mediumtext', 'longtext')
+CHECKSUM_MASK = (1 << 64) - 1  # MySQL 的 BIT_XOR 结果为64位无符号整数
+
+
 class HappinessDataImporter:
     """幸福感数据导入器"""
 
     def __init__(self):
         self.db_config = DB_CONFIG
         self.data_dir = os.path.join(os.path.dirname(__file__), 'data')
-        self.batch_size = 1000  # 批量插入大小
+        self.batch_size = 1000  # 增量导入按 id 批量删除时每批的 id 个数
+        # 批量插入按估算的语句字节数分批：每批一次 executemany、一次提交，
+        # 同时作为 pymysql 合并多行INSERT语句的字节上限（需小于 max_allowed_packet）
+        self.max_statement_bytes = 1024 * 1024
+        # 导入方式：'insert' 多行INSERT；'load_data' 使用 LOAD DATA LOCAL INFILE（不可用时自动回退到 insert）
+        self.import_mode = 'insert'
+        # 流式导入：按块读取、清洗并写入，内存占用与文件大小无关
+        self.streaming = False
+        self.chunk_size = 5000  # 每块行数
+        self.stream_queue_size = 2  # 已清洗、待写入的块数上限
+        # 增量导入：按行哈希比对，只写入新增、变化和删除的行；文件校验和未变化时直接跳过
+        self.incremental = False
+        # 原子替换导入：写入暂存表、建索引并校验后，用 RENAME TABLE 一次性替换正式表
+        self.atomic_swap = False
+        self.deferred_indexes = {}  # 暂存表 -> 延后创建的二级索引定义
+        self.loaded_stats = {}  # 表名 -> 已写入的行数、id 校验值和各列校验值
+        self.checksum_columns = {}  # 暂存表 -> [(列名, 类型, 小数位数)]，参与按列校验的列
+        self.stats_lock = threading.Lock()
+        # 并行导入：多进程解析清洗（大文件按行区间拆分），多个数据库连接并发写入
+        self.parallel = False
+        self.parse_workers = None  # 解析进程数，None 表示CPU核数
+        self.writer_connections = 4  # 并发写入的数据库连接数
+        self.split_rows = 4000  # 单个解析任务的最大行数
+        # 分阶段性能统计（read / decode / clean / map / serialize / insert / index）
+        self.profiler = ImportProfiler()
 
         # 字段名映射：CSV字段名 -> 数据库字段名
         self.field_mapping_abbr = {
@@ -185,7 +257,11 @@ class HappinessDataImporter:
     def get_db_connection(self):
         """获取数据库连接"""
         try:
-            connection = pymysql.connect(**self.db_config)
+            if self.import_mode == 'load_data':
+                # LOAD DATA LOCAL INFILE 需要客户端显式开启 local_infile
+                connection = pymysql.connect(**self.db_config, local_infile=True)
+            else:
+                connection = pymysql.connect(**self.db_config)
             return connection
         except Exception as e:
             logger.error(f"数据库连接失败: {e}")
@@ -232,12 +308,109 @@ class HappinessDataImporter:
 
         return value
 
-    def preprocess_abbreviated_data(self, df, data_source='train'):
+    def clean_numeric_columns(self, df, fields):
+        """
+        向量化清洗一组数值字段（原地修改 df），结果与逐值调用 clean_numeric_value 一致：
+        - 数值类型的列：整块转为 float，负值（表示缺失）置为 NULL
+        - 混合/字符串类型的列：非字符串元素同上处理；字符串元素去空白后转数值，无法转换的置为 NULL
+        """
+        fields = [field for field in fields if field in df.columns]
+        numeric_cols = [field for field in fields
+                        if pd.api.types.is_numeric_dtype(df[field]) and not pd.api.types.is_bool_dtype(df[field])]
+        other_cols = [field for field in fields if field not in numeric_cols]
+
+        if numeric_cols:
+            block = df[numeric_cols].astype(float)
+            block = block.mask(block < 0)
+            df[numeric_cols] = block
+            for field in block.columns[block.isna().all()]:
+                df[field] = self._null_if_empty(block[field])
+
+        for field in other_cols:
+            df[field] = self._null_if_empty(self._clean_numeric_object_series(df[field]))
+
+        return df
+
+    def _clean_numeric_object_series(self, series):
+        """清洗 object 类型的数值列"""
+        stripped = series.str.strip()
+        is_str = stripped.notna()  # .str 访问器对非字符串元素返回 NaN
+
+        # 非字符串元素（数值或缺失）：负值表示缺失
+        numbers = pd.to_numeric(series.where(~is_str), errors='coerce').astype(float)
+        numbers = numbers.mask(numbers < 0)
+
+        # 字符串元素：去空白后转数值（与逐值清洗一致，字符串形式的负数保留）
+        parsed = pd.to_numeric(stripped.where(is_str), errors='coerce').astype(float)
+
+        # pd.to_numeric 无法解析但 Python float() 可以解析的少量值，按唯一值回退处理
+        residual = is_str & parsed.isna() & (stripped != '')
+        if residual.any():
+            parsed[residual] = stripped[residual].map(self._parse_float_or_nan)
+
+        return numbers.where(~is_str, parsed)
+
+    @staticmethod
+    def _parse_float_or_nan(value):
+        try:
+            return float(value)
+        except (ValueError, TypeError):
+            return np.nan
+
+    @staticmethod
+    def _null_if_empty(series):
+        """整列都为空时保持 object 类型的 None，与逐值清洗的结果类型一致"""
+        if series.isna().all():
+            return pd.Series([None] * len(series), index=series.index, dtype=object)
+        return series
+
+    def clean_string_columns(self, df, fields, max_length=None):
+        """向量化清洗一组字符串字段（原地修改 df），结果与逐值调用 clean_string_value 一致"""
+        for field in fields:
+            if field not in df.columns:
+                continue
+            series = df[field]
+            result = pd.Series([None] * len(series), index=series.index, dtype=object)
+
+            present = series.notna()
+            if present.any():
+                text = series[present].astype(str)
+                value = text.str.strip()
+                invalid = text.str.lower().isin(['nan', 'null', 'none']) | (value == '')
+
+                # 负值表示缺失数据
+                numbers = pd.to_numeric(value, errors='coerce')
+                residual = numbers.isna() & ~invalid
+                if residual.any():
+                    numbers[residual] = value[residual].map(self._parse_float_or_nan)
+                invalid |= numbers < 0
+
+                if max_length:
+                    value = value.str[:max_length]
+                valid = value[~invalid]
+                result[valid.index] = valid
+
+            df[field] = result
+        return df
+
+    def read_csv_file(self, file_path, **kwargs):
+        """读取CSV文件：分别统计读取文件（read）和解码解析（decode）两个阶段"""
+        with self.profiler.stage('read') as stage:
+            with open(file_path, 'rb') as f:
+                data = f.read()
+            stage.bytes = len(data)
+        with self.profiler.stage('decode', nbytes=len(data)) as stage:
+            df = read_csv_auto(file_path, data=data, **kwargs)
+            stage.rows = len(df)
+        return df
+
+    def preprocess_abbreviated_data(self, df, data_source='train', copy=True):
         """预处理简化版数据"""
         logger.info(f"开始预处理{data_source}数据集，原始数据量: {len(df)}")
 
-        # 复制数据避免修改原数据
-        df_clean = df.copy()
+        # 复制数据避免修改原数据（流式导入的块只用一次，无需复制）
+        df_clean = df.copy() if copy else df
+        clean_start = time.perf_counter()
 
         # 数据清洗和类型转换
         df_clean['id'] = df_clean['id'].astype(int)
@@ -252,18 +425,16 @@ class HappinessDataImporter:
             'car', 'marital', 'status_peer', 'status_3_before', 'view', 'inc_ability'
         ]
 
-        for field in numeric_fields:
-            if field in df_clean.columns:
-                df_clean[field] = df_clean[field].apply(lambda x: self.clean_numeric_value(x))
-
-        # 清洗特殊字段
-        df_clean['income'] = df_clean['income'].apply(lambda x: self.clean_numeric_value(x))
-        df_clean['family_income'] = df_clean['family_income'].apply(lambda x: self.clean_numeric_value(x))
+        # 清洗数值字段和特殊字段（收入类）：整块向量化处理
+        self.clean_numeric_columns(df_clean, numeric_fields + ['income', 'family_income'])
 
         # 清洗字符串字段
-        df_clean['survey_time'] = df_clean['survey_time'].apply(lambda x: self.clean_string_value(x, 50))
+        self.clean_string_columns(df_clean, ['survey_time'], 50)
+
+        self.profiler.add('clean', time.perf_counter() - clean_start, len(df_clean))
 
         # 添加数据来源标识
+        map_start = time.perf_counter()
         df_clean['data_source'] = data_source
 
         # 字段名映射：将CSV下划线命名转换为数据库驼峰命名
@@ -271,16 +442,18 @@ class HappinessDataImporter:
 
         # 移除完全为空的行
         df_clean = df_clean.dropna(how='all')
+        self.profiler.add('map', time.perf_counter() - map_start, len(df_clean))
 
         logger.info(f"{data_source}数据集预处理完成，清洗后数据量: {len(df_clean)}")
         return df_clean
 
-    def preprocess_complete_data(self, df, data_source='train'):
+    def preprocess_complete_data(self, df, data_source='train', copy=True):
         """预处理完整版数据"""
         logger.info(f"开始预处理完整版{data_source}数据集，原始数据量: {len(df)}")
 
-        # 复制数据避免修改原数据
-        df_clean = df.copy()
+        # 复制数据避免修改原数据（流式导入的块只用一次，无需复制）
+        df_clean = df.copy() if copy else df
+        clean_start = time.perf_counter()
 
         # 数据清洗和类型转换
         df_clean['id'] = df_clean['id'].astype(int)
@@ -310,14 +483,8 @@ class HappinessDataImporter:
             'public_service_8', 'public_service_9'
         ]
 
-        for field in numeric_fields:
-            if field in df_clean.columns:
-                df_clean[field] = df_clean[field].apply(lambda x: self.clean_numeric_value(x))
-
-        # 清洗特殊数值字段
-        df_clean['income'] = df_clean['income'].apply(lambda x: self.clean_numeric_value(x))
-        df_clean['family_income'] = df_clean['family_income'].apply(lambda x: self.clean_numeric_value(x))
-        df_clean['s_income'] = df_clean['s_income'].apply(lambda x: self.clean_numeric_value(x))
+        # 清洗数值字段和特殊数值字段（收入类）：整块向量化处理
+        self.clean_numeric_columns(df_clean, numeric_fields + ['income', 'family_income', 's_income'])
 
         # 确保所有需要的字段都在映射中
         additional_mappings = {
@@ -335,13 +502,13 @@ class HappinessDataImporter:
             'marital_1st', 'marital_now', 's_work_type', 'f_work_14', 'm_work_14'
         ]
 
-        for field in string_fields:
-            if field in df_clean.columns:
-                df_clean[field] = df_clean[field].apply(lambda x: self.clean_string_value(x))
+        self.clean_string_columns(df_clean, string_fields)
+        self.clean_string_columns(df_clean, ['survey_time'], 50)
 
-        df_clean['survey_time'] = df_clean['survey_time'].apply(lambda x: self.clean_string_value(x, 50))
+        self.profiler.add('clean', time.perf_counter() - clean_start, len(df_clean))
 
         # 添加数据来源标识
+        map_start = time.perf_counter()
         df_clean['data_source'] = data_source
 
         # 字段名映射：将CSV下划线命名转换为数据库驼峰命名
@@ -349,77 +516,538 @@ class HappinessDataImporter:
 
         # 移除完全为空的行
         df_clean = df_clean.dropna(how='all')
+        self.profiler.add('map', time.perf_counter() - map_start, len(df_clean))
 
         logger.info(f"完整版{data_source}数据集预处理完成，清洗后数据量: {len(df_clean)}")
         return df_clean
 
+    def dataframe_to_rows(self, df, columns):
+        """将数据框转换为行元组列表：转为 NumPy object 数组后整体把 NaN 替换为 None，再逐行生成元组"""
+        values = df[columns].to_numpy(dtype=object)
+        values[pd.isna(values)] = None
+        return list(map(tuple, values))
+
+    def estimate_row_bytes(self, df, columns):
+        """
+        按列向量化估算每行在多行 INSERT ... VALUES 中占用的字节数：
+        数值列按抽样（最多 STATEMENT_SAMPLE_ROWS 行）的平均字面量长度（空值为 NULL，pymysql 给浮点数加 e0），
+        其他列按每行字符串的 UTF-8 长度加引号
+        """
+        sizes = np.full(len(df), 2 + len(columns), dtype=np.int64)  # 括号和逗号
+        step = max(len(df) // STATEMENT_SAMPLE_ROWS, 1)
+        for col in columns:
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series) or pd.api.types.is_bool_dtype(series):
+                sample = series.iloc[::step]
+                suffix = 2 if pd.api.types.is_float_dtype(series) else 0
+                widths = [4 if pd.isna(value) else len(repr(value)) + suffix for value in sample.tolist()]
+                sizes += int(np.ceil(np.mean(widths))) if widths else 4
+            else:
+                text = series.astype(str)
+                # 非 ASCII 字符（如中文）在 UTF-8 中占3字节
+                sizes += (text.str.len() + text.str.count(r'[^\x00-\x7f]') * 2 + 2).to_numpy(dtype=np.int64)
+        return sizes
+
+    def byte_batches(self, row_bytes):
+        """
+        按 max_statement_bytes 把行切分为批次（每批至少一行）
+
+        Returns:
+            list: [(起始行, 结束行), ...]
+        """
+        total = np.cumsum(row_bytes)
+        batches = []
+        start = 0
+        while start < len(total):
+            base = total[start - 1] if start else 0
+            end = int(np.searchsorted(total, base + self.max_statement_bytes, side='right'))
+            end = max(end, start + 1)
+            batches.append((start, end))
+            start = end
+        return batches
+
+    def build_insert_sql(self, table_name, columns, update_columns=None):
+        """
+        生成单行占位符的 INSERT 语句，交给 cursor.executemany 执行：
+        pymysql 会把多行参数合并为多行 INSERT ... VALUES，并按 cursor.max_stmt_length 切分语句
+
+        Args:
+            update_columns: 主键冲突时需要更新的列，传入时生成 INSERT ... ON DUPLICATE KEY UPDATE
+        """
+        columns_str = ', '.join([f'`{col}`' for col in columns])
+        placeholders = ', '.join(['%s'] * len(columns))
+        sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+        if update_columns:
+            sql += ' ON DUPLICATE KEY UPDATE ' + ', '.join(
+                [f'`{col}` = VALUES(`{col}`)' for col in update_columns])
+        return sql
+
+    def insert_cursor(self, connection):
+        """executemany 合并语句时使用 max_statement_bytes 作为单条语句的字节上限"""
+        cursor = connection.cursor()
+        cursor.max_stmt_length = self.max_statement_bytes
+        return cursor
+
     def batch_insert_data(self, df, table_name, connection):
-        """批量插入数据"""
+        """
+        批量插入数据，返回插入的行数：按估算的字节数分批（见 byte_batches），
+        每批一次 executemany（由 pymysql 合并为多行INSERT）并提交
+        """
         if df.empty:
             logger.warning(f"数据框为空，跳过插入{table_name}")
-            return
+            return 0
 
-        cursor = connection.cursor()
+        start_time = time.perf_counter()
+        cursor = self.insert_cursor(connection)
 
-        # 获取列名
+        # 获取列名，并将NaN替换为None（转换计入 serialize 阶段，参数转义、执行和提交计入 insert 阶段）
         columns = df.columns.tolist()
-        columns_str = ', '.join([f'`{col}`' for col in columns])
+        with self.profiler.stage('serialize', rows=len(df)):
+            data_tuples = self.dataframe_to_rows(df, columns)
+            batches = self.byte_batches(self.estimate_row_bytes(df, columns))
+        sql = self.build_insert_sql(table_name, columns)
 
-        # 构建占位符
-        placeholders = ', '.join(['%s'] * len(columns))
+        inserted = 0
+        try:
+            with self.profiler.stage('insert', rows=len(data_tuples)):
+                for number, (start, end) in enumerate(batches, 1):
+                    batch_data = data_tuples[start:end]
+                    cursor.executemany(sql, batch_data)
+                    connection.commit()
+                    inserted += len(batch_data)
+                    logger.info(f"已插入{table_name}表第{number}/{len(batches)}批数据，共{len(batch_data)}条记录")
 
-        # 构建插入语句
-        sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
+            elapsed = time.perf_counter() - start_time
+            rows_per_second = inserted / elapsed if elapsed > 0 else float('inf')
+            logger.info(f"成功插入{table_name}表总计{inserted}条记录，耗时{elapsed:.2f}秒，"
+                        f"速度{rows_per_second:.0f}行/秒")
+            return inserted
 
-        # 批量处理数据，将NaN替换为None
-        data_tuples = []
-        for _, row in df[columns].iterrows():
-            row_tuple = tuple(None if (pd.isna(x) or (isinstance(x, float) and np.isnan(x))) else x for x in row)
-            data_tuples.append(row_tuple)
+        except Exception as e:
+            connection.rollback()
+            logger.error(f"插入{table_name}表失败: {e}")
+            raise e
+        finally:
+            cursor.close()
 
+    def write_tsv(self, df, columns, path):
+        """
+        将数据框写为 LOAD DATA 可读取的TSV文件：
+        NULL 写为 \\N，含制表符/换行/引号的字段用双引号包裹，字符串中的反斜杠预先转义
+        """
+        frame = df[columns]
+        object_cols = [col for col in columns if frame[col].dtype == object]
+        if object_cols:
+            frame = frame.copy()
+            for col in object_cols:
+                frame[col] = frame[col].map(
+                    lambda v: v.replace('\\', '\\\\') if isinstance(v, str) else v
+                )
+
+        frame.to_csv(
+            path, sep='\t', na_rep='\\N', header=False, index=False,
+            quoting=csv.QUOTE_MINIMAL, lineterminator='\n', float_format='%.15g',
+            encoding='utf-8'
+        )
+
+    def count_rows(self, table_name, connection):
+        """统计表行数"""
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) AS total FROM {table_name}")
+            row = cursor.fetchone()
+            return row['total'] if isinstance(row, dict) else row[0]
+
+    def local_infile_enabled(self, connection):
+        """检查服务端是否允许 LOAD DATA LOCAL INFILE"""
+        with connection.cursor() as cursor:
+            cursor.execute("SHOW GLOBAL VARIABLES LIKE 'local_infile'")
+            row = cursor.fetchone()
+        if not row:
+            return False
+        value = row['Value'] if isinstance(row, dict) else row[1]
+        return str(value).upper() in ('ON', '1')
+
+    def load_data_infile(self, df, table_name, connection, verify_table_count=True):
+        """
+        使用 LOAD DATA LOCAL INFILE 导入数据，导入后校验行数
+
+        Args:
+            verify_table_count: 是否用 COUNT(*) 校验全表行数；
+                为 False 时只校验本次语句影响的行数（流式导入逐块写入时避免反复全表计数）
+
+        Returns:
+            int: 导入的行数
+
+        Raises:
+            ValueError: 导入后行数与预期不一致
+        """
+        start_time = time.perf_counter()
+        columns = df.columns.tolist()
+        columns_str = ', '.join([f'`{col}`' for col in columns])
+        if verify_table_count:
+            expected = self.count_rows(table_name, connection) + len(df)
+
+        fd, tsv_path = tempfile.mkstemp(prefix=f'{table_name}_', suffix='.tsv')
+        os.close(fd)
         try:
-            # 分批插入
-            for i in range(0, len(data_tuples), self.batch_size):
-                batch_data = data_tuples[i:i + self.batch_size]
-                cursor.executemany(sql, batch_data)
+            with self.profiler.stage('serialize', rows=len(df)) as stage:
+                self.write_tsv(df, columns, tsv_path)
+                stage.bytes = os.path.getsize(tsv_path)
+            logger.info(f"已生成临时TSV文件: {tsv_path} ({os.path.getsize(tsv_path) / 1024 / 1024:.1f}MB)")
+
+            sql = f"""
+                LOAD DATA LOCAL INFILE %s INTO TABLE {table_name}
+                CHARACTER SET utf8mb4
+                FIELDS TERMINATED BY '\\t' OPTIONALLY ENCLOSED BY '"' ESCAPED BY '\\\\'
+                LINES TERMINATED BY '\\n'
+                ({columns_str})
+            """
+            with self.profiler.stage('insert', rows=len(df), nbytes=os.path.getsize(tsv_path)):
+                with connection.cursor() as cursor:
+                    loaded = cursor.execute(sql, (tsv_path,))
                 connection.commit()
-                logger.info(f"已插入{table_name}表第{i//self.batch_size + 1}批数据，共{len(batch_data)}条记录")
+        finally:
+            os.remove(tsv_path)
+
+        if loaded != len(df):
+            raise ValueError(f"LOAD DATA 导入{table_name}的行数不一致: 预期{len(df)}，实际{loaded}")
+        if verify_table_count:
+            actual = self.count_rows(table_name, connection)
+            if actual != expected:
+                raise ValueError(f"LOAD DATA 导入{table_name}后行数不一致: 预期{expected}，实际{actual}")
+
+        elapsed = time.perf_counter() - start_time
+        rows_per_second = len(df) / elapsed if elapsed > 0 else float('inf')
+        logger.info(f"LOAD DATA 成功导入{table_name}表{len(df)}条记录，耗时{elapsed:.2f}秒，"
+                    f"速度{rows_per_second:.0f}行/秒")
+        return len(df)
+
+    def insert_dataframe(self, df, table_name, connection, verify_table_count=True):
+        """按导入方式写入数据：load_data 模式在 local_infile 不可用时回退到批量INSERT"""
+        if df.empty:
+            logger.warning(f"数据框为空，跳过插入{table_name}")
+            return 0
+
+        inserted = None
+        if self.import_mode == 'load_data':
+            try:
+                if self.local_infile_enabled(connection):
+                    inserted = self.load_data_infile(df, table_name, connection, verify_table_count)
+                else:
+                    logger.warning("服务端未开启 local_infile，回退到批量INSERT")
+            except (pymysql.err.OperationalError, pymysql.err.InternalError) as e:
+                # 1148/3948: 服务端禁用；2068: 客户端未开启
+                if e.args and e.args[0] in (1148, 3948, 2068):
+                    connection.rollback()
+                    logger.warning(f"LOAD DATA LOCAL INFILE 不可用（{e}），回退到批量INSERT")
+                else:
+                    raise
+
+        if inserted is None:
+            inserted = self.batch_insert_data(df, table_name, connection)
+        self.record_loaded_rows(df, table_name)
+        return inserted
+
+    def stream_import_files(self, sources, table_name, preprocess, encoding=None):
+        """
+        流式导入：生产者线程按 chunk_size 读取CSV并清洗、映射，
+        主线程作为消费者逐块写入数据库；两者通过有界队列衔接，
+        写入当前块的同时解析下一块，内存中最多只保留 stream_queue_size + 2 个块。
+
+        Args:
+            sources: [(文件路径, 数据来源标识), ...]
+            table_name: 目标表
+            preprocess: 预处理函数（preprocess_abbreviated_data / preprocess_complete_data）
+            encoding: 文件编码，为 None 时按文件自动识别
+
+        Returns:
+            int: 写入的总行数
+        """
+        chunks = queue.Queue(maxsize=self.stream_queue_size)
+        end_marker = object()
+        stop = threading.Event()
+        producer_errors = []
+
+        def put(item):
+            # 消费者出错退出后不再阻塞在满队列上
+            while not stop.is_set():
+                try:
+                    chunks.put(item, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for file_path, data_source in sources:
+                    reader = pd.read_csv(file_path, chunksize=self.chunk_size, low_memory=False,
+                                         encoding=encoding or detect_encoding(file_path))
+                    # 分块读取时文件读取与解码解析无法分开计时，统一计入 decode 阶段
+                    while True:
+                        with self.profiler.stage('decode') as stage:
+                            chunk = next(reader, None)
+                            stage.rows = 0 if chunk is None else len(chunk)
+                        if chunk is None:
+                            break
+                        if not put(preprocess(chunk, data_source, copy=False)):
+                            return
+                    self.profiler.add('decode', 0.0, nbytes=os.path.getsize(file_path))
+            except Exception as e:
+                producer_errors.append(e)
+            finally:
+                put(end_marker)
+
+        producer = threading.Thread(target=produce, name=f'{table_name}-reader', daemon=True)
+        producer.start()
+
+        total = 0
+        try:
+            with self.get_db_connection() as connection:
+                while True:
+                    chunk = chunks.get()
+                    if chunk is end_marker:
+                        break
+                    total += self.insert_dataframe(chunk, table_name, connection, verify_table_count=False)
+                    logger.info(f"流式导入{table_name}: 已写入{total}条记录")
+        finally:
+            stop.set()
+            producer.join()
+
+        if producer_errors:
+            raise producer_errors[0]
+        return total
+
+    def file_checksum(self, file_path):
+        """计算文件的 SHA-256 校验和（按块读取）"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def compute_row_hashes(self, df):
+        """
+        计算清洗后每行数据的内容哈希（64位无符号整数）：
+        数值列统一转为 float64、空值统一记为 \\N，再按列名顺序转为字符串后哈希，
+        使结果与列顺序以及合并数据框时的类型提升无关
+        """
+        canonical = {}
+        for col in sorted(df.columns):
+            values = df[col]
+            if values.dtype.kind in 'biuf':
+                values = values.astype('float64')
+            canonical[col] = values.astype(object).where(values.notna(), '\\N').astype(str)
+        return pd.util.hash_pandas_object(pd.DataFrame(canonical), index=False).to_numpy()
+
+    def ensure_import_state_tables(self, connection):
+        """创建增量导入状态表（已存在时跳过）"""
+        with connection.cursor() as cursor:
+            cursor.execute(CREATE_FILE_STATE_SQL)
+            cursor.execute(CREATE_ROW_HASHES_SQL)
+        connection.commit()
+
+    def clear_import_state(self, table_name, connection):
+        """全量导入清空目标表后，同步清空该表的增量导入状态，下次增量导入将重新比对全部数据"""
+        self.ensure_import_state_tables(connection)
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM py_import_file_state WHERE tableName = %s", (table_name,))
+            cursor.execute("DELETE FROM py_import_row_hashes WHERE tableName = %s", (table_name,))
+        connection.commit()
+
+    def incremental_import(self, sources, table_name, preprocess):
+        """
+        增量导入（幂等，可重复执行）：
+        1. 源文件校验和与上次导入一致时跳过该文件；
+        2. 对变化文件的清洗结果逐行计算内容哈希，与已保存的行哈希比对；
+        3. 只对新增和变化的行执行 INSERT ... ON DUPLICATE KEY UPDATE，对已不存在的行执行 DELETE，
+           数据与行哈希在同一事务中按批提交，中途失败时重新执行即可从断点继续。
+
+        Args:
+            sources: [(文件路径, 数据来源标识), ...]
+            table_name: 目标表
+            preprocess: 预处理函数
+
+        Returns:
+            dict: 新增、更新、删除、未变化的行数以及跳过的文件数
+        """
+        start_time = time.perf_counter()
+        stats = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0, 'skipped_files': 0}
+
+        with self.get_db_connection() as connection:
+            self.ensure_import_state_tables(connection)
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT fileName, checksum FROM py_import_file_state WHERE tableName = %s",
+                               (table_name,))
+                stored_checksums = {row['fileName']: row['checksum'] for row in cursor.fetchall()}
+
+            changed = []
+            for file_path, data_source in sources:
+                checksum = self.file_checksum(file_path)
+                if stored_checksums.get(os.path.basename(file_path)) == checksum:
+                    logger.info(f"{os.path.basename(file_path)} 未发生变化，跳过")
+                    stats['skipped_files'] += 1
+                else:
+                    changed.append((file_path, data_source, checksum))
+
+            if not changed:
+                logger.info(f"{table_name} 的所有源文件均未变化，无需导入")
+                return stats
+
+            frames = [preprocess(self.read_csv_file(file_path, low_memory=False), data_source)
+                      for file_path, data_source, _ in changed]
+            # 按文件分别计算哈希：合并后缺失的列会补为空值，不能参与哈希
+            hashes = np.concatenate([self.compute_row_hashes(frame) for frame in frames])
+            df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            ids = df['id'].to_numpy()
+
+            # 只与变化文件对应数据来源的已有行比对，未变化文件的行保持不动
+            data_sources = [data_source for _, data_source, _ in changed]
+            placeholders = ', '.join(['%s'] * len(data_sources))
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT rowId, rowHash FROM py_import_row_hashes
+                    WHERE tableName = %s AND dataSource IN ({placeholders})
+                """, [table_name] + data_sources)
+                stored_hashes = {row['rowId']: row['rowHash'] for row in cursor.fetchall()}
+
+            stored_index = pd.Index(np.fromiter(stored_hashes.keys(), dtype=np.int64, count=len(stored_hashes)))
+            stored_values = np.fromiter(stored_hashes.values(), dtype=np.uint64, count=len(stored_hashes))
+            positions = stored_index.get_indexer(ids)
+            is_new = positions < 0
+            previous = np.zeros(len(ids), dtype=np.uint64)
+            previous[~is_new] = stored_values[positions[~is_new]]
+            is_changed = ~is_new & (previous != hashes)
+            deleted_ids = sorted(set(stored_hashes) - set(ids.tolist()))
+
+            stats['inserted'] = int(is_new.sum())
+            stats['updated'] = int(is_changed.sum())
+            stats['deleted'] = len(deleted_ids)
+            stats['unchanged'] = len(df) - stats['inserted'] - stats['updated']
+            logger.info(f"{table_name} 增量比对结果: 新增{stats['inserted']}行，更新{stats['updated']}行，"
+                        f"删除{stats['deleted']}行，未变化{stats['unchanged']}行")
+
+            write_mask = is_new | is_changed
+            self.apply_upserts(df[write_mask], hashes[write_mask], table_name, connection)
+            self.apply_deletes(deleted_ids, table_name, connection)
+
+            # 数据全部写入后再记录文件校验和，保证中途失败时下次不会误跳过
+            with connection.cursor() as cursor:
+                for file_path, data_source, checksum in changed:
+                    row_count = int((df['dataSource'] == data_source).sum())
+                    cursor.execute("""
+                        INSERT INTO py_import_file_state (tableName, fileName, checksum, rowCount, updateTime)
+                        VALUES (%s, %s, %s, %s, NOW())
+                        ON DUPLICATE KEY UPDATE checksum = VALUES(checksum), rowCount = VALUES(rowCount),
+                                                updateTime = VALUES(updateTime)
+                    """, (table_name, os.path.basename(file_path), checksum, row_count))
+            connection.commit()
+
+        elapsed = time.perf_counter() - start_time
+        logger.info(f"{table_name} 增量导入完成，耗时{elapsed:.2f}秒")
+        return stats
+
+    def apply_upserts(self, df, hashes, table_name, connection):
+        """按字节数分批写入新增/变化的行及其行哈希，每批数据与哈希在同一事务中提交"""
+        if df.empty:
+            return
+        columns = df.columns.tolist()
+        update_columns = [col for col in columns if col != 'id']
+        rows = self.dataframe_to_rows(df, columns)
+        hash_rows = list(zip([table_name] * len(df), df['id'].tolist(),
+                             df['dataSource'].tolist(), hashes.tolist()))
+        hash_columns = ['tableName', 'rowId', 'dataSource', 'rowHash']
 
-            logger.info(f"成功插入{table_name}表总计{len(data_tuples)}条记录")
+        upsert_sql = self.build_insert_sql(table_name, columns, update_columns)
+        hash_sql = self.build_insert_sql('py_import_row_hashes', hash_columns, ['dataSource', 'rowHash'])
 
+        cursor = self.insert_cursor(connection)
+        try:
+            for start, end in self.byte_batches(self.estimate_row_bytes(df, columns)):
+                cursor.executemany(upsert_sql, rows[start:end])
+                cursor.executemany(hash_sql, hash_rows[start:end])
+                connection.commit()
+                logger.info(f"已写入{table_name}表{end}/{len(rows)}条新增或变化的记录")
         except Exception as e:
             connection.rollback()
-            logger.error(f"插入{table_name}表失败: {e}")
+            logger.error(f"增量写入{table_name}表失败: {e}")
             raise e
         finally:
             cursor.close()
 
-    def import_abbreviated_data(self):
-        """导入简化版数据"""
+    def apply_deletes(self, ids, table_name, connection):
+        """按批删除源文件中已不存在的行及其行哈希"""
+        if not ids:
+            return
+        cursor = connection.cursor()
+        try:
+            for start in range(0, len(ids), self.batch_size):
+                batch = ids[start:start + self.batch_size]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f"DELETE FROM {table_name} WHERE id IN ({placeholders})", batch)
+                cursor.execute(f"""
+                    DELETE FROM py_import_row_hashes WHERE tableName = %s AND rowId IN ({placeholders})
+                """, [table_name] + batch)
+                connection.commit()
+            logger.info(f"已从{table_name}表删除{len(ids)}条源文件中不存在的记录")
+        except Exception as e:
+            connection.rollback()
+            logger.error(f"删除{table_name}表记录失败: {e}")
+            raise e
+        finally:
+            cursor.close()
+
+    def import_abbreviated_data(self, table_name='py_happiness_survey'):
+        """
+        导入简化版数据
+
+        Args:
+            table_name: 目标表（原子替换导入时为暂存表）
+        """
         logger.info("开始导入简化版数据...")
 
         try:
+            train_file = os.path.join(self.data_dir, 'happiness_train_abbr.csv')
+            test_file = os.path.join(self.data_dir, 'happiness_test_abbr.csv')
+
+            if self.incremental:
+                sources = [(path, source) for path, source in ((train_file, 'train'), (test_file, 'test'))
+                           if os.path.exists(path)]
+                if not sources:
+                    logger.error("没有找到有效的简化版数据文件")
+                    return
+                self.incremental_import(sources, table_name, self.preprocess_abbreviated_data)
+                return
+
             # 先清空表数据
             connection = self.get_db_connection()
             cursor = connection.cursor()
-            cursor.execute("TRUNCATE TABLE py_happiness_survey")
+            cursor.execute(f"TRUNCATE TABLE {table_name}")
             connection.commit()
             cursor.close()
+            self.clear_import_state(table_name, connection)
             connection.close()
-            logger.info("已清空 py_happiness_survey 表")
-            # 读取训练数据
-            train_file = os.path.join(self.data_dir, 'happiness_train_abbr.csv')
-            test_file = os.path.join(self.data_dir, 'happiness_test_abbr.csv')
+            logger.info(f"已清空 {table_name} 表")
+
+            if self.streaming:
+                sources = [(path, source) for path, source in ((train_file, 'train'), (test_file, 'test'))
+                           if os.path.exists(path)]
+                if not sources:
+                    logger.error("没有找到有效的简化版数据文件")
+                    return
+                total = self.stream_import_files(sources, table_name, self.preprocess_abbreviated_data)
+                logger.info(f"简化版数据流式导入完成，共{total}条记录")
+                return
 
             if os.path.exists(train_file):
-                train_df = pd.read_csv(train_file, low_memory=False)
+                train_df = self.read_csv_file(train_file, low_memory=False)
                 train_clean = self.preprocess_abbreviated_data(train_df, 'train')
             else:
                 logger.warning(f"训练数据文件不存在: {train_file}")
                 train_clean = pd.DataFrame()
 
             if os.path.exists(test_file):
-                test_df = pd.read_csv(test_file, low_memory=False)
+                test_df = self.read_csv_file(test_file, low_memory=False)
                 test_clean = self.preprocess_abbreviated_data(test_df, 'test')
             else:
                 logger.warning(f"测试数据文件不存在: {test_file}")
@@ -438,7 +1066,7 @@ class HappinessDataImporter:
 
             # 连接数据库并插入数据
             with self.get_db_connection() as connection:
-                self.batch_insert_data(all_data, 'py_happiness_survey', connection)
+                self.insert_dataframe(all_data, table_name, connection)
 
             logger.info("简化版数据导入完成")
 
@@ -446,44 +1074,52 @@ class HappinessDataImporter:
             logger.error(f"导入简化版数据失败: {e}")
             raise e
 
-    def import_complete_data(self):
-        """导入完整版数据"""
+    def import_complete_data(self, table_name='py_happiness_survey_complete'):
+        """
+        导入完整版数据
+
+        Args:
+            table_name: 目标表（原子替换导入时为暂存表）
+        """
         logger.info("开始导入完整版数据...")
 
         try:
+            train_file = os.path.join(self.data_dir, 'happiness_train_complete.csv')
+            test_file = os.path.join(self.data_dir, 'happiness_test_complete.csv')
+
+            if self.incremental:
+                if not os.path.exists(train_file):
+                    logger.warning(f"完整版训练数据文件不存在: {train_file}")
+                    return
+                self.incremental_import([(train_file, 'train')], table_name,
+                                        self.preprocess_complete_data)
+                return
+
             # 先清空表数据
             connection = self.get_db_connection()
             cursor = connection.cursor()
-            cursor.execute("TRUNCATE TABLE py_happiness_survey_complete")
+            cursor.execute(f"TRUNCATE TABLE {table_name}")
             connection.commit()
             cursor.close()
+            self.clear_import_state(table_name, connection)
             connection.close()
-            logger.info("已清空 py_happiness_survey_complete 表")
+            logger.info(f"已清空 {table_name} 表")
 
-            # 读取完整版数据
-            train_file = os.path.join(self.data_dir, 'happiness_train_complete.csv')
-            test_file = os.path.join(self.data_dir, 'happiness_test_complete.csv')
+            if self.streaming:
+                if not os.path.exists(train_file):
+                    logger.warning(f"完整版训练数据文件不存在: {train_file}")
+                    return
+                total = self.stream_import_files([(train_file, 'train')], table_name,
+                                                 self.preprocess_complete_data)
+                logger.info(f"完整版数据流式导入完成，共{total}条记录")
+                return
 
-            # 尝试多种编码方式读取完整版数据
+            # 根据文件开头的字节样本识别编码，只做一次完整解析
             if os.path.exists(train_file):
-                encodings_to_try = ['utf-8', 'gbk', 'gb2312', 'cp1252', 'latin1']
-                train_df = None
-
-                for encoding in encodings_to_try:
-                    try:
-                        logger.info(f"尝试使用 {encoding} 编码读取完整版数据...")
-                        train_df = pd.read_csv(train_file, low_memory=False, encoding=encoding)
-                        logger.info(f"成功使用 {encoding} 编码读取数据")
-                        break
-                    except UnicodeDecodeError:
-                        logger.warning(f"{encoding} 编码读取失败，继续尝试其他编码...")
-                        continue
-                    except Exception as e:
-                        logger.warning(f"使用 {encoding} 编码读取时出现其他错误: {e}")
-                        continue
-
-                if train_df is None:
-                    logger.error("所有编码方式都无法读取完整版数据文件")
+                try:
+                    train_df = self.read_csv_file(train_file, low_memory=False)
+                except Exception as e:
+                    logger.error(f"读取完整版数据文件失败: {e}")
                     return
 
                 try:
@@ -497,7 +1133,7 @@ class HappinessDataImporter:
 
             # 连接数据库并插入数据
             with self.get_db_connection() as connection:
-                self.batch_insert_data(train_clean, 'py_happiness_survey_complete', connection)
+                self.insert_dataframe(train_clean, table_name, connection)
 
             logger.info("完整版数据导入完成")
 
@@ -505,38 +1141,43 @@ class HappinessDataImporter:
             logger.error(f"导入完整版数据失败: {e}")
             raise e
 
-    def create_indexes_and_constraints(self):
-        """创建额外的索引和约束"""
-        logger.info("开始创建额外的索引和约束...")
-
-        # 首先检查哪些索引不存在，然后只创建不存在的索引
-        check_index_sqls = [
-            ("idx_happiness_gender", "py_happiness_survey"),
-            ("idx_province_city", "py_happiness_survey"),
-            ("idx_edu_income", "py_happiness_survey"),
-            ("idx_marital_status", "py_happiness_survey"),
-            ("idx_complete_happiness_gender", "py_happiness_survey_complete"),
-            ("idx_complete_province_city", "py_happiness_survey_complete"),
-            ("idx_complete_edu_income", "py_happiness_survey_complete"),
-            ("idx_complete_marital", "py_happiness_survey_complete"),
-        ]
+    def create_indexes_and_constraints(self, table_names=None):
+        """
+        创建额外的索引和约束
 
-        create_index_sqls = [
-            "CREATE INDEX idx_happiness_gender ON py_happiness_survey(happiness, gender);",
-            "CREATE INDEX idx_province_city ON py_happiness_survey(province, city);",
-            "CREATE INDEX idx_edu_income ON py_happiness_survey(edu, income);",
-            "CREATE INDEX idx_marital_status ON py_happiness_survey(marital);",
-            "CREATE INDEX idx_complete_happiness_gender ON py_happiness_survey_complete(happiness, gender);",
-            "CREATE INDEX idx_complete_province_city ON py_happiness_survey_complete(province, city);",
-            "CREATE INDEX idx_complete_edu_income ON py_happiness_survey_complete(edu, income);",
-            "CREATE INDEX idx_complete_marital ON py_happiness_survey_complete(marital);",
+        Args:
+            table_names: 正式表名 -> 实际创建索引的表名（原子替换导入时为暂存表、基准测试时为测试表）；
+                传入时只处理其中的表，默认处理全部正式表
+        """
+        logger.info("开始创建额外的索引和约束...")
+        index_start = time.perf_counter()
+        table_names = table_names or {}
+
+        # 索引名、所属正式表、索引列；已存在的索引跳过
+        index_definitions = [
+            ("idx_happiness_gender", "py_happiness_survey", "happiness, gender"),
+            ("idx_province_city", "py_happiness_survey", "province, city"),
+            ("idx_edu_income", "py_happiness_survey", "edu, income"),
+            ("idx_marital_status", "py_happiness_survey", "marital"),
+            ("idx_complete_happiness_gender", "py_happiness_survey_complete", "happiness, gender"),
+            ("idx_complete_province_city", "py_happiness_survey_complete", "province, city"),
+            ("idx_complete_edu_income", "py_happiness_survey_complete", "edu, income"),
+            ("idx_complete_marital", "py_happiness_survey_complete", "marital"),
         ]
 
         with self.get_db_connection() as connection:
             cursor = connection.cursor()
 
+            # 先恢复暂存表上延后创建的原有索引
+            for table_name in table_names.values():
+                self.build_deferred_indexes(table_name, cursor)
+
             # 检查并创建索引
-            for (index_name, table_name), create_sql in zip(check_index_sqls, create_index_sqls):
+            for index_name, live_table, columns in index_definitions:
+                if table_names and live_table not in table_names:
+                    continue
+                table_name = table_names.get(live_table, live_table)
+                create_sql = f"CREATE INDEX {index_name} ON {table_name}({columns});"
                 try:
                     # 首先尝试直接创建索引，如果已存在会报错
                     cursor.execute(create_sql)
@@ -550,7 +1191,7 @@ class HappinessDataImporter:
                         logger.warning(f"创建索引失败 {index_name}: {e}")
                         # 尝试使用ALTER TABLE方式创建
                         try:
-                            alt_create_sql = create_sql.replace('CREATE INDEX', f'ALTER TABLE {table_name} ADD INDEX')
+                            alt_create_sql = f"ALTER TABLE {table_name} ADD INDEX {index_name}({columns});"
                             cursor.execute(alt_create_sql)
                             connection.commit()
                             logger.info(f"使用ALTER TABLE成功创建索引: {index_name}")
@@ -559,33 +1200,543 @@ class HappinessDataImporter:
 
             cursor.close()
 
+        self.profiler.add('index', time.perf_counter() - index_start)
+
+    def prepare_staging_table(self, live_table):
+        """
+        按正式表结构创建空的暂存表，并先删除其中的非唯一二级索引（记录定义，导入完成后再统一创建），
+        避免逐批写入时维护索引
+
+        Returns:
+            str: 暂存表名
+        """
+        staging_table = f"{live_table}_staging"
+        with self.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+                cursor.execute(f"CREATE TABLE {staging_table} LIKE {live_table}")
+                cursor.execute(f"SHOW INDEX FROM {staging_table} WHERE Non_unique = 1")
+                indexes = {}
+                for row in cursor.fetchall():
+                    column = f"`{row['Column_name']}`"
+                    if row.get('Sub_part'):
+                        column += f"({row['Sub_part']})"
+                    index = indexes.setdefault(row['Key_name'], {'type': row['Index_type'], 'columns': []})
+                    index['columns'].append((row['Seq_in_index'], column))
+
+                deferred = []
+                for name, index in indexes.items():
+                    columns = ', '.join(col for _, col in sorted(index['columns']))
+                    kind = 'FULLTEXT INDEX' if index['type'] == 'FULLTEXT' else 'INDEX'
+                    deferred.append(f"ADD {kind} `{name}` ({columns})")
+                if deferred:
+                    cursor.execute(f"ALTER TABLE {staging_table} " +
+                                   ', '.join(f"DROP INDEX `{name}`" for name in indexes))
+
+                cursor.execute("""
+                    SELECT COLUMN_NAME, DATA_TYPE, NUMERIC_SCALE FROM INFORMATION_SCHEMA.COLUMNS
+                    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s
+                    ORDER BY ORDINAL_POSITION
+                """, (staging_table,))
+                self.checksum_columns[staging_table] = [
+                    (row['COLUMN_NAME'], row['DATA_TYPE'].lower(), row['NUMERIC_SCALE'])
+                    for row in cursor.fetchall() if row['DATA_TYPE'].lower() in CHECKSUM_TYPES
+                ]
+            connection.commit()
+
+        self.deferred_indexes[staging_table] = deferred
+        logger.info(f"已创建暂存表 {staging_table}，延后创建{len(deferred)}个二级索引")
+        return staging_table
+
+    def build_deferred_indexes(self, table_name, cursor):
+        """用一条 ALTER TABLE 一次性创建暂存表上延后的二级索引"""
+        deferred = self.deferred_indexes.pop(table_name, None)
+        if not deferred:
+            return
+        start_time = time.perf_counter()
+        cursor.execute(f"ALTER TABLE {table_name} " + ', '.join(deferred))
+        logger.info(f"已在 {table_name} 上创建{len(deferred)}个二级索引，"
+                    f"耗时{time.perf_counter() - start_time:.2f}秒")
+
+    def column_checksum(self, series, data_type):
+        """
+        按列向量化计算一列的校验值 (非空个数, 求和, 异或)，与 checksum_sql 中 MySQL 的聚合结果对应：
+        整数列为值本身的和与异或；浮点数和 DECIMAL 列只比较和（允许舍入误差，见 validate_staging_table）；
+        日期时间和文本列为每个值 CRC32 的和与异或
+        """
+        values = series.dropna()
+        if values.empty:
+            return [0, 0, 0]
+        if data_type in CHECKSUM_INT_TYPES:
+            numbers = values.to_numpy()
+            if numbers.dtype.kind == 'f':
+                # 写入整数列时 MySQL 对小数四舍五入（远离0）
+                numbers = np.sign(numbers) * np.floor(np.abs(numbers) + 0.5)
+            numbers = numbers.astype(np.int64)
+            return [len(numbers), int(numbers.sum()), int(np.bitwise_xor.reduce(numbers)) & CHECKSUM_MASK]
+        if data_type in CHECKSUM_APPROX_TYPES:
+            numbers = pd.to_numeric(values).to_numpy(dtype=np.float64)
+            if data_type == 'float':
+                numbers = numbers.astype(np.float32).astype(np.float64)
+            return [len(numbers), float(numbers.sum()), 0]
+        if data_type in CHECKSUM_DATE_TYPES:
+            text = pd.to_datetime(values, format='mixed').dt.strftime('%Y-%m-%d' if data_type == 'date' else '%Y-%m-%d %H:%M:%S')
+        else:
+            text = values.astype(str)
+            if data_type == 'char':
+                text = text.str.rstrip(' ')  # CHAR 列读取时去掉末尾空格
+        crcs = np.fromiter((zlib.crc32(value.encode('utf-8')) for value in text), dtype=np.int64, count=len(text))
+        return [len(crcs), int(crcs.sum()), int(np.bitwise_xor.reduce(crcs))]
+
+    def checksum_sql(self, columns):
+        """MySQL 端各列的校验聚合表达式（与 column_checksum 对应），第 i 列的三个值命名为 ci_n、ci_s、ci_x"""
+        expressions = []
+        for i, (column, data_type, _) in enumerate(columns):
+            if data_type in CHECKSUM_INT_TYPES:
+                value, xor = f"`{column}`", f"BIT_XOR(`{column}`)"
+            elif data_type in CHECKSUM_APPROX_TYPES:
+                value, xor = f"`{column}`", "0"
+            else:
+                value = f"CRC32(CAST(`{column}` AS CHAR))"
+                xor = f"BIT_XOR({value})"
+            expressions.append(f"COUNT(`{column}`) AS c{i}_n, COALESCE(SUM({value}), 0) AS c{i}_s, {xor} AS c{i}_x")
+        return ', '.join(expressions)
+
+    def record_loaded_rows(self, df, table_name):
+        """
+        累计写入每张表的行数和 id 校验值；暂存表还按列累计非空个数、和与异或（见 column_checksum），
+        用于原子替换前校验暂存表的内容与清洗后的数据一致，不一致时能指出是哪一列
+        """
+        ids = df['id'].to_numpy(dtype=np.int64)
+        checksums = {}
+        columns = self.checksum_columns.get(table_name)
+        if columns:
+            # 只校验本次导入写入的列（createTime 等由数据库默认值填充的列不参与）
+            columns = [column for column in columns if column[0] in df.columns]
+            with self.stats_lock:
+                self.checksum_columns[table_name] = columns
+            checksums = {column: self.column_checksum(df[column], data_type) for column, data_type, _ in columns}
+
+        with self.stats_lock:
+            stats = self.loaded_stats.setdefault(table_name, {'total': 0, 'idSum': 0, 'idXor': 0, 'columns': {}})
+            stats['total'] += len(ids)
+            stats['idSum'] += int(ids.sum())
+            stats['idXor'] ^= int(np.bitwise_xor.reduce(ids)) if len(ids) else 0
+            for column, (count, total, xor) in checksums.items():
+                target = stats['columns'].setdefault(column, [0, 0, 0])
+                target[0] += count
+                target[1] += total
+                target[2] ^= xor
+
+    def validate_staging_table(self, staging_table):
+        """
+        校验暂存表：行数、SUM(id)、BIT_XOR(id) 以及各列的非空个数、和与异或
+        都需与本次写入的清洗后数据一致（浮点数和 DECIMAL 列的和允许舍入误差），且不能为空
+
+        Raises:
+            ValueError: 校验失败（列出不一致的列）
+        """
+        expected = self.loaded_stats.get(staging_table, {'total': 0, 'idSum': 0, 'idXor': 0, 'columns': {}})
+        columns = self.checksum_columns.get(staging_table) or []
+        column_sql = f", {self.checksum_sql(columns)}" if columns else ''
+
+        with self.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"""
+                    SELECT COUNT(*) AS total, COALESCE(SUM(id), 0) AS idSum, COALESCE(BIT_XOR(id), 0) AS idXor
+                           {column_sql}
+                    FROM {staging_table}
+                """)
+                row = cursor.fetchone()
+
+        if int(row['total']) == 0:
+            raise ValueError(f"暂存表 {staging_table} 为空")
+        mismatches = [f"{key}: 预期{expected[key]}，实际{int(row[key])}"
+                      for key in ('total', 'idSum', 'idXor') if int(row[key]) != expected[key]]
+        for i, (column, data_type, scale) in enumerate(columns):
+            count, total, xor = expected['columns'].get(column, [0, 0, 0])
+            actual = [int(row[f'c{i}_n']), row[f'c{i}_s'], int(row[f'c{i}_x'])]
+            if data_type in CHECKSUM_APPROX_TYPES:
+                # 浮点数的求和顺序不同、DECIMAL 写入时按小数位数舍入，和只需在误差范围内一致
+                tolerance = count * 10 ** -(scale if data_type == 'decimal' and scale else 6)
+                same_total = math.isclose(float(actual[1]), total, rel_tol=1e-9, abs_tol=tolerance)
+            else:
+                same_total = int(actual[1]) == total
+            if actual[0] != count or not same_total or actual[2] != xor:
+                mismatches.append(f"{column}({data_type}): 预期{[count, total, xor]}，实际{actual}")
+        if mismatches:
+            raise ValueError(f"暂存表 {staging_table} 校验失败: " + '; '.join(mismatches))
+        logger.info(f"暂存表 {staging_table} 校验通过: {int(row['total'])}行，{len(columns)}列")
+
+    def swap_staging_table(self, live_table, staging_table):
+        """用一条 RENAME TABLE 原子地替换正式表，读请求只会看到替换前或替换后的完整数据"""
+        old_table = f"{live_table}_old"
+        with self.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {old_table}")
+                cursor.execute(f"RENAME TABLE {live_table} TO {old_table}, {staging_table} TO {live_table}")
+                cursor.execute(f"DROP TABLE {old_table}")
+            connection.commit()
+            # 正式表的数据已整体替换，增量导入状态随之失效
+            self.clear_import_state(live_table, connection)
+        logger.info(f"已用 {staging_table} 原子替换 {live_table}")
+
+    def drop_staging_table(self, staging_table):
+        """导入或校验失败时删除暂存表，正式表保持不变"""
+        self.deferred_indexes.pop(staging_table, None)
+        self.checksum_columns.pop(staging_table, None)
+        with self.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                cursor.execute(f"DROP TABLE IF EXISTS {staging_table}")
+            connection.commit()
+        logger.warning(f"已删除暂存表 {staging_table}，{staging_table[:-len('_staging')]} 保持不变")
+
+    @staticmethod
+    def next_record_boundary(f, target, block_size, block_quotes):
+        """
+        返回 target 之后第一个不在引号内的换行符的下一个字节位置（找不到时返回 None）
+
+        Args:
+            f: 以二进制方式打开的CSV文件
+            target: 估算的切分位置
+            block_size: 扫描文件时的数据块大小
+            block_quotes: 每个数据块中的双引号个数（从文件开头算起，用于判断换行符是否在引号内）
+        """
+        index = target // block_size
+        quotes = sum(block_quotes[:index])
+        while index < len(block_quotes):
+            f.seek(index * block_size)
+            block = f.read(block_size)
+            pos = block.find(b'\n', max(target - index * block_size, 0))
+            while pos != -1:
+                if (quotes + block.count(b'"', 0, pos)) % 2 == 0:
+                    return index * block_size + pos + 1
+                pos = block.find(b'\n', pos + 1)
+            quotes += block_quotes[index]
+            index += 1
+        return None
+
+    def split_csv_file(self, file_path, encoding):
+        """
+        把CSV文件表头之后的数据按字节偏移切成约 split_rows 行一段：先按平均行长估算切分点，
+        再把切分点后移到第一个不在引号内的换行符之后，保证每段都由完整的记录组成
+        （字段内含换行时也不会把一条记录拆开）
+
+        Returns:
+            list: [(起始字节, 结束字节), ...]，首尾相接覆盖表头之后的全部数据
+        """
+        block_size = 1024 * 1024
+        newlines, block_quotes = 0, []
+        with open(file_path, 'rb') as f:
+            header_end = len(f.readline())
+            size = os.fstat(f.fileno()).st_size
+            f.seek(0)
+            for block in iter(lambda: f.read(block_size), b''):
+                newlines += block.count(b'\n')
+                block_quotes.append(block.count(b'"'))
+
+            parts = -(-max(newlines - 1, 0) // self.split_rows)
+            # UTF-16 中换行符和引号不是单字节，不能按字节切分
+            if parts <= 1 or encoding.lower().startswith('utf-16'):
+                return [(header_end, size)]
+
+            bounds = [header_end]
+            for k in range(1, parts):
+                target = max(header_end + (size - header_end) * k // parts, bounds[-1])
+                boundary = self.next_record_boundary(f, target, block_size, block_quotes)
+                if boundary is None or boundary >= size:
+                    break
+                if boundary > bounds[-1]:
+                    bounds.append(boundary)
+            bounds.append(size)
+        return list(zip(bounds, bounds[1:]))
+
+    def plan_parse_tasks(self, sources):
+        """
+        生成解析任务：超过 split_rows 行的文件按字节区间拆分，解析进程直接定位到自己的区间读取
+        （不需要像 skiprows 那样每个任务都从文件开头逐行跳过）
+
+        Args:
+            sources: [(文件路径, 数据来源标识, 数据类型 'abbr'/'complete', 目标表), ...]
+
+        Returns:
+            list: [(文件路径, 数据来源标识, 数据类型, 目标表, 起始字节, 结束字节, 编码), ...]
+        """
+        tasks = []
+        for file_path, data_source, kind, table_name in sources:
+            encoding = detect_encoding(file_path)
+            for byte_start, byte_end in self.split_csv_file(file_path, encoding):
+                tasks.append((file_path, data_source, kind, table_name, byte_start, byte_end, encoding))
+        return tasks
+
+    def run_parallel_import(self, table_names=None):
+        """
+        并行导入：解析进程池按文件/字节区间读取并清洗，每完成一个区间就按 chunk_size 分块
+        提交给写入线程池（每个线程持有独立的数据库连接），总耗时取决于最慢的文件而非各文件之和。
+
+        Args:
+            table_names: 正式表名 -> 实际写入的表名（原子替换导入时为暂存表），默认写入正式表
+
+        Returns:
+            dict: 导入失败的完整版正式表名 -> 异常（简化版数据失败时直接抛出）
+        """
+        table_names = table_names or {}
+        abbr_table = table_names.get('py_happiness_survey', 'py_happiness_survey')
+        complete_table = table_names.get('py_happiness_survey_complete', 'py_happiness_survey_complete')
+
+        sources = []
+        for file_name, data_source in (('happiness_train_abbr.csv', 'train'), ('happiness_test_abbr.csv', 'test')):
+            file_path = os.path.join(self.data_dir, file_name)
+            if os.path.exists(file_path):
+                sources.append((file_path, data_source, 'abbr', abbr_table))
+            else:
+                logger.warning(f"数据文件不存在: {file_path}")
+        complete_file = os.path.join(self.data_dir, 'happiness_train_complete.csv')
+        if os.path.exists(complete_file):
+            sources.append((complete_file, 'train', 'complete', complete_table))
+        else:
+            logger.warning(f"完整版训练数据文件不存在: {complete_file}")
+        if not any(kind == 'abbr' for _, _, kind, _ in sources):
+            raise ValueError("没有找到有效的简化版数据文件")
+
+        # 先清空目标表
+        with self.get_db_connection() as connection:
+            with connection.cursor() as cursor:
+                for table_name in {table for _, _, _, table in sources}:
+                    cursor.execute(f"TRUNCATE TABLE {table_name}")
+                    self.clear_import_state(table_name, connection)
+                    logger.info(f"已清空 {table_name} 表")
+            connection.commit()
+
+        tasks = self.plan_parse_tasks(sources)
+        self.profiler.add('decode', 0.0, nbytes=sum(os.path.getsize(path) for path, _, _, _ in sources))
+        timings = {'parse_tasks': [], 'write': {}, 'failed': {}}
+        local = threading.local()
+        connections = []
+        connections_lock = threading.Lock()
+
+        def write_chunk(chunk, table_name):
+            connection = getattr(local, 'connection', None)
+            if connection is None:
+                connection = self.get_db_connection()
+                local.connection = connection
+                with connections_lock:
+                    connections.append(connection)
+            start = time.perf_counter()
+            inserted = self.insert_dataframe(chunk, table_name, connection, verify_table_count=False)
+            return table_name, inserted, time.perf_counter() - start
+
+        start_time = time.perf_counter()
+        parse_workers = self.parse_workers or os.cpu_count() or 1
+        logger.info(f"并行导入: {len(tasks)}个解析任务，{min(parse_workers, len(tasks))}个解析进程，"
+                    f"{self.writer_connections}个写入连接")
+        write_futures = {}
+        try:
+            with ThreadPoolExecutor(max_workers=self.writer_connections,
+                                    thread_name_prefix='import-writer') as writers:
+                try:
+                    with ProcessPoolExecutor(max_workers=min(parse_workers, len(tasks))) as parsers:
+                        parse_futures = {parsers.submit(_parse_clean_task, *task): task for task in tasks}
+                        for future in as_completed(parse_futures):
+                            kind, table_name = parse_futures[future][2:4]
+                            try:
+                                df, task_timing = future.result()
+                            except Exception as e:
+                                if kind == 'abbr':
+                                    raise
+                                logger.warning(f"完整版数据解析失败，跳过: {e}")
+                                timings['failed'][table_name] = e
+                                continue
+                            timings['parse_tasks'].append(task_timing)
+                            self.profiler.merge(task_timing['profile'])
+                            self.profiler.add_worker_peak(task_timing['pid'], task_timing['peak_rss'])
+                            if table_name in timings['failed']:
+                                continue
+                            for offset in range(0, len(df), self.chunk_size):
+                                chunk = df.iloc[offset:offset + self.chunk_size]
+                                write_futures[writers.submit(write_chunk, chunk, table_name)] = table_name
+                    timings['parse_wall'] = time.perf_counter() - start_time
+
+                    for future in as_completed(write_futures):
+                        table_name = write_futures[future]
+                        try:
+                            _, inserted, elapsed = future.result()
+                        except Exception as e:
+                            if table_name == abbr_table:
+                                raise
+                            logger.warning(f"完整版数据写入失败，跳过: {e}")
+                            timings['failed'][table_name] = e
+                            continue
+                        stats = timings['write'].setdefault(table_name, {'rows': 0, 'seconds': 0.0, 'batches': 0})
+                        stats['rows'] += inserted
+                        stats['seconds'] += elapsed
+                        stats['batches'] += 1
+                except Exception:
+                    # 出错后不再等待尚未开始的写入任务
+                    for future in write_futures:
+                        future.cancel()
+                    raise
+        finally:
+            for connection in connections:
+                connection.close()
+
+        timings['total_wall'] = time.perf_counter() - start_time
+        self.log_timing_report(timings)
+        live_names = {target: live for live, target in table_names.items()}
+        return {live_names.get(table, table): error for table, error in timings['failed'].items()}
+
+    def log_timing_report(self, timings):
+        """输出并行导入的分阶段耗时报告"""
+        logger.info("=" * 60)
+        logger.info("并行导入耗时报告")
+        for task in sorted(timings['parse_tasks'], key=lambda t: (t['file'], t['byte_start'])):
+            logger.info(f"  解析 {task['file']} 第{task['byte_start']}字节起 {task['rows']}行: "
+                        f"读取{task['read']:.2f}s 清洗{task['clean']:.2f}s (pid {task['pid']})")
+        read_total = sum(t['read'] for t in timings['parse_tasks'])
+        clean_total = sum(t['clean'] for t in timings['parse_tasks'])
+        logger.info(f"  读取合计{read_total:.2f}s，清洗合计{clean_total:.2f}s，"
+                    f"解析阶段实际耗时{timings.get('parse_wall', 0):.2f}s")
+        for table_name, stats in timings['write'].items():
+            logger.info(f"  写入 {table_name}: {stats['rows']}行 {stats['batches']}批，"
+                        f"连接耗时合计{stats['seconds']:.2f}s")
+        for table_name, error in timings['failed'].items():
+            logger.info(f"  失败 {table_name}: {error}")
+        logger.info(f"  总耗时{timings['total_wall']:.2f}s")
+        logger.info("=" * 60)
+
     def run_import(self):
         """运行完整的数据导入流程"""
         start_time = datetime.now()
         logger.info("开始幸福感数据集导入流程...")
+        self.profiler.reset()
+
+        if self.atomic_swap and self.incremental:
+            logger.info("增量导入直接更新正式表，不使用暂存表替换")
+        use_staging = self.atomic_swap and not self.incremental
 
         try:
-            # 导入简化版数据
-            self.import_abbreviated_data()
+            if use_staging:
+                self.run_staged_import()
+            elif self.parallel and not self.incremental:
+                failed = self.run_parallel_import()
+                # 失败的表在导入开始时已被清空，只写入了一部分数据，清空后明确报告，避免留下残缺的数据
+                if failed:
+                    with self.get_db_connection() as connection:
+                        with connection.cursor() as cursor:
+                            for table_name, error in failed.items():
+                                cursor.execute(f"TRUNCATE TABLE {table_name}")
+                                logger.error(f"{table_name} 导入失败，已清空残缺数据: {error}")
+                        connection.commit()
+                self.create_indexes_and_constraints()
+            else:
+                # 导入简化版数据
+                self.import_abbreviated_data()
 
-            # 尝试导入完整版数据
-            try:
-                self.import_complete_data()
-            except Exception as e:
-                logger.warning(f"完整版数据导入失败，跳过: {e}")
+                # 尝试导入完整版数据
+                try:
+                    self.import_complete_data()
+                except Exception as e:
+                    logger.warning(f"完整版数据导入失败，跳过: {e}")
 
-            # 创建额外的索引
-            self.create_indexes_and_constraints()
+                # 创建额外的索引
+                self.create_indexes_and_constraints()
 
             end_time = datetime.now()
             duration = (end_time - start_time).total_seconds()
 
             logger.info(f"数据导入流程完成，总耗时: {duration:.2f}秒")
+            self.profiler.report()
 
         except Exception as e:
             logger.error(f"数据导入流程失败: {e}")
             raise e
 
+    def run_staged_import(self):
+        """
+        原子替换导入：数据先写入暂存表并在其上建索引，校验通过后用 RENAME TABLE 替换正式表，
+        导入过程中正式表始终保持上一版的完整数据
+        """
+        self.loaded_stats = {}
+        staging = {
+            'py_happiness_survey': self.prepare_staging_table('py_happiness_survey')
+        }
+        if self.parallel:
+            try:
+                staging['py_happiness_survey_complete'] = self.prepare_staging_table('py_happiness_survey_complete')
+                failed = self.run_parallel_import(staging)
+            except Exception:
+                for staging_table in staging.values():
+                    self.drop_staging_table(staging_table)
+                raise
+            for live_table in failed:
+                self.drop_staging_table(staging.pop(live_table))
+        else:
+            try:
+                self.import_abbreviated_data(staging['py_happiness_survey'])
+            except Exception:
+                self.drop_staging_table(staging['py_happiness_survey'])
+                raise
+
+            # 完整版数据失败时跳过，不影响简化版数据的替换
+            try:
+                staging['py_happiness_survey_complete'] = self.prepare_staging_table('py_happiness_survey_complete')
+                self.import_complete_data(staging['py_happiness_survey_complete'])
+            except Exception as e:
+                logger.warning(f"完整版数据导入失败，跳过: {e}")
+                if 'py_happiness_survey_complete' in staging:
+                    self.drop_staging_table(staging.pop('py_happiness_survey_complete'))
+
+        # 在已写满数据的暂存表上建索引
+        self.create_indexes_and_constraints(staging)
+
+        for live_table, staging_table in staging.items():
+            try:
+                self.validate_staging_table(staging_table)
+            except Exception as e:
+                logger.error(f"{e}，放弃替换 {live_table}")
+                self.drop_staging_table(staging_table)
+                if live_table == 'py_happiness_survey':
+                    raise
+                continue
+            self.swap_staging_table(live_table, staging_table)
+
+
+def _parse_clean_task(file_path, data_source, kind, table_name, byte_start, byte_end, encoding):
+    """
+    解析进程中执行的任务：读取CSV的一个字节区间（拼上表头）并清洗（需为模块级函数才能被子进程调用）
+
+    Returns:
+        tuple: (清洗后的数据框, 耗时信息)
+    """
+    importer = HappinessDataImporter()
+    start = time.perf_counter()
+    with open(file_path, 'rb') as f:
+        header = f.readline()
+        f.seek(byte_start)
+        data = f.read(byte_end - byte_start)
+    df = pd.read_csv(io.BytesIO(header + data), low_memory=False, encoding=encoding)
+    read_seconds = time.perf_counter() - start
+    # 文件读取与解码解析合在一起计时，统一计入 decode 阶段
+    importer.profiler.add('decode', read_seconds, len(df))
+
+    start = time.perf_counter()
+    preprocess = importer.preprocess_abbreviated_data if kind == 'abbr' else importer.preprocess_complete_data
+    df = preprocess(df, data_source, copy=False)
+    clean_seconds = time.perf_counter() - start
+
+    snapshot = importer.profiler.snapshot()
+    return df, {
+        'profile': snapshot['stages'],
+        'peak_rss': snapshot['peak_rss_bytes'],
+        'file': os.path.basename(file_path),
+        'table': table_name,
+        'byte_start': byte_start,
+        'rows': len(df),
+        'read': read_seconds,
+        'clean': clean_seconds,
+        'pid': os.getpid()
+    }
+
 
 def main():
     """主函数"""
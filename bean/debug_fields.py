@@ -4,9 +4,10 @@
 调试字段映射问题
 """
 
-import pandas as pd
 import os
 
+from csv_encoding import detect_encoding, read_csv_auto
+
 def check_field_mapping():
     """检查字段映射是否完整"""
 
@@ -18,20 +19,12 @@ def check_field_mapping():
         print("完整版训练数据文件不存在")
         return
 
-    # 尝试多种编码
-    encodings_to_try = ['utf-8', 'gbk', 'gb2312']
-    df = None
-
-    for encoding in encodings_to_try:
-        try:
-            df = pd.read_csv(train_file, nrows=5, encoding=encoding)  # 只读取前5行来检查列名
-            print(f"成功使用 {encoding} 编码读取数据")
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if df is None:
-        print("无法读取完整版数据文件")
+    # 自动识别编码
+    try:
+        df = read_csv_auto(train_file, nrows=5)  # 只读取前5行来检查列名
+        print(f"成功使用 {detect_encoding(train_file)} 编码读取数据")
+    except Exception as e:
+        print(f"无法读取完整版数据文件: {e}")
         return
 
     print(f"\n完整版数据列数: {len(df.columns)}")
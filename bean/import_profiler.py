@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+数据导入分阶段性能统计
+按阶段（read / decode / clean / map / serialize / insert / index）累计耗时、行数和字节数，
+输出每个阶段的 行/秒、字节/秒 以及进程峰值内存（RSS），并行导入时另外统计解析子进程的峰值内存。
+"""
+
+import logging
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+# 报告中各阶段的输出顺序
+STAGES = ('read', 'decode', 'clean', 'map', 'serialize', 'insert', 'index')
+
+
+def peak_rss_bytes(children=False):
+    """
+    峰值内存（字节），平台不支持时返回 None
+
+    Args:
+        children: 为 True 时返回已结束的子进程中峰值最大的一个（RUSAGE_CHILDREN 不是各子进程之和）
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class _StageRecord:
+    """stage() 上下文中可在结束前补充行数和字节数"""
+
+    def __init__(self, rows=0, nbytes=0):
+        self.rows = rows
+        self.bytes = nbytes
+
+
+class ImportProfiler:
+    """分阶段统计器（线程安全，并行导入的写入线程可同时记录）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.stages = {}
+            self.worker_peaks = {}  # 解析子进程pid -> 峰值内存（字节）
+            self.started = time.perf_counter()
+
+    def add(self, stage, seconds, rows=0, nbytes=0):
+        """累计一个阶段的耗时、行数和字节数"""
+        with self._lock:
+            stats = self.stages.setdefault(stage, {'seconds': 0.0, 'rows': 0, 'bytes': 0, 'calls': 0})
+            stats['seconds'] += seconds
+            stats['rows'] += rows
+            stats['bytes'] += nbytes
+            stats['calls'] += 1
+
+    @contextmanager
+    def stage(self, stage, rows=0, nbytes=0):
+        """计时上下文：with profiler.stage('clean', rows=len(df)): ..."""
+        record = _StageRecord(rows, nbytes)
+        start = time.perf_counter()
+        try:
+            yield record
+        finally:
+            self.add(stage, time.perf_counter() - start, record.rows, record.bytes)
+
+    def merge(self, stages):
+        """合并其他进程（并行导入的解析进程）返回的统计"""
+        for stage, stats in stages.items():
+            with self._lock:
+                target = self.stages.setdefault(stage, {'seconds': 0.0, 'rows': 0, 'bytes': 0, 'calls': 0})
+                for key in target:
+                    target[key] += stats[key]
+
+    def add_worker_peak(self, pid, peak):
+        """记录子进程上报的峰值内存（同一进程多次上报时取最大值）"""
+        if peak is None:
+            return
+        with self._lock:
+            self.worker_peaks[pid] = max(self.worker_peaks.get(pid, 0), peak)
+
+    def snapshot(self):
+        """返回可序列化的统计结果"""
+        with self._lock:
+            stages = {}
+            for stage in sorted(self.stages, key=lambda s: STAGES.index(s) if s in STAGES else len(STAGES)):
+                stats = dict(self.stages[stage])
+                seconds = stats['seconds']
+                stats['rows_per_second'] = round(stats['rows'] / seconds, 1) if seconds > 0 and stats['rows'] else None
+                stats['bytes_per_second'] = round(stats['bytes'] / seconds, 1) if seconds > 0 and stats['bytes'] else None
+                stats['seconds'] = round(seconds, 4)
+                stages[stage] = stats
+            peak = peak_rss_bytes()
+            # 只在有子进程上报时统计子进程内存（否则 RUSAGE_CHILDREN 只反映无关的短命子进程），
+            # 并参考 RUSAGE_CHILDREN 兜底已结束但最后一次上报之后内存又增长的子进程
+            worker_peaks = list(self.worker_peaks.values())
+            worker_peak = max(worker_peaks + [peak_rss_bytes(children=True) or 0]) if worker_peaks else None
+            # 各子进程的峰值不一定同时出现，合计值是整个导入占用内存的上限
+            total_peak = peak + sum(worker_peaks) if peak is not None else None
+            return {
+                'stages': stages,
+                'wall_seconds': round(time.perf_counter() - self.started, 4),
+                'peak_rss_bytes': peak,
+                'worker_peak_rss_bytes': worker_peak,
+                'total_peak_rss_bytes': total_peak
+            }
+
+    def report(self, title="导入分阶段耗时"):
+        """输出分阶段统计报告，并返回 snapshot() 的结果"""
+        result = self.snapshot()
+        logger.info("=" * 60)
+        logger.info(title)
+        logger.info(f"  {'阶段':<10}{'耗时(s)':>10}{'行数':>12}{'行/秒':>12}{'MB':>10}{'MB/秒':>10}")
+        for stage, stats in result['stages'].items():
+            rows_per_second = f"{stats['rows_per_second']:.0f}" if stats['rows_per_second'] else '-'
+            megabytes = f"{stats['bytes'] / 1024 / 1024:.2f}" if stats['bytes'] else '-'
+            mb_per_second = f"{stats['bytes_per_second'] / 1024 / 1024:.2f}" if stats['bytes_per_second'] else '-'
+            logger.info(f"  {stage:<12}{stats['seconds']:>10.3f}{stats['rows']:>12}{rows_per_second:>12}"
+                        f"{megabytes:>10}{mb_per_second:>10}")
+        peak = result['peak_rss_bytes']
+        logger.info(f"  总耗时{result['wall_seconds']:.2f}s，进程峰值内存"
+                    f"{f'{peak / 1024 / 1024:.1f}MB' if peak else '未知'}")
+        if result['worker_peak_rss_bytes']:
+            logger.info(f"  子进程单个峰值内存"
+                        f"{result['worker_peak_rss_bytes'] / 1024 / 1024:.1f}MB，"
+                        f"主进程与子进程合计不超过{result['total_peak_rss_bytes'] / 1024 / 1024:.1f}MB")
+        logger.info("=" * 60)
+        return result
@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+调查表索引建议工具
+读取应用记录的查询筛选组合（utils/filter_usage.py 写入的 JSON Lines 文件），按使用次数排序，
+对每个组合的示例SQL执行 EXPLAIN，找出全表扫描、filesort、临时表，并建议复合索引或覆盖索引：
+    - 列表查询（ORDER BY id）：索引只包含等值筛选列（按区分度从高到低），InnoDB 二级索引隐含主键，
+      按 id 排序不再需要 filesort；
+    - 聚合分析查询：以分组列开头、包含查询涉及的全部列的覆盖索引，不再回表。
+指定 --create 时在本地数据库中创建建议的索引，并输出创建前后的查询耗时对比。
+
+用法：
+    python index_advisor.py                       # 只分析并输出建议
+    python index_advisor.py --create --runs 10    # 创建建议的索引并对比前后耗时
+    python index_advisor.py --endpoint survey.list --output advisor_report.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+import pymysql
+
+# 添加项目根目录到Python路径
+project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_root)
+
+from config.config import DB_CONFIG, FILTER_USAGE_FILE
+
+MAX_INDEX_COLUMNS = 5
+
+
+def load_usage(path, endpoint_prefix=None):
+    """汇总筛选组合记录：相同组合累加次数，保留最新的示例SQL"""
+    combos = {}
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if endpoint_prefix and not record['endpoint'].startswith(endpoint_prefix):
+                continue
+            key = (record['endpoint'], record['table'], tuple(record['equality']),
+                   tuple(record['order']), tuple(record['columns']))
+            entry = combos.setdefault(key, {'count': 0})
+            entry['count'] += record['count']
+            entry['sql'] = record['sql']
+            entry['params'] = record['params']
+    return sorted(
+        ({'endpoint': k[0], 'table': k[1], 'equality': list(k[2]), 'order': list(k[3]),
+          'columns': list(k[4]), **v} for k, v in combos.items()),
+        key=lambda combo: combo['count'], reverse=True
+    )
+
+
+def get_indexes(cursor, table):
+    """表上现有索引：索引名 -> 列列表"""
+    cursor.execute(f"SHOW INDEX FROM {table}")
+    indexes = {}
+    for row in sorted(cursor.fetchall(), key=lambda r: (r['Key_name'], r['Seq_in_index'])):
+        indexes.setdefault(row['Key_name'], []).append(row['Column_name'])
+    return indexes
+
+
+def column_cardinality(cursor, table, column, cache):
+    """列的不同值个数（用于决定复合索引中等值列的顺序）"""
+    if (table, column) not in cache:
+        cursor.execute(f"SELECT COUNT(DISTINCT {column}) AS n FROM {table}")
+        cache[(table, column)] = cursor.fetchone()['n']
+    return cache[(table, column)]
+
+
+def explain(cursor, sql, params):
+    """执行 EXPLAIN，返回计划和发现的问题"""
+    cursor.execute(f"EXPLAIN {sql}", params)
+    plan = cursor.fetchall()
+    problems = []
+    for row in plan:
+        extra = row.get('Extra') or ''
+        if row.get('type') == 'ALL':
+            problems.append(f"{row.get('table')} 全表扫描")
+        if 'filesort' in extra:
+            problems.append('filesort')
+        if 'temporary' in extra:
+            problems.append('临时表')
+    summary = [{'table': row.get('table'), 'type': row.get('type'), 'key': row.get('key'),
+                'rows': row.get('rows'), 'extra': row.get('Extra')} for row in plan]
+    return summary, sorted(set(problems))
+
+
+def benchmark(cursor, sql, params, runs):
+    """执行 runs 次查询，返回耗时中位数（毫秒）"""
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        cursor.execute(sql, params)
+        cursor.fetchall()
+        timings.append((time.perf_counter() - start) * 1000)
+    return round(statistics.median(timings), 2)
+
+
+def propose_index(cursor, combo, cardinality_cache):
+    """根据筛选组合给出建议的索引列，不需要索引时返回 None"""
+    table = combo['table']
+    if combo['order']:
+        columns = sorted(combo['equality'],
+                         key=lambda c: column_cardinality(cursor, table, c, cardinality_cache), reverse=True)
+        # 只按主键排序时，InnoDB 二级索引末尾隐含主键；其他排序列追加在等值列之后
+        columns += [c for c in combo['order'] if c != 'id' and c not in columns]
+    else:
+        columns = list(combo['columns'])
+    if not columns or len(columns) > MAX_INDEX_COLUMNS:
+        return None
+    return columns
+
+
+def index_exists(indexes, columns):
+    """已有索引以这些列开头时不再重复建议"""
+    return any(existing[:len(columns)] == columns for existing in indexes.values())
+
+
+def index_name(columns):
+    return ('idx_adv_' + '_'.join(columns))[:64]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='根据实际查询的筛选组合建议并创建复合/覆盖索引')
+    parser.add_argument('--usage-file', default=FILTER_USAGE_FILE,
+                        help='筛选组合记录文件')
+    parser.add_argument('--endpoint', default=None, help='只分析该前缀的接口，如 survey.list 或 analysis')
+    parser.add_argument('--top', type=int, default=20, help='分析使用次数最多的前N个组合')
+    parser.add_argument('--runs', type=int, default=5, help='每个查询计时的执行次数')
+    parser.add_argument('--create', action='store_true', help='创建建议的索引并对比前后耗时')
+    parser.add_argument('--output', default=None, help='把分析结果写入JSON文件')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if not os.path.exists(args.usage_file):
+        print(f"[ERROR] 筛选组合记录文件不存在: {args.usage_file}（应用运行一段时间后才会生成）")
+        sys.exit(1)
+
+    combos = load_usage(args.usage_file, args.endpoint)[:args.top]
+    if not combos:
+        print("没有可分析的筛选组合")
+        return
+
+    connection = pymysql.connect(**DB_CONFIG)
+    cursor = connection.cursor()
+    cardinality_cache = {}
+    proposals = {}  # (表, 列) -> 索引名
+
+    # 1. 分析现有执行计划并计时
+    for combo in combos:
+        combo['plan_before'], combo['problems'] = explain(cursor, combo['sql'], combo['params'])
+        combo['ms_before'] = benchmark(cursor, combo['sql'], combo['params'], args.runs)
+        combo['index'] = None
+        if not combo['problems']:
+            continue
+        columns = propose_index(cursor, combo, cardinality_cache)
+        if columns and not index_exists(get_indexes(cursor, combo['table']), columns):
+            key = (combo['table'], tuple(columns))
+            proposals.setdefault(key, index_name(columns))
+            combo['index'] = proposals[key]
+
+    print("=" * 80)
+    print("建议的索引")
+    for (table, columns), name in proposals.items():
+        print(f"  ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)});")
+    if not proposals:
+        print("  现有索引已能覆盖这些查询")
+
+    # 2. 创建索引后重新分析并计时
+    if args.create and proposals:
+        for (table, columns), name in proposals.items():
+            sql = f"ALTER TABLE {table} ADD INDEX {name} ({', '.join(columns)})"
+            print(f"创建索引: {sql}")
+            start = time.perf_counter()
+            cursor.execute(sql)
+            connection.commit()
+            print(f"  耗时 {time.perf_counter() - start:.2f}s")
+        for combo in combos:
+            combo['plan_after'], combo['problems_after'] = explain(cursor, combo['sql'], combo['params'])
+            combo['ms_after'] = benchmark(cursor, combo['sql'], combo['params'], args.runs)
+
+    print("=" * 80)
+    header = f"{'接口':<28}{'次数':>8}{'创建前(ms)':>12}"
+    if args.create:
+        header += f"{'创建后(ms)':>12}"
+    print(header + "  问题 / 建议索引")
+    for combo in combos:
+        name = combo['endpoint'] + (f"[{','.join(combo['equality'])}]" if combo['equality'] else '')
+        line = f"{name[:27]:<28}{combo['count']:>8}{combo['ms_before']:>12.2f}"
+        if args.create:
+            line += f"{combo.get('ms_after', combo['ms_before']):>12.2f}"
+        detail = ', '.join(combo['problems']) or '-'
+        if combo['index']:
+            detail += f" -> {combo['index']}"
+        print(f"{line}  {detail}")
+    print("=" * 80)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'proposals': [{'table': t, 'columns': list(c), 'name': n} for (t, c), n in proposals.items()],
+                'queries': combos
+            }, f, ensure_ascii=False, indent=2, default=str)
+        print(f"分析结果已写入: {args.output}")
+
+    cursor.close()
+    connection.close()
+
+
+if __name__ == '__main__':
+    main()
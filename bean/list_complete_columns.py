@@ -4,9 +4,10 @@
 列出完整版数据的所有列名
 """
 
-import pandas as pd
 import os
 
+from csv_encoding import detect_encoding, read_csv_auto
+
 def list_columns():
     """列出完整版数据的所有列名"""
 
@@ -18,19 +19,11 @@ def list_columns():
         return
 
     # 尝试读取
-    encodings_to_try = ['utf-8', 'gbk', 'gb2312']
-    df = None
-
-    for encoding in encodings_to_try:
-        try:
-            df = pd.read_csv(train_file, nrows=1, encoding=encoding)
-            print(f"成功使用 {encoding} 编码读取")
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if df is None:
-        print("无法读取文件")
+    try:
+        df = read_csv_auto(train_file, nrows=1)
+        print(f"成功使用 {detect_encoding(train_file)} 编码读取数据")
+    except Exception as e:
+        print(f"无法读取文件: {e}")
         return
 
     print(f"\n完整版数据共有 {len(df.columns)} 个字段:")
@@ -7,9 +7,30 @@
 
 import sys
 import os
+import argparse
+
+def parse_args():
+    """解析命令行参数"""
+    parser = argparse.ArgumentParser(description='幸福感数据集导入工具')
+    parser.add_argument('--mode', choices=['insert', 'load_data'], default='insert',
+                        help='导入方式：insert 多行INSERT；load_data 使用 LOAD DATA LOCAL INFILE（不可用时自动回退）')
+    parser.add_argument('--streaming', action='store_true',
+                        help='流式导入：按块读取、清洗并写入，内存占用与文件大小无关')
+    parser.add_argument('--chunk-size', type=int, default=5000, help='流式导入每块行数')
+    parser.add_argument('--incremental', action='store_true',
+                        help='增量导入：不清空表，只写入新增、变化和删除的行，源文件未变化时直接跳过')
+    parser.add_argument('--atomic-swap', action='store_true',
+                        help='原子替换导入：写入暂存表并建索引、校验后再替换正式表，导入期间正式表数据保持完整')
+    parser.add_argument('--parallel', action='store_true',
+                        help='并行导入：多进程解析清洗各文件（大文件按行区间拆分），多个数据库连接并发写入')
+    parser.add_argument('--parse-workers', type=int, default=None, help='并行导入的解析进程数，默认CPU核数')
+    parser.add_argument('--writer-connections', type=int, default=4, help='并行导入的写入连接数')
+    return parser.parse_args()
 
 def main():
     """主执行函数"""
+    args = parse_args()
+
     print("=" * 60)
     print("幸福感数据集导入工具")
     print("=" * 60)
@@ -53,6 +74,14 @@ def main():
         from data_cleaning_import import HappinessDataImporter
 
         importer = HappinessDataImporter()
+        importer.import_mode = args.mode
+        importer.streaming = args.streaming
+        importer.chunk_size = args.chunk_size
+        importer.incremental = args.incremental
+        importer.atomic_swap = args.atomic_swap
+        importer.parallel = args.parallel
+        importer.parse_workers = args.parse_workers
+        importer.writer_connections = args.writer_connections
         importer.run_import()
 
         print("\n" + "=" * 60)
@@ -4,9 +4,10 @@
 简单比较数据字段和数据库表字段
 """
 
-import pandas as pd
 import os
 
+from csv_encoding import detect_encoding, read_csv_auto
+
 def simple_compare():
     """简单比较字段"""
 
@@ -38,19 +39,11 @@ def simple_compare():
     data_dir = os.path.join(os.path.dirname(__file__), 'data')
     train_file = os.path.join(data_dir, 'happiness_train_complete.csv')
 
-    encodings_to_try = ['utf-8', 'gbk', 'gb2312']
-    df = None
-
-    for encoding in encodings_to_try:
-        try:
-            df = pd.read_csv(train_file, nrows=1, encoding=encoding)
-            print(f"成功使用 {encoding} 编码读取数据")
-            break
-        except UnicodeDecodeError:
-            continue
-
-    if df is None:
-        print("无法读取数据文件")
+    try:
+        df = read_csv_auto(train_file, nrows=1)
+        print(f"成功使用 {detect_encoding(train_file)} 编码读取数据")
+    except Exception as e:
+        print(f"无法读取数据文件: {e}")
         return
 
     data_fields = set(df.columns)
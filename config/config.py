@@ -22,4 +22,57 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB
 
 # 会话配置
-PERMANENT_SESSION_LIFETIME = 86400  # 24小时
\ No newline at end of file
+PERMANENT_SESSION_LIFETIME = 86400  # 24小时
+
+# 影子模型配置（SHADOW_MODEL_INFO_PATH 为空时不启用）
+SHADOW_MODEL_INFO_PATH = None  # 新训练模型的 model_info.json 路径
+SHADOW_SAMPLE_RATE = 0.1  # 抽取线上预测请求的比例
+SHADOW_ALGORITHM = 'auto'
+SHADOW_FLUSH_INTERVAL = 60  # 对比统计写入数据库的间隔（秒）
+
+# 操作日志异步写入配置（LOG_ASYNC_ENABLED 为 False 时在请求内同步写入）
+LOG_ASYNC_ENABLED = True
+LOG_QUEUE_SIZE = 10000  # 内存队列容量
+LOG_BATCH_SIZE = 200  # 攒够多少条写入一次
+LOG_FLUSH_INTERVAL_MS = 500  # 最长多久写入一次（毫秒）
+LOG_ENQUEUE_TIMEOUT_MS = 5  # 队列满时请求线程最多等待的时间（毫秒），超时则丢弃该条日志
+
+# 操作日志按月分表与保留策略
+LOG_RETENTION_MONTHS = 6  # 保留最近几个月的月表，更早的归档后删除
+LOG_ARCHIVE_DIR = 'log_archive'  # 归档文件目录（每张月表一个 .jsonl.gz 文件）
+LOG_RETENTION_CHECK_INTERVAL = 3600  # 检查保留策略的间隔（秒）
+
+# 分页列表总数缓存
+COUNT_CACHE_TTL = 60  # 缓存有效期（秒），兜底其他进程写入造成的不一致
+COUNT_CACHE_MAX_ENTRIES = 1000
+COUNT_ESTIMATE_MODE = 'off'  # 'off' 精确统计；'explain' 按 EXPLAIN 估算，估算值超过阈值时直接使用
+COUNT_ESTIMATE_THRESHOLD = 100000
+
+# 查询筛选组合记录（供 bean/index_advisor.py 建议索引）
+FILTER_USAGE_ENABLED = True
+# 按项目根目录解析，应用和 bean/index_advisor.py 无论从哪个目录启动都读写同一个文件
+FILTER_USAGE_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                                 'filter_usage', 'filter_usage.jsonl')
+FILTER_USAGE_FLUSH_INTERVAL = 60  # 写入文件的间隔（秒）
+
+# 调查统计位图索引：每隔多少秒检查一次数据是否变化（有变化时重建）
+STATS_INDEX_CHECK_INTERVAL = 60
+
+# 公告浏览次数缓冲写入的间隔（秒）
+VIEW_COUNT_FLUSH_INTERVAL = 5
+
+# 前台公告列表缓存（公告变更时清空）
+FEED_CACHE_TTL = 300
+FEED_CACHE_MAX_ENTRIES = 500
+
+# 公告关键词检索倒排索引：每隔多少秒检查一次表是否被其他进程修改（有变化时重建）
+SEARCH_INDEX_CHECK_INTERVAL = 60
+
+# 公告列表摘要片段：没有填写摘要时，从正文开头生成的纯文本长度；按 (公告id, 更新时间) 缓存
+ANNOUNCEMENT_SNIPPET_LENGTH = 150
+SNIPPET_CACHE_TTL = 3600
+SNIPPET_CACHE_MAX_ENTRIES = 2000
+
+# 服务端会话存储：'memory'（单进程）或 'sqlite'（同一台机器上的多个工作进程共享）
+SESSION_STORE = 'memory'
+SESSION_SQLITE_PATH = 'session_data/sessions.sqlite3'
@@ -19,8 +19,8 @@ def admin_announcement_list():
 @announcement_bp.route('/admin/detail', methods=['GET'])
 @operation_required
 def admin_announcement_detail():
-    """后台获取公告详情"""
-    result = AnnouncementController.get_announcement_detail()
+    """后台获取公告详情（不计入浏览次数）"""
+    result = AnnouncementController.get_announcement_detail(count_view=False)
     return jsonify(result)
 
 @announcement_bp.route('/admin/create', methods=['POST'])
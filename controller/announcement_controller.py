@@ -43,6 +43,7 @@ class AnnouncementController:
             page_size = int(request.args.get('pageSize', 10))
             status = request.args.get('status')
             keyword = request.args.get('keyword')
+            with_snippet = request.args.get('withSnippet') == '1'
             
             # 参数验证
             if page_num < 1:
@@ -59,7 +60,7 @@ class AnnouncementController:
                 except ValueError:
                     status = None
             
-            return AnnouncementService.get_announcement_list(page_num, page_size, status, keyword)
+            return AnnouncementService.get_announcement_list(page_num, page_size, status, keyword, with_snippet)
             
         except Exception as e:
             print(f"获取公告列表失败: {str(e)}")
@@ -96,10 +97,13 @@ class AnnouncementController:
             return error(f"获取前台公告失败: {str(e)}")
     
     @staticmethod
-    def get_announcement_detail():
+    def get_announcement_detail(count_view=True):
         """
         获取公告详情
         
+        Args:
+            count_view: 是否计入浏览次数
+        
         Returns:
             dict: 响应数据
         """
@@ -113,7 +117,7 @@ class AnnouncementController:
             except ValueError:
                 return error("公告ID格式错误")
             
-            return AnnouncementService.get_announcement_by_id(announcement_id)
+            return AnnouncementService.get_announcement_by_id(announcement_id, count_view)
             
         except Exception as e:
             print(f"获取公告详情失败: {str(e)}")
@@ -29,3 +29,12 @@ def admin_happiness_statistics():
     """后台获取幸福感统计数据"""
     result = HappinessSurveyController.get_happiness_statistics()
     return jsonify(result)
+
+@happiness_survey_bp.route('/admin/export', methods=['GET'])
+@operation_required
+def admin_happiness_survey_export():
+    """后台流式导出筛选后的调查数据（CSV / gzip）"""
+    result = HappinessSurveyController.export_happiness_survey()
+    if isinstance(result, dict):
+        return jsonify(result)
+    return result
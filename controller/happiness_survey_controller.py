@@ -1,8 +1,9 @@
 """
 幸福感调查表控制器
 """
-from flask import request, session
-from service.happiness_survey_service import HappinessSurveyService
+from datetime import datetime
+from flask import Response, request, session
+from service.happiness_survey_service import EXPORT_TABLES, HappinessSurveyService
 from service.log_service import LogService
 from utils.response import success, error
 
@@ -29,6 +30,41 @@ class HappinessSurveyController:
         except Exception as e:
             print(f"记录幸福感调查表日志失败: {str(e)}")
 
+    @staticmethod
+    def _parse_filters():
+        """从请求参数构建筛选条件（列表和导出共用）"""
+        filters = {}
+
+        # 获取筛选参数
+        happiness = request.args.get('happiness')
+        province = request.args.get('province')
+        city = request.args.get('city')
+        gender = request.args.get('gender')
+        edu = request.args.get('edu')
+        data_source = request.args.get('dataSource')
+        keyword = request.args.get('keyword', '').strip()
+
+        # 转换筛选参数
+        for name, value in (('happiness', happiness), ('province', province), ('city', city),
+                            ('gender', gender), ('edu', edu)):
+            if value is not None and value != '':
+                try:
+                    filters[name] = int(value)
+                except ValueError:
+                    pass
+
+        if data_source:
+            filters['dataSource'] = data_source
+
+        if keyword:
+            filters['keyword'] = keyword
+
+        # 默认只包含有 happiness 值的记录，showAll=1 时包含全部（如导出完整数据）
+        if request.args.get('showAll') in ('1', 'true'):
+            filters['show_all'] = True
+
+        return filters
+
     @staticmethod
     def get_happiness_survey_list():
         """
@@ -41,18 +77,8 @@ class HappinessSurveyController:
             # 获取请求参数
             page_num = int(request.args.get('pageNum', 1))
             page_size = int(request.args.get('pageSize', 10))
-
-            # 构建筛选条件
-            filters = {}
-
-            # 获取筛选参数
-            happiness = request.args.get('happiness')
-            province = request.args.get('province')
-            city = request.args.get('city')
-            gender = request.args.get('gender')
-            edu = request.args.get('edu')
-            data_source = request.args.get('dataSource')
-            keyword = request.args.get('keyword', '').strip()
+            # 游标分页令牌（上一次响应中的 nextPageToken），传入时按令牌翻页
+            page_token = request.args.get('pageToken', '').strip()
 
             # 参数验证和转换
             if page_num < 1:
@@ -60,48 +86,58 @@ class HappinessSurveyController:
             if page_size < 1 or page_size > 100:
                 page_size = 10
 
-            # 转换筛选参数
-            if happiness is not None and happiness != '':
-                try:
-                    filters['happiness'] = int(happiness)
-                except ValueError:
-                    pass
+            # 构建筛选条件
+            filters = HappinessSurveyController._parse_filters()
 
-            if province is not None and province != '':
-                try:
-                    filters['province'] = int(province)
-                except ValueError:
-                    pass
+            return HappinessSurveyService.get_happiness_survey_list(page_num, page_size, filters,
+                                                                    page_token or None)
 
-            if city is not None and city != '':
-                try:
-                    filters['city'] = int(city)
-                except ValueError:
-                    pass
-
-            if gender is not None and gender != '':
-                try:
-                    filters['gender'] = int(gender)
-                except ValueError:
-                    pass
+        except Exception as e:
+            print(f"获取幸福感调查表列表失败: {str(e)}")
+            return error(f"获取幸福感调查表列表失败: {str(e)}")
 
-            if edu is not None and edu != '':
-                try:
-                    filters['edu'] = int(edu)
-                except ValueError:
-                    pass
+    @staticmethod
+    def export_happiness_survey():
+        """
+        流式导出筛选后的调查数据
 
-            if data_source:
-                filters['dataSource'] = data_source
+        请求参数：与列表相同的筛选条件，以及
+            format: csv（默认）或 gzip
+            table: survey（默认）或 complete（完整版数据）
 
-            if keyword:
-                filters['keyword'] = keyword
+        Returns:
+            Response: 分块发送的CSV文件；参数错误时返回错误信息字典
+        """
+        try:
+            export_format = request.args.get('format', 'csv').strip().lower()
+            table = request.args.get('table', 'survey').strip().lower()
+            if export_format not in ('csv', 'gzip'):
+                return error("导出格式只支持 csv 或 gzip")
+            if table not in EXPORT_TABLES:
+                return error("导出的表只支持 survey 或 complete")
+
+            filters = HappinessSurveyController._parse_filters()
+            compress = export_format == 'gzip'
+            filename = f"{EXPORT_TABLES[table][0]}_{datetime.now():%Y%m%d%H%M%S}.csv" + ('.gz' if compress else '')
+
+            HappinessSurveyController._record_log(
+                session.get('user_id'), session.get('username'), "导出",
+                f"导出{EXPORT_TABLES[table][0]}，格式: {export_format}，筛选条件: {filters}"
+            )
 
-            return HappinessSurveyService.get_happiness_survey_list(page_num, page_size, filters)
+            return Response(
+                HappinessSurveyService.iter_export(filters, table, compress),
+                mimetype='application/gzip' if compress else 'text/csv',
+                headers={
+                    'Content-Disposition': f'attachment; filename={filename}',
+                    # 关闭反向代理缓冲，数据生成后立即发送
+                    'X-Accel-Buffering': 'no'
+                }
+            )
 
         except Exception as e:
-            print(f"获取幸福感调查表列表失败: {str(e)}")
-            return error(f"获取幸福感调查表列表失败: {str(e)}")
+            print(f"导出幸福感调查数据失败: {str(e)}")
+            return error(f"导出幸福感调查数据失败: {str(e)}")
 
     @staticmethod
     def get_happiness_survey_detail():
@@ -130,7 +166,7 @@ class HappinessSurveyController:
     @staticmethod
     def get_happiness_statistics():
         """
-        获取幸福感统计数据
+        获取幸福感统计数据（按请求中的筛选条件统计）
 
         Returns:
             dict: 响应数据
@@ -140,7 +176,19 @@ class HappinessSurveyController:
             if 'user_id' not in session:
                 return error("请先登录")
 
-            result = HappinessSurveyService.get_happiness_statistics()
+            # 与列表相同的筛选条件，另外支持婚姻状况和健康状况；城市不在统计索引中
+            filters = HappinessSurveyController._parse_filters()
+            if 'city' in filters:
+                return error("统计暂不支持按城市筛选")
+            for name in ('marital', 'health'):
+                value = request.args.get(name)
+                if value is not None and value != '':
+                    try:
+                        filters[name] = int(value)
+                    except ValueError:
+                        pass
+
+            result = HappinessSurveyService.get_happiness_statistics(filters)
             if result.get('code') == 200:
                 HappinessSurveyController._record_log(
                     session.get('user_id'),
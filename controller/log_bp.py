@@ -16,3 +16,18 @@ def admin_log_list():
     result = LogController.get_log_list()
     return jsonify(result)
 
+
+@log_bp.route('/admin/writer_stats', methods=['GET'])
+@operation_required
+def admin_log_writer_stats():
+    """后台查看异步日志写入统计"""
+    result = LogController.get_writer_stats()
+    return jsonify(result)
+
+
+@log_bp.route('/admin/retention', methods=['POST'])
+@operation_required
+def admin_log_retention():
+    """后台立即执行日志保留策略（归档并删除过期月表）"""
+    result = LogController.apply_retention()
+    return jsonify(result)
@@ -1,6 +1,7 @@
 """
 操作日志控制器
 """
+from datetime import datetime
 from flask import request, session
 from service.log_service import LogService
 from utils.response import error
@@ -25,6 +26,8 @@ class LogController:
             username = request.args.get('username', '').strip()
             action = request.args.get('action', '').strip()
             status = request.args.get('status')
+            start_date = request.args.get('startDate', '').strip()
+            end_date = request.args.get('endDate', '').strip()
 
             if page_num < 1:
                 page_num = 1
@@ -40,6 +43,14 @@ class LogController:
                 except ValueError:
                     status_val = None
 
+            try:
+                start_date = datetime.strptime(start_date, '%Y-%m-%d').date() if start_date else None
+                end_date = datetime.strptime(end_date, '%Y-%m-%d').date() if end_date else None
+            except ValueError:
+                return error("日期格式应为 YYYY-MM-DD")
+            if start_date and end_date and start_date > end_date:
+                return error("开始日期不能晚于结束日期")
+
             return LogService.get_log_list(
                 page_num=page_num,
                 page_size=page_size,
@@ -47,9 +58,36 @@ class LogController:
                 module=module if module else None,
                 status=status_val,
                 username=username if username else None,
-                action=action if action else None
+                action=action if action else None,
+                start_date=start_date,
+                end_date=end_date
             )
         except Exception as e:
             print(f"获取操作日志失败: {str(e)}")
             return error(f"获取操作日志失败: {str(e)}")
 
+    @staticmethod
+    def get_writer_stats():
+        """
+        获取异步日志写入统计
+        """
+        try:
+            if 'user_id' not in session:
+                return error("请先登录")
+            return LogService.get_writer_stats()
+        except Exception as e:
+            print(f"获取日志写入统计失败: {str(e)}")
+            return error(f"获取日志写入统计失败: {str(e)}")
+
+    @staticmethod
+    def apply_retention():
+        """
+        立即执行日志保留策略
+        """
+        try:
+            if 'user_id' not in session:
+                return error("请先登录")
+            return LogService.apply_retention()
+        except Exception as e:
+            print(f"执行日志保留策略失败: {str(e)}")
+            return error(f"执行日志保留策略失败: {str(e)}")
@@ -7,6 +7,8 @@ import json
 from flask import Blueprint, request, jsonify
 from Predictive.happiness_predictor import HappinessPredictor
 from utils.response import success, error
+from utils.auth_utils import operation_required
+from config.config import SHADOW_MODEL_INFO_PATH, SHADOW_SAMPLE_RATE, SHADOW_ALGORITHM, SHADOW_FLUSH_INTERVAL
 
 # 创建蓝图
 prediction_bp = Blueprint('prediction', __name__, url_prefix='/prediction')
@@ -23,6 +25,19 @@ def init_predictor():
     except Exception as e:
         print(f"幸福感预测服务初始化失败: {e}")
         predictor = None
+        return
+
+    # 启用影子模型（失败不影响主模型服务）
+    if SHADOW_MODEL_INFO_PATH:
+        try:
+            predictor.enable_shadow(
+                SHADOW_MODEL_INFO_PATH,
+                sample_rate=SHADOW_SAMPLE_RATE,
+                algorithm=SHADOW_ALGORITHM,
+                flush_interval=SHADOW_FLUSH_INTERVAL
+            )
+        except Exception as e:
+            print(f"影子模型初始化失败: {e}")
 
 # 在模块加载时初始化预测器
 init_predictor()
@@ -42,6 +57,8 @@ def predict_happiness():
         # 获取算法选择，默认使用auto（最佳模型）
         algorithm = data.get('algorithm', 'auto')
         prediction_data = data.get('prediction_data', data)
+        # 是否返回各特征对本次预测的贡献
+        explain = bool(data.get('explain', False))
 
         # 验证必要字段
         required_fields = ['education', 'income', 'health', 'marital_status', 'age', 'gender']
@@ -51,7 +68,7 @@ def predict_happiness():
             return jsonify(error(f"缺少必要字段: {', '.join(missing_fields)}")), 400
 
         # 进行预测
-        result = predictor.predict(prediction_data, algorithm)
+        result = predictor.predict(prediction_data, algorithm, explain)
 
         return jsonify(success(result))
 
@@ -82,9 +99,10 @@ def batch_predict_happiness():
 
         # 获取算法选择
         algorithm = data.get('algorithm', 'auto')
+        explain = bool(data.get('explain', False))
 
         # 进行批量预测
-        results = predictor.batch_predict(predictions_data, algorithm)
+        results = predictor.batch_predict(predictions_data, algorithm, explain)
 
         return jsonify(success({'results': results, 'total': len(results), 'algorithm': algorithm}))
 
@@ -106,6 +124,17 @@ def get_model_info():
         print(f"获取模型信息错误: {e}")
         return jsonify(error("获取模型信息失败")), 500
 
+@prediction_bp.route('/shadow_stats', methods=['GET'])
+@operation_required
+def get_shadow_stats():
+    """获取影子模型对比统计接口"""
+    if predictor is None:
+        return jsonify(error("预测服务未初始化")), 500
+    if predictor.shadow is None:
+        return jsonify(error("未启用影子模型")), 404
+
+    return jsonify(success(predictor.shadow.get_stats()))
+
 @prediction_bp.route('/health', methods=['GET'])
 def health_check():
     """健康检查接口"""
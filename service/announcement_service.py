@@ -1,32 +1,238 @@
 """
 新闻公告服务层
 """
+import html
+import threading
+import time
 import pymysql
-from datetime import datetime
+from datetime import datetime, timedelta
 from utils.db_utils import get_db_connection
+from config.config import (FEED_CACHE_TTL, FEED_CACHE_MAX_ENTRIES, SEARCH_INDEX_CHECK_INTERVAL,
+                           ANNOUNCEMENT_SNIPPET_LENGTH, SNIPPET_CACHE_TTL, SNIPPET_CACHE_MAX_ENTRIES)
+from utils.cache_utils import TTLCache, count_rows, invalidate_table_counts
+from utils.text_index import InvertedIndex, normalize_text
+from utils.view_counter import get_view_counter
 from utils.response import success, error, page_response
 
 
+# 列表只查询轻量字段，正文 content 只在详情接口中查询
+ADMIN_LIST_COLUMNS = "id, title, summary, coverImage, author, authorId, status, isTop, viewCount, createTime, updateTime"
+FRONT_LIST_COLUMNS = "id, title, summary, coverImage, author, createTime, updateTime, isTop"
+
+# 摘要片段缓存：(公告id, 更新时间) -> 纯文本片段；公告修改后更新时间变化，旧片段不会再被使用
+snippet_cache = TTLCache(SNIPPET_CACHE_TTL, SNIPPET_CACHE_MAX_ENTRIES)
+# 生成片段时读取的正文长度（HTML标签会占用一部分）
+SNIPPET_SOURCE_CHARS = ANNOUNCEMENT_SNIPPET_LENGTH * 10
+
+# 前台公告列表缓存：(页码, 每页数量, 关键词, 开始日期, 结束日期) -> 响应数据
+feed_cache = TTLCache(FEED_CACHE_TTL, FEED_CACHE_MAX_ENTRIES)
+# 每次失效加1；查询开始后发生过失效的结果不写入缓存，避免把旧数据放回去
+_feed_generation = [0]
+
+# 关键词检索的倒排索引：启动时构建，本进程的增删改增量维护；
+# 每隔 SEARCH_INDEX_CHECK_INTERVAL 秒检查行数、最大id和最后更新时间，其他进程改过数据时重建
+_search_index = {'index': None, 'signature': None, 'checked': 0.0}
+_search_index_lock = threading.Lock()
+SEARCH_INDEX_SIGNATURE_SQL = """
+    SELECT COUNT(*) as total, MAX(id) as maxId, MAX(updateTime) as lastUpdate
+    FROM py_announcements
+"""
+SEARCH_INDEX_COLUMNS = "id, title, content, status, isTop, createTime"
+
+
 class AnnouncementService:
     """新闻公告服务类"""
     
     @staticmethod
-    def get_announcement_list(page_num=1, page_size=10, status=None, keyword=None):
+    def invalidate_caches():
+        """公告变更后使总数缓存和前台列表缓存失效"""
+        invalidate_table_counts('py_announcements')
+        _feed_generation[0] += 1
+        feed_cache.clear()
+    
+    @staticmethod
+    def _index_row(index, row):
+        index.add(row['id'], row['title'], row['content'],
+                  {'status': row['status'], 'isTop': row['isTop'], 'createTime': row['createTime']})
+    
+    @staticmethod
+    def get_search_index():
+        """
+        获取关键词检索的倒排索引：首次使用时从数据库构建；
+        之后每隔 SEARCH_INDEX_CHECK_INTERVAL 秒检查一次表是否有变化，有变化时重建
+        """
+        now = time.monotonic()
+        if _search_index['index'] is not None and now - _search_index['checked'] < SEARCH_INDEX_CHECK_INTERVAL:
+            return _search_index['index']
+        
+        with _search_index_lock:
+            if _search_index['index'] is not None and now - _search_index['checked'] < SEARCH_INDEX_CHECK_INTERVAL:
+                return _search_index['index']
+            
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute(SEARCH_INDEX_SIGNATURE_SQL)
+                    signature = tuple(cursor.fetchone().values())
+                
+                if signature != _search_index['signature']:
+                    start = time.perf_counter()
+                    index = InvertedIndex()
+                    with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+                        load_sql = f"SELECT {SEARCH_INDEX_COLUMNS} FROM py_announcements"
+                        print(f"执行SQL: {load_sql}")
+                        cursor.execute(load_sql)
+                        for row in cursor:
+                            AnnouncementService._index_row(index, row)
+                    _search_index['index'] = index
+                    _search_index['signature'] = signature
+                    print(f"公告检索索引已重建: {len(index)}篇，耗时{time.perf_counter() - start:.2f}s")
+            
+            _search_index['checked'] = time.monotonic()
+            return _search_index['index']
+    
+    @staticmethod
+    def warm_search_index():
+        """应用启动时在后台线程中构建检索索引，失败时等首次检索再构建"""
+        def build():
+            try:
+                AnnouncementService.get_search_index()
+            except Exception as e:
+                print(f"构建公告检索索引失败: {str(e)}")
+        
+        threading.Thread(target=build, name='announcement-search-index', daemon=True).start()
+    
+    @staticmethod
+    def reindex_announcement(cursor, announcement_id):
+        """
+        本进程修改公告并提交后增量更新检索索引（索引尚未构建时跳过，首次检索时会完整构建）
+        同时记下新的表签名，避免下次检查时把本进程的修改当成外部修改而重建
+        """
+        if _search_index['index'] is None:
+            return
+        try:
+            with _search_index_lock:
+                index = _search_index['index']
+                sql = f"SELECT {SEARCH_INDEX_COLUMNS} FROM py_announcements WHERE id = %s"
+                cursor.execute(sql, [announcement_id])
+                row = cursor.fetchone()
+                if row:
+                    AnnouncementService._index_row(index, row)
+                else:
+                    index.remove(announcement_id)
+                cursor.execute(SEARCH_INDEX_SIGNATURE_SQL)
+                _search_index['signature'] = tuple(cursor.fetchone().values())
+        except Exception as e:
+            # 增量更新失败时丢弃签名，下次检查时完整重建
+            print(f"更新公告检索索引失败: {str(e)}")
+            _search_index['signature'] = None
+            _search_index['checked'] = 0.0
+    
+    @staticmethod
+    def search_announcement_ids(keyword, status=None, start_time=None, end_time=None):
+        """
+        用倒排索引检索公告，返回置顶在前、再按相关度排序的公告ID；
+        索引不可用或关键词中没有可索引的字符时返回 None（调用方退回 LIKE 查询）
+        
+        Args:
+            keyword: 关键词（整体作为一个短语匹配，与 LIKE 查询一致）
+            status: 状态筛选
+            start_time: 创建时间下限（含）
+            end_time: 创建时间上限（不含）
+        """
+        try:
+            index = AnnouncementService.get_search_index()
+        except Exception as e:
+            print(f"公告检索索引不可用: {str(e)}")
+            return None
+        
+        def accept(meta):
+            return ((status is None or meta['status'] == status)
+                    and (start_time is None or meta['createTime'] >= start_time)
+                    and (end_time is None or meta['createTime'] < end_time))
+        
+        return index.search(keyword, accept, pinned=lambda meta: meta['isTop'])
+    
+    @staticmethod
+    def fetch_by_ids(cursor, columns, ids):
+        """按主键取回公告，保持 ids 的顺序"""
+        if not ids:
+            return []
+        placeholders = ', '.join(['%s'] * len(ids))
+        sql = f"SELECT {columns} FROM py_announcements WHERE id IN ({placeholders})"
+        print(f"执行SQL: {sql}, 参数: {ids}")
+        cursor.execute(sql, ids)
+        position = {announcement_id: i for i, announcement_id in enumerate(ids)}
+        return sorted(cursor.fetchall(), key=lambda row: position[row['id']])
+    
+    @staticmethod
+    def attach_snippets(cursor, rows):
+        """
+        为没有摘要的公告添加 snippet 字段（正文开头的纯文本，已做HTML转义，前端可直接 v-html 显示）
+        片段按 (公告id, 更新时间) 缓存，未命中的公告一次查询只取正文开头的一段
+        """
+        missing = []
+        for row in rows:
+            row['snippet'] = ''
+            if row.get('summary'):
+                continue
+            hit, snippet = snippet_cache.get((row['id'], row['updateTime']))
+            if hit:
+                row['snippet'] = snippet
+            else:
+                missing.append(row)
+        if not missing:
+            return rows
+        
+        ids = [row['id'] for row in missing]
+        placeholders = ', '.join(['%s'] * len(ids))
+        sql = f"""
+            SELECT id, updateTime, LEFT(content, %s) as head
+            FROM py_announcements
+            WHERE id IN ({placeholders})
+        """
+        print(f"执行SQL: {sql}, 参数: {[SNIPPET_SOURCE_CHARS] + ids}")
+        cursor.execute(sql, [SNIPPET_SOURCE_CHARS] + ids)
+        heads = {row['id']: row for row in cursor.fetchall()}
+        for row in missing:
+            head = heads.get(row['id'])
+            if head is None:
+                continue
+            text = ' '.join(normalize_text(head['head'], lower=False).split())
+            if len(text) > ANNOUNCEMENT_SNIPPET_LENGTH:
+                text = text[:ANNOUNCEMENT_SNIPPET_LENGTH] + '...'
+            text = html.escape(text, quote=False)
+            row['snippet'] = text
+            snippet_cache.set((row['id'], head['updateTime']), text)
+        return rows
+    
+    @staticmethod
+    def get_announcement_list(page_num=1, page_size=10, status=None, keyword=None, with_snippet=False):
         """
-        获取公告列表（分页）
+        获取公告列表（分页，不含正文）
         
         Args:
             page_num: 页码
             page_size: 每页数量
             status: 状态筛选（1-发布，0-草稿）
             keyword: 关键词搜索
+            with_snippet: 是否为没有摘要的公告生成正文片段
             
         Returns:
             dict: 分页响应数据
         """
         try:
+            # 关键词检索走倒排索引：得到排好序的ID，只按主键取回当前页
+            ids = AnnouncementService.search_announcement_ids(keyword, status) if keyword else None
+            
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
+                    if ids is not None:
+                        offset = (page_num - 1) * page_size
+                        rows = AnnouncementService.fetch_by_ids(cursor, ADMIN_LIST_COLUMNS, ids[offset:offset + page_size])
+                        if with_snippet:
+                            AnnouncementService.attach_snippets(cursor, rows)
+                        return page_response(rows, len(ids), page_num, page_size)
+                    
                     # 构建查询条件
                     where_conditions = []
                     params = []
@@ -43,17 +249,13 @@ class AnnouncementService:
                     if where_conditions:
                         where_clause = "WHERE " + " AND ".join(where_conditions)
                     
-                    # 查询总数
-                    count_sql = f"SELECT COUNT(*) as total FROM py_announcements {where_clause}"
-                    print(f"执行SQL: {count_sql}, 参数: {params}")
-                    cursor.execute(count_sql, params)
-                    total = cursor.fetchone()['total']
+                    # 查询总数（按筛选条件缓存，公告变更时失效）
+                    total, estimated = count_rows('py_announcements', where_clause, params, cursor)
                     
                     # 查询数据
                     offset = (page_num - 1) * page_size
                     data_sql = f"""
-                        SELECT id, title, summary, content, coverImage, author, authorId, status, isTop,
-                               viewCount, createTime, updateTime
+                        SELECT {ADMIN_LIST_COLUMNS}
                         FROM py_announcements
                         {where_clause}
                         ORDER BY isTop DESC, createTime DESC
@@ -63,8 +265,10 @@ class AnnouncementService:
                     print(f"执行SQL: {data_sql}, 参数: {params}")
                     cursor.execute(data_sql, params)
                     rows = cursor.fetchall()
+                    if with_snippet:
+                        AnnouncementService.attach_snippets(cursor, rows)
                     
-                    return page_response(rows, total, page_num, page_size)
+                    return page_response(rows, total, page_num, page_size, estimated)
                     
         except Exception as e:
             print(f"获取公告列表失败: {str(e)}")
@@ -86,63 +290,93 @@ class AnnouncementService:
             dict: 响应数据
         """
         try:
+            cache_key = (page, limit, keyword, start_date, end_date)
+            generation = _feed_generation[0]
+            hit, cached = feed_cache.get(cache_key)
+            if hit:
+                return cached
+            
+            # 日期转为 createTime 的半开区间，可以使用 createTime 上的索引
+            try:
+                start_time = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
+                end_time = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1) if end_date else None
+            except ValueError:
+                return error("日期格式应为 YYYY-MM-DD")
+            
+            ids = AnnouncementService.search_announcement_ids(keyword, 1, start_time, end_time) if keyword else None
+            
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 构建查询条件
-                    where_conditions = ["status = 1"]  # 只显示已发布的
-                    params = []
-                    
-                    if keyword:
-                        where_conditions.append("(title LIKE %s OR content LIKE %s)")
-                        params.extend([f'%{keyword}%', f'%{keyword}%'])
-                    
-                    if start_date:
-                        where_conditions.append("DATE(createTime) >= %s")
-                        params.append(start_date)
-                    
-                    if end_date:
-                        where_conditions.append("DATE(createTime) <= %s")
-                        params.append(end_date)
-                    
-                    where_clause = "WHERE " + " AND ".join(where_conditions)
-                    
-                    # 查询总数
-                    count_sql = f"SELECT COUNT(*) as total FROM py_announcements {where_clause}"
-                    print(f"执行SQL: {count_sql}, 参数: {params}")
-                    cursor.execute(count_sql, params)
-                    total = cursor.fetchone()['total']
+                    if ids is not None:
+                        offset = (page - 1) * limit
+                        rows = AnnouncementService.fetch_by_ids(cursor, FRONT_LIST_COLUMNS, ids[offset:offset + limit])
+                        total, estimated = len(ids), False
+                    else:
+                        rows, total, estimated = AnnouncementService._query_front_page(
+                            cursor, page, limit, keyword, start_time, end_time)
                     
-                    # 查询数据
-                    offset = (page - 1) * limit
-                    data_sql = f"""
-                        SELECT id, title, summary, content, author, createTime, isTop
-                        FROM py_announcements 
-                        {where_clause}
-                        ORDER BY isTop DESC, createTime DESC
-                        LIMIT %s OFFSET %s
-                    """
-                    params.extend([limit, offset])
-                    print(f"执行SQL: {data_sql}, 参数: {params}")
-                    cursor.execute(data_sql, params)
-                    rows = cursor.fetchall()
+                    AnnouncementService.attach_snippets(cursor, rows)
                     
                     # 格式化时间
                     for row in rows:
                         row['createTime'] = row['createTime'].strftime('%Y-%m-%d %H:%M:%S')
+                        row.pop('updateTime', None)
                     
-                    return page_response(rows, total, page, limit)
+                    result = page_response(rows, total, page, limit, estimated)
+                    if generation == _feed_generation[0]:
+                        feed_cache.set(cache_key, result)
+                    return result
                     
         except Exception as e:
             print(f"获取前台公告失败: {str(e)}")
             return error(f"获取前台公告失败: {str(e)}")
     
     @staticmethod
-    def get_announcement_by_id(announcement_id):
+    def _query_front_page(cursor, page, limit, keyword, start_time, end_time):
+        """前台公告列表的SQL查询（无关键词，或检索索引不可用时用 LIKE）"""
+        # 构建查询条件
+        where_conditions = ["status = 1"]  # 只显示已发布的
+        params = []
+        
+        if keyword:
+            where_conditions.append("(title LIKE %s OR content LIKE %s)")
+            params.extend([f'%{keyword}%', f'%{keyword}%'])
+        
+        if start_time:
+            where_conditions.append("createTime >= %s")
+            params.append(start_time)
+        
+        if end_time:
+            where_conditions.append("createTime < %s")
+            params.append(end_time)
+        
+        where_clause = "WHERE " + " AND ".join(where_conditions)
+        
+        # 查询总数（按筛选条件缓存，公告变更时失效）
+        total, estimated = count_rows('py_announcements', where_clause, params, cursor)
+        
+        # 查询数据
+        offset = (page - 1) * limit
+        data_sql = f"""
+            SELECT {FRONT_LIST_COLUMNS}
+            FROM py_announcements 
+            {where_clause}
+            ORDER BY isTop DESC, createTime DESC
+            LIMIT %s OFFSET %s
+        """
+        params.extend([limit, offset])
+        print(f"执行SQL: {data_sql}, 参数: {params}")
+        cursor.execute(data_sql, params)
+        return cursor.fetchall(), total, estimated
+    
+    @staticmethod
+    def get_announcement_by_id(announcement_id, count_view=True):
         """
-        根据ID获取公告详情
+        根据ID获取公告详情（含正文）
         
         Args:
             announcement_id: 公告ID
+            count_view: 是否计入浏览次数（后台查看、编辑时不计入）
             
         Returns:
             dict: 响应数据
@@ -163,11 +397,10 @@ class AnnouncementService:
                     if not row:
                         return error("公告不存在")
                     
-                    # 增加浏览次数
-                    update_sql = "UPDATE py_announcements SET viewCount = viewCount + 1 WHERE id = %s"
-                    print(f"执行SQL: {update_sql}, 参数: [{announcement_id}]")
-                    cursor.execute(update_sql, [announcement_id])
-                    conn.commit()
+                    # 增加浏览次数：先在内存中累加，由后台线程批量写回；返回值包含尚未写入的次数
+                    counter = get_view_counter()
+                    pending = counter.increment(row['id']) if count_view else counter.pending(row['id'])
+                    row['viewCount'] = (row['viewCount'] or 0) + pending
                     
                     return success(row)
                     
@@ -204,8 +437,10 @@ class AnnouncementService:
                     print(f"执行SQL: {sql}, 参数: {params}")
                     cursor.execute(sql, params)
                     conn.commit()
-                    
                     announcement_id = cursor.lastrowid
+                    AnnouncementService.reindex_announcement(cursor, announcement_id)
+                    AnnouncementService.invalidate_caches()
+                    
                     return success({"id": announcement_id}, "公告创建成功")
                     
         except Exception as e:
@@ -250,6 +485,8 @@ class AnnouncementService:
                     print(f"执行SQL: {sql}, 参数: {params}")
                     cursor.execute(sql, params)
                     conn.commit()
+                    AnnouncementService.reindex_announcement(cursor, announcement_id)
+                    AnnouncementService.invalidate_caches()
                     
                     return success(None, "公告更新成功")
                     
@@ -282,6 +519,8 @@ class AnnouncementService:
                     print(f"执行SQL: {sql}, 参数: [{announcement_id}]")
                     cursor.execute(sql, [announcement_id])
                     conn.commit()
+                    AnnouncementService.reindex_announcement(cursor, announcement_id)
+                    AnnouncementService.invalidate_caches()
                     
                     return success(None, "公告删除成功")
                     
@@ -320,6 +559,8 @@ class AnnouncementService:
                     print(f"执行SQL: {update_sql}, 参数: [{new_status}, {announcement_id}]")
                     cursor.execute(update_sql, [new_status, announcement_id])
                     conn.commit()
+                    AnnouncementService.reindex_announcement(cursor, announcement_id)
+                    AnnouncementService.invalidate_caches()
                     
                     status_text = "发布" if new_status == 1 else "草稿"
                     return success(None, f"公告状态已切换为{status_text}")
@@ -359,6 +600,8 @@ class AnnouncementService:
                     print(f"执行SQL: {update_sql}, 参数: [{new_top}, {announcement_id}]")
                     cursor.execute(update_sql, [new_top, announcement_id])
                     conn.commit()
+                    AnnouncementService.reindex_announcement(cursor, announcement_id)
+                    AnnouncementService.invalidate_caches()
                     
                     top_text = "置顶" if new_top == 1 else "取消置顶"
                     return success(None, f"公告已{top_text}")
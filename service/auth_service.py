@@ -1,4 +1,5 @@
 from utils.db_utils import execute_query, execute_insert, execute_update
+from utils.cache_utils import invalidate_table_counts
 from utils.auth_utils import hash_password
 import time
 import logging
@@ -86,6 +87,7 @@ class AuthService:
                 username, password, nickname, email, phone, 
                 role, status, current_time, current_time
             ))
+            invalidate_table_counts('py_user')
             
             logger.info(f"用户 {username} 注册成功")
             return True
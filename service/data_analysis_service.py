@@ -2,6 +2,7 @@
 数据分析服务层
 """
 from utils.db_utils import execute_query
+from utils.filter_usage import record_filter_usage
 from utils.response import success, error
 import logging
 
@@ -11,6 +12,12 @@ logger = logging.getLogger(__name__)
 class DataAnalysisService:
     """数据分析服务类"""
 
+    @staticmethod
+    def _query(endpoint, sql, columns):
+        """执行分析查询，并记录查询涉及的列（第一列为分组列），供索引建议工具分析"""
+        record_filter_usage(endpoint, 'py_happiness_survey', sql, columns=columns)
+        return execute_query(sql)
+
     @staticmethod
     def get_happiness_overview():
         """
@@ -31,7 +38,7 @@ class DataAnalysisService:
                 FROM py_happiness_survey
                 WHERE happiness IS NOT NULL AND happiness > 0
             """
-            overview = execute_query(sql)[0]
+            overview = DataAnalysisService._query('analysis.overview', sql, ('happiness',))[0]
 
             # 按数据源统计
             sql_source = """
@@ -43,7 +50,7 @@ class DataAnalysisService:
                 WHERE happiness IS NOT NULL AND happiness > 0
                 GROUP BY dataSource
             """
-            source_stats = execute_query(sql_source)
+            source_stats = DataAnalysisService._query('analysis.source', sql_source, ('dataSource', 'happiness'))
 
             return success({
                 'overview': overview,
@@ -85,7 +92,7 @@ class DataAnalysisService:
                 GROUP BY marital
                 ORDER BY count DESC
             """
-            data = execute_query(sql)
+            data = DataAnalysisService._query('analysis.marital', sql, ('marital', 'happiness'))
 
             # 计算百分比
             total_count = sum(row['count'] for row in data)
@@ -136,7 +143,7 @@ class DataAnalysisService:
                 GROUP BY edu
                 ORDER BY edu_code
             """
-            data = execute_query(sql)
+            data = DataAnalysisService._query('analysis.education', sql, ('edu', 'happiness'))
 
             # 计算百分比
             total_count = sum(row['count'] for row in data)
@@ -158,7 +165,7 @@ class DataAnalysisService:
                 GROUP BY education_group
                 ORDER BY avg_happiness DESC
             """
-            grouped_data = execute_query(sql_grouped)
+            grouped_data = DataAnalysisService._query('analysis.education_group', sql_grouped, ('edu', 'happiness'))
 
             # 计算分组百分比
             grouped_total = sum(row['count'] for row in grouped_data)
@@ -203,7 +210,7 @@ class DataAnalysisService:
                 GROUP BY income_range
                 ORDER BY MIN(income)
             """
-            data = execute_query(sql)
+            data = DataAnalysisService._query('analysis.income', sql, ('income', 'happiness'))
 
             # 计算百分比
             total_count = sum(row['count'] for row in data)
@@ -219,7 +226,7 @@ class DataAnalysisService:
                 FROM py_happiness_survey
                 WHERE income IS NOT NULL AND income > 0
             """
-            stats_data = execute_query(sql_stats)[0]
+            stats_data = DataAnalysisService._query('analysis.income_stats', sql_stats, ('income',))[0]
 
             return success({
                 'income_analysis': data,
@@ -261,7 +268,7 @@ class DataAnalysisService:
                 GROUP BY health
                 ORDER BY health_code
             """
-            data = execute_query(sql)
+            data = DataAnalysisService._query('analysis.health', sql, ('health', 'birth', 'happiness'))
 
             # 计算百分比
             total_count = sum(row['count'] for row in data)
@@ -306,7 +313,7 @@ class DataAnalysisService:
                 GROUP BY age_group
                 ORDER BY MIN(age)
             """
-            age_data = execute_query(sql_age)
+            age_data = DataAnalysisService._query('analysis.age', sql_age, ('birth', 'happiness'))
 
             # 收入与幸福感的相关性（按收入等级）
             sql_income_happiness = """
@@ -324,7 +331,8 @@ class DataAnalysisService:
                 GROUP BY income_level
                 ORDER BY MIN(income)
             """
-            income_happiness_data = execute_query(sql_income_happiness)
+            income_happiness_data = DataAnalysisService._query('analysis.income_happiness', sql_income_happiness,
+                                                              ('income', 'happiness'))
 
             # 教育与收入的交叉分析
             sql_edu_income = """
@@ -347,7 +355,8 @@ class DataAnalysisService:
                 GROUP BY education_group, income_level
                 ORDER BY education_group, income_level
             """
-            edu_income_data = execute_query(sql_edu_income)
+            edu_income_data = DataAnalysisService._query('analysis.edu_income', sql_edu_income,
+                                                        ('edu', 'income', 'happiness'))
 
             # 健康与年龄的关系
             sql_health_age = """
@@ -369,7 +378,8 @@ class DataAnalysisService:
                   AND happiness IS NOT NULL AND happiness > 0
                 GROUP BY health_group, age_group
             """
-            health_age_data = execute_query(sql_health_age)
+            health_age_data = DataAnalysisService._query('analysis.health_age', sql_health_age,
+                                                        ('health', 'birth', 'happiness'))
 
             return success({
                 'age_happiness': age_data,
@@ -1,17 +1,101 @@
 """
 幸福感调查表服务层
 """
+import csv
+import io
+import threading
+import time
+import zlib
 import pymysql
 from datetime import datetime
 from utils.db_utils import get_db_connection
+from config.config import STATS_INDEX_CHECK_INTERVAL
+from utils.bitmap_index import BitmapIndex
+from utils.cache_utils import count_rows
+from utils.filter_usage import record_filter_usage
+from utils.page_token import encode_page_token, decode_page_token, filter_fingerprint
 from utils.response import success, error, page_response
 
 
+# 列表接口支持等值筛选的列
+SURVEY_FILTER_COLUMNS = ('happiness', 'province', 'city', 'gender', 'edu', 'dataSource')
+
+# 列表和导出的字段
+SURVEY_LIST_COLUMNS = """id, happiness, surveyType, province, city, county, surveyTime, gender, birth,
+                               nationality, religion, religionFreq, edu, income, political, floorArea,
+                               heightCm, weightJin, health, healthProblem, depression, hukou, socialize,
+                               relax, learn, equity, class, workExper, workStatus, workYr, workType,
+                               workManage, familyIncome, familyM, familyStatus, house, car, marital,
+                               statusPeer, status3Before, view, incAbility, dataSource, createTime, updateTime"""
+
+# 可导出的表：导出参数 -> (表名, 字段)；完整版字段较多，导出全部字段
+EXPORT_TABLES = {
+    'survey': ('py_happiness_survey', SURVEY_LIST_COLUMNS),
+    'complete': ('py_happiness_survey_complete', '*'),
+}
+EXPORT_FETCH_SIZE = 1000  # 服务端游标每次取回的行数
+EXPORT_CHUNK_BYTES = 64 * 1024  # 攒够多少字节发送一次
+
+# 统计接口建立位图索引的低基数列
+STATS_COLUMNS = ('happiness', 'gender', 'edu', 'province', 'dataSource', 'marital', 'health')
+_stats_index = {'index': None, 'signature': None, 'checked': 0.0, 'refreshing': False}
+_stats_index_lock = threading.Lock()  # 保护 refreshing 标记
+_stats_build_lock = threading.Lock()  # 同一时间只有一个线程检查和重建索引
+
+
 class HappinessSurveyService:
     """幸福感调查表服务类"""
 
     @staticmethod
-    def get_happiness_survey_list(page_num=1, page_size=10, filters=None):
+    def build_survey_filters(filters=None):
+        """
+        构造调查表列表的筛选条件
+
+        Returns:
+            tuple: (where_conditions, params)
+        """
+        filters = filters or {}
+        where_conditions = []
+        params = []
+
+        # 幸福感评分筛选
+        if filters.get('happiness') is not None:
+            where_conditions.append("happiness = %s")
+            params.append(filters['happiness'])
+
+        # 省份筛选
+        if filters.get('province') is not None:
+            where_conditions.append("province = %s")
+            params.append(filters['province'])
+
+        # 城市筛选
+        if filters.get('city') is not None:
+            where_conditions.append("city = %s")
+            params.append(filters['city'])
+
+        # 性别筛选
+        if filters.get('gender') is not None:
+            where_conditions.append("gender = %s")
+            params.append(filters['gender'])
+
+        # 教育水平筛选
+        if filters.get('edu') is not None:
+            where_conditions.append("edu = %s")
+            params.append(filters['edu'])
+
+        # 数据来源筛选
+        if filters.get('dataSource'):
+            where_conditions.append("dataSource = %s")
+            params.append(filters['dataSource'])
+
+        # 如果没有指定 happiness 筛选条件，则默认只显示有 happiness 值的记录
+        if not filters.get('happiness') and not filters.get('show_all'):
+            where_conditions.append("happiness IS NOT NULL")
+
+        return where_conditions, params
+
+    @staticmethod
+    def get_happiness_survey_list(page_num=1, page_size=10, filters=None, page_token=None):
         """
         获取幸福感调查表列表（分页）
 
@@ -26,84 +110,79 @@ class HappinessSurveyService:
                 - edu: 教育水平
                 - dataSource: 数据来源
                 - keyword: 关键词搜索（目前无实际作用，保留接口）
+            page_token: 上一次响应中的 nextPageToken；传入时按 id < 上一页最后一条的id 查询下一页，
+                        不再使用 OFFSET，也不重新统计总数，page_num 以令牌为准
 
         Returns:
-            dict: 分页响应数据
+            dict: 分页响应数据，data 中附带 nextPageToken（没有下一页时为 None）
         """
         try:
+            fingerprint = filter_fingerprint(filters)
+            last_id = None
+            total = None
+            if page_token:
+                try:
+                    token = decode_page_token(page_token)
+                except ValueError as e:
+                    return error(str(e))
+                if token.get('f') != fingerprint:
+                    return error("分页令牌与当前筛选条件不匹配，请重新查询")
+                last_id = token['id']
+                page_num = token['page']
+                total = token['total']
+
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
                     # 构建查询条件
-                    where_conditions = []
-                    params = []
-
-                    if filters:
-                        # 幸福感评分筛选
-                        if filters.get('happiness') is not None:
-                            where_conditions.append("happiness = %s")
-                            params.append(filters['happiness'])
-
-                        # 省份筛选
-                        if filters.get('province') is not None:
-                            where_conditions.append("province = %s")
-                            params.append(filters['province'])
-
-                        # 城市筛选
-                        if filters.get('city') is not None:
-                            where_conditions.append("city = %s")
-                            params.append(filters['city'])
-
-                        # 性别筛选
-                        if filters.get('gender') is not None:
-                            where_conditions.append("gender = %s")
-                            params.append(filters['gender'])
-
-                        # 教育水平筛选
-                        if filters.get('edu') is not None:
-                            where_conditions.append("edu = %s")
-                            params.append(filters['edu'])
-
-                        # 数据来源筛选
-                        if filters.get('dataSource'):
-                            where_conditions.append("dataSource = %s")
-                            params.append(filters['dataSource'])
-
-                    # 如果没有指定 happiness 筛选条件，则默认只显示有 happiness 值的记录
-                    if not filters.get('happiness') and not filters.get('show_all'):
-                        where_conditions.append("happiness IS NOT NULL")
+                    where_conditions, params = HappinessSurveyService.build_survey_filters(filters)
 
                     where_clause = ""
                     if where_conditions:
                         where_clause = "WHERE " + " AND ".join(where_conditions)
 
-                    # 查询总数
-                    count_sql = f"SELECT COUNT(*) as total FROM py_happiness_survey {where_clause}"
-                    print(f"执行SQL: {count_sql}, 参数: {params}")
-                    cursor.execute(count_sql, params)
-                    total_result = cursor.fetchone()
-                    total = total_result['total'] if total_result else 0
+                    # 查询总数（游标翻页时沿用第一页统计的总数；调查数据由导入脚本写入，缓存靠过期时间失效）
+                    estimated = False
+                    if total is None:
+                        total, estimated = count_rows('py_happiness_survey', where_clause, params, cursor)
 
-                    # 查询数据
-                    offset = (page_num - 1) * page_size
+                    # 查询数据：游标翻页从上一页最后一条之后开始，否则按页码偏移
+                    if last_id is not None:
+                        where_conditions.append("id < %s")
+                        params.append(last_id)
+                        where_clause = "WHERE " + " AND ".join(where_conditions)
+                        limit_clause = "LIMIT %s"
+                        params.append(page_size + 1)
+                    else:
+                        limit_clause = "LIMIT %s OFFSET %s"
+                        params.extend([page_size + 1, (page_num - 1) * page_size])
 
                     data_sql = f"""
-                        SELECT id, happiness, surveyType, province, city, county, surveyTime, gender, birth,
-                               nationality, religion, religionFreq, edu, income, political, floorArea,
-                               heightCm, weightJin, health, healthProblem, depression, hukou, socialize,
-                               relax, learn, equity, class, workExper, workStatus, workYr, workType,
-                               workManage, familyIncome, familyM, familyStatus, house, car, marital,
-                               statusPeer, status3Before, view, incAbility, dataSource, createTime, updateTime
+                        SELECT {SURVEY_LIST_COLUMNS}
                         FROM py_happiness_survey
                         {where_clause}
                         ORDER BY id DESC
-                        LIMIT %s OFFSET %s
+                        {limit_clause}
                     """
-                    params.extend([page_size, offset])
                     print(f"执行SQL: {data_sql}, 参数: {params}")
+                    record_filter_usage(
+                        'survey.list', 'py_happiness_survey', data_sql, params,
+                        equality=[column for column in SURVEY_FILTER_COLUMNS if f"{column} = %s" in where_clause],
+                        order=['id']
+                    )
                     cursor.execute(data_sql, params)
                     rows = cursor.fetchall()
 
-                    return page_response(rows, total, page_num, page_size)
+                    # 多取的一条只用来判断是否还有下一页
+                    next_page_token = None
+                    if len(rows) > page_size:
+                        rows = rows[:page_size]
+                        next_page_token = encode_page_token({
+                            'id': rows[-1]['id'], 'page': page_num + 1, 'total': total, 'f': fingerprint
+                        })
+
+                    result = page_response(rows, total, page_num, page_size, estimated)
+                    result['data']['nextPageToken'] = next_page_token
+                    return result
 
         except Exception as e:
             print(f"获取幸福感调查表列表失败: {str(e)}")
@@ -147,75 +226,183 @@ class HappinessSurveyService:
             return error(f"获取幸福感调查表详情失败: {str(e)}")
 
     @staticmethod
-    def get_happiness_statistics():
+    def get_stats_index():
         """
-        获取幸福感统计数据
+        获取统计用的位图索引：首次使用时（索引尚未构建）在请求中从数据库加载；
+        之后每隔 STATS_INDEX_CHECK_INTERVAL 秒在后台线程中检查表是否有变化并重建，
+        重建完成前请求继续使用旧索引，不在请求中查询数据库
+        """
+        if _stats_index['index'] is None:
+            return HappinessSurveyService.refresh_stats_index(only_if_missing=True)
+        if time.monotonic() - _stats_index['checked'] >= STATS_INDEX_CHECK_INTERVAL:
+            HappinessSurveyService.warm_stats_index()
+        return _stats_index['index']
+
+    @staticmethod
+    def warm_stats_index():
+        """在后台线程中检查并重建统计位图索引（应用启动时和索引过期时调用，同一时间只有一个线程）"""
+        with _stats_index_lock:
+            if _stats_index['refreshing']:
+                return
+            _stats_index['refreshing'] = True
+
+        def build():
+            try:
+                HappinessSurveyService.refresh_stats_index()
+            except Exception as e:
+                # 失败时保留旧索引，等下一个检查周期再重试
+                print(f"构建统计位图索引失败: {str(e)}")
+                _stats_index['checked'] = time.monotonic()
+            finally:
+                _stats_index['refreshing'] = False
+
+        threading.Thread(target=build, name='survey-stats-index', daemon=True).start()
+
+    @staticmethod
+    def refresh_stats_index(only_if_missing=False):
+        """
+        检查表的行数、最大id和最后更新时间，有变化时重建位图索引（构建好后整体替换，读请求不会看到半成品）
+
+        Args:
+            only_if_missing: 只在索引尚未构建时构建（等待其他线程构建完成的请求直接使用其结果）
 
         Returns:
-            dict: 统计数据
+            BitmapIndex: 最新的索引
         """
-        try:
+        with _stats_build_lock:
+            if only_if_missing and _stats_index['index'] is not None:
+                return _stats_index['index']
+
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    # 幸福感评分分布统计
-                    happiness_stats_sql = """
-                        SELECT happiness, COUNT(*) as count
+                    signature_sql = """
+                        SELECT COUNT(*) as total, MAX(id) as maxId, MAX(updateTime) as lastUpdate
                         FROM py_happiness_survey
-                        GROUP BY happiness
-                        ORDER BY happiness
                     """
-                    print(f"执行SQL: {happiness_stats_sql}")
-                    cursor.execute(happiness_stats_sql)
-                    happiness_stats = cursor.fetchall()
+                    cursor.execute(signature_sql)
+                    signature = tuple(cursor.fetchone().values())
+
+                if signature != _stats_index['signature']:
+                    start = time.perf_counter()
+                    with conn.cursor(pymysql.cursors.Cursor) as cursor:
+                        load_sql = f"SELECT {', '.join(STATS_COLUMNS)} FROM py_happiness_survey"
+                        print(f"执行SQL: {load_sql}")
+                        cursor.execute(load_sql)
+                        rows = cursor.fetchall()
+                    columns = list(zip(*rows)) if rows else [()] * len(STATS_COLUMNS)
+                    _stats_index['index'] = BitmapIndex(dict(zip(STATS_COLUMNS, columns)))
+                    _stats_index['signature'] = signature
+                    print(f"统计位图索引已重建: {len(rows)}行，耗时{time.perf_counter() - start:.2f}s")
+
+            _stats_index['checked'] = time.monotonic()
+            return _stats_index['index']
 
-                    # 性别分布统计
-                    gender_stats_sql = """
-                        SELECT gender, COUNT(*) as count
-                        FROM py_happiness_survey
-                        WHERE gender IS NOT NULL
-                        GROUP BY gender
-                        ORDER BY gender
-                    """
-                    print(f"执行SQL: {gender_stats_sql}")
-                    cursor.execute(gender_stats_sql)
-                    gender_stats = cursor.fetchall()
+    @staticmethod
+    def get_happiness_statistics(filters=None):
+        """
+        获取幸福感统计数据（基于内存位图索引，支持与列表相同的等值筛选）
 
-                    # 教育水平分布统计
-                    edu_stats_sql = """
-                        SELECT edu, COUNT(*) as count
-                        FROM py_happiness_survey
-                        WHERE edu IS NOT NULL
-                        GROUP BY edu
-                        ORDER BY edu
-                    """
-                    print(f"执行SQL: {edu_stats_sql}")
-                    cursor.execute(edu_stats_sql)
-                    edu_stats = cursor.fetchall()
+        Args:
+            filters: 筛选条件字典，列名为 STATS_COLUMNS 中的列；
+                     与列表相同，未指定 show_all 时只统计有 happiness 值的记录
 
-                    # 数据来源统计
-                    source_stats_sql = """
-                        SELECT dataSource, COUNT(*) as count
-                        FROM py_happiness_survey
-                        GROUP BY dataSource
-                    """
-                    print(f"执行SQL: {source_stats_sql}")
-                    cursor.execute(source_stats_sql)
-                    source_stats = cursor.fetchall()
-
-                    # 总记录数
-                    total_sql = "SELECT COUNT(*) as total FROM py_happiness_survey"
-                    print(f"执行SQL: {total_sql}")
-                    cursor.execute(total_sql)
-                    total = cursor.fetchone()['total']
-
-                    return success({
-                        "total": total,
-                        "happinessStats": happiness_stats,
-                        "genderStats": gender_stats,
-                        "eduStats": edu_stats,
-                        "sourceStats": source_stats
-                    })
+        Returns:
+            dict: 统计数据
+        """
+        try:
+            show_all = bool((filters or {}).get('show_all'))
+            filters = {name: value for name, value in (filters or {}).items() if name in STATS_COLUMNS}
+            index = HappinessSurveyService.get_stats_index()
+
+            start = time.perf_counter()
+            mask = index.mask(filters, not_null=() if show_all else ('happiness',))
+
+            def stats(column, key, include_null=False):
+                return [{key: value, "count": count}
+                        for value, count in index.distribution(column, mask, include_null)]
+
+            result = {
+                "total": index.count(mask),
+                # 幸福感分布只在 show_all 时包含空值，性别和教育水平不含空值
+                "happinessStats": stats('happiness', 'happiness', include_null=True),
+                "genderStats": stats('gender', 'gender'),
+                "eduStats": stats('edu', 'edu'),
+                "sourceStats": stats('dataSource', 'dataSource', include_null=True),
+                "provinceStats": stats('province', 'province'),
+                "maritalStats": stats('marital', 'marital'),
+                "healthStats": stats('health', 'health'),
+                "filters": filters,
+                "elapsedUs": round((time.perf_counter() - start) * 1e6, 1)
+            }
+            return success(result)
 
         except Exception as e:
             print(f"获取幸福感统计数据失败: {str(e)}")
             return error(f"获取幸福感统计数据失败: {str(e)}")
+
+    @staticmethod
+    def iter_export(filters=None, table='survey', compress=False):
+        """
+        流式导出调查数据为CSV（可选gzip压缩）。
+        使用无缓冲的服务端游标（SSDictCursor）逐批读取，内存占用与数据量无关；
+        先发送表头，之后每攒够 EXPORT_CHUNK_BYTES 字节发送一次。
+
+        Args:
+            filters: 与 get_happiness_survey_list 相同的筛选条件
+            table: 'survey' 或 'complete'
+            compress: 是否gzip压缩
+
+        Yields:
+            bytes: 文件内容分块
+        """
+        table_name, columns = EXPORT_TABLES[table]
+        where_conditions, params = HappinessSurveyService.build_survey_filters(filters)
+        where_clause = ""
+        if where_conditions:
+            where_clause = "WHERE " + " AND ".join(where_conditions)
+        sql = f"SELECT {columns} FROM {table_name} {where_clause} ORDER BY id"
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+
+        def drain(final=False):
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            if compressor is not None:
+                data = compressor.compress(data) + (compressor.flush() if final else b'')
+            return data
+
+        rows = 0
+        conn = get_db_connection()
+        try:
+            # 客户端中途断开时直接关闭连接，不用 with 关闭游标（那样会先读完剩余的结果集）
+            cursor = conn.cursor(pymysql.cursors.SSDictCursor)
+            print(f"执行SQL: {sql}, 参数: {params}")
+            cursor.execute(sql, params)
+            header = [column[0] for column in cursor.description]
+            # 带BOM，Excel 打开时能正确识别中文
+            buffer.write('\ufeff')
+            writer.writerow(header)
+            yield drain()
+
+            while True:
+                batch = cursor.fetchmany(EXPORT_FETCH_SIZE)
+                if not batch:
+                    break
+                for row in batch:
+                    writer.writerow([row[column] for column in header])
+                rows += len(batch)
+                if buffer.tell() >= EXPORT_CHUNK_BYTES:
+                    data = drain()
+                    if data:
+                        yield data
+            yield drain(final=True)
+            print(f"导出{table_name}完成，共{rows}条")
+        except Exception as e:
+            # 响应已经开始发送，无法再返回错误信息，只能记录并中断
+            print(f"导出{table_name}失败（已导出{rows}条）: {str(e)}")
+            raise
+        finally:
+            conn.close()
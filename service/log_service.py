@@ -1,9 +1,26 @@
 """
 操作日志服务
 """
-from utils.db_utils import get_db_connection
-from utils.response import page_response, error
-from datetime import datetime
+from utils.db_utils import get_db_connection, logger
+from utils.cache_utils import count_rows, invalidate_table_counts
+from utils.log_tables import (INSERT_LOG_SQL, fulltext_available, get_retention_scheduler, insert_log_rows,
+                              log_table_name, tables_for_range)
+from utils.log_tables import apply_retention as apply_log_retention
+from utils.log_writer import get_log_writer
+from utils.response import page_response, success, error
+from config.config import LOG_ASYNC_ENABLED, LOG_RETENTION_MONTHS, LOG_ARCHIVE_DIR
+from datetime import datetime, timedelta
+import re
+
+# MySQL ngram 全文解析器的分词长度（ngram_token_size，默认2）
+NGRAM_TOKEN_SIZE = 2
+
+# BOOLEAN MODE 中有特殊含义的字符，用户输入中的这些字符会被去掉
+FULLTEXT_OPERATORS = re.compile(r'[+\-<>()~*"@]')
+
+# 日志列表查询的字段
+LOG_LIST_COLUMNS = """id, userId, username, module, action, detail, status,
+                   ip, userAgent, requestMethod, requestPath, createTime"""
 
 
 class LogService:
@@ -13,89 +30,171 @@ class LogService:
     def record_log(user_id=None, username=None, action="", module="", detail="", status=1,
                    ip=None, user_agent=None, request_method=None, request_path=None):
         """
-        记录操作日志
+        记录操作日志：默认放入异步写入队列后立即返回，由后台线程批量写入数据库
         """
+        params = (
+            user_id, username, action, module, detail, status,
+            ip, user_agent, request_method, request_path, datetime.now()
+        )
+        get_retention_scheduler()
+        if LOG_ASYNC_ENABLED:
+            get_log_writer().submit(params)
+            return
+
         try:
             with get_db_connection() as conn:
                 with conn.cursor() as cursor:
-                    sql = """
-                        INSERT INTO py_operation_logs
-                        (userId, username, action, module, detail, status, ip, userAgent, requestMethod, requestPath, createTime)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NOW())
-                    """
-                    params = [
-                        user_id, username, action, module, detail, status,
-                        ip, user_agent, request_method, request_path
-                    ]
-                    print(f"执行SQL: {sql}, 参数: {params}")
-                    cursor.execute(sql, params)
+                    logger.debug(f"执行SQL: {INSERT_LOG_SQL.format(table=log_table_name(params[-1]))}, 参数: {params}")
+                    tables = insert_log_rows(cursor, [params])
                     conn.commit()
+            for table in tables:
+                invalidate_table_counts(table)
         except Exception as e:
             # 日志记录失败不影响主流程
             print(f"记录操作日志失败: {str(e)}")
 
     @staticmethod
-    def get_log_list(page_num=1, page_size=10, keyword=None, module=None,
-                     status=None, username=None, action=None):
+    def get_writer_stats():
+        """获取异步日志写入统计（入队、写入、丢弃、失败条数及队列积压）"""
+        if not LOG_ASYNC_ENABLED:
+            return success({'async': False})
+        return success(dict(get_log_writer().get_stats(), **{'async': True}))
+
+    @staticmethod
+    def build_fulltext_query(keyword):
         """
-        分页获取操作日志
+        将用户输入转为 BOOLEAN MODE 检索式：空格分隔的每个词都必须出现，词尾的 * 表示前缀匹配；
+        长度不足 ngram 分词长度的词无法用全文索引检索，返回 None
         """
+        terms = []
+        for word in keyword.split():
+            prefix = word.endswith('*')
+            term = FULLTEXT_OPERATORS.sub('', word)
+            if len(term) < NGRAM_TOKEN_SIZE:
+                return None
+            terms.append(f'+{term}*' if prefix else f'+"{term}"')
+        return ' '.join(terms) if terms else None
+
+    @staticmethod
+    def escape_like(value):
+        """转义 LIKE 通配符"""
+        return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+    @staticmethod
+    def apply_retention():
+        """立即执行一次日志保留策略（搬迁旧日志、归档并删除过期月表）"""
         try:
-            with get_db_connection() as conn:
-                with conn.cursor() as cursor:
-                    conditions = []
-                    params = []
+            result = apply_log_retention(LOG_RETENTION_MONTHS, LOG_ARCHIVE_DIR)
+            if result is None:
+                return error("保留策略正在其他进程中执行")
+            return success(result)
+        except Exception as e:
+            print(f"执行日志保留策略失败: {str(e)}")
+            return error(f"执行日志保留策略失败: {str(e)}")
 
-                    if keyword:
-                        conditions.append("(detail LIKE %s OR requestPath LIKE %s)")
-                        keyword_param = f"%{keyword}%"
-                        params.extend([keyword_param, keyword_param])
+    @staticmethod
+    def resolve_time_range(start_date=None, end_date=None):
+        """
+        将查询的日期范围转为 [start_time, end_time)：结束日期包含当天；
+        未指定的一端为 None（不限制），都未指定时查询全部月表
+        """
+        start_time = datetime.combine(start_date, datetime.min.time()) if start_date else None
+        end_time = datetime.combine(end_date, datetime.min.time()) + timedelta(days=1) if end_date else None
+        return start_time, end_time
 
-                    if module:
-                        conditions.append("module = %s")
-                        params.append(module)
+    @staticmethod
+    def build_log_filters(keyword=None, module=None, status=None, username=None, action=None,
+                          start_time=None, end_time=None, fulltext=True):
+        """
+        构造操作日志的筛选条件：
+        关键词优先走全文索引（MATCH ... AGAINST），过短或索引不可用时退回 LIKE；
+        用户名和操作类型按包含匹配（与分表前的行为一致）
+
+        Returns:
+            tuple: (conditions, params)
+        """
+        conditions = []
+        params = []
+
+        if start_time:
+            conditions.append("createTime >= %s")
+            params.append(start_time)
+
+        if end_time:
+            conditions.append("createTime < %s")
+            params.append(end_time)
 
-                    if username:
-                        conditions.append("username LIKE %s")
-                        params.append(f"%{username}%")
+        if keyword:
+            fulltext_query = LogService.build_fulltext_query(keyword) if fulltext else None
+            if fulltext_query:
+                conditions.append("MATCH(detail, requestPath) AGAINST (%s IN BOOLEAN MODE)")
+                params.append(fulltext_query)
+            else:
+                conditions.append("(detail LIKE %s OR requestPath LIKE %s)")
+                keyword_param = f"%{LogService.escape_like(keyword)}%"
+                params.extend([keyword_param, keyword_param])
 
-                    if action:
-                        conditions.append("action LIKE %s")
-                        params.append(f"%{action}%")
+        if module:
+            conditions.append("module = %s")
+            params.append(module)
 
-                    if status in [0, 1]:
-                        conditions.append("status = %s")
-                        params.append(status)
+        if username:
+            conditions.append("username LIKE %s")
+            params.append(f"%{LogService.escape_like(username)}%")
 
-                    where_clause = ""
-                    if conditions:
-                        where_clause = "WHERE " + " AND ".join(conditions)
+        if action:
+            conditions.append("action LIKE %s")
+            params.append(f"%{LogService.escape_like(action)}%")
 
-                    count_sql = f"SELECT COUNT(*) AS total FROM py_operation_logs {where_clause}"
-                    print(f"执行SQL: {count_sql}, 参数: {params}")
-                    cursor.execute(count_sql, params)
-                    total = cursor.fetchone().get('total', 0)
+        if status in [0, 1]:
+            conditions.append("status = %s")
+            params.append(status)
+
+        return conditions, params
+
+    @staticmethod
+    def get_log_list(page_num=1, page_size=10, keyword=None, module=None,
+                     status=None, username=None, action=None, start_date=None, end_date=None):
+        """
+        分页获取操作日志：只查询时间范围覆盖到的月表，每张表先取前 offset+page_size 条再合并排序
+        """
+        try:
+            start_time, end_time = LogService.resolve_time_range(start_date, end_date)
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    tables = tables_for_range(cursor, start_time, end_time)
+                    if not tables:
+                        return page_response([], 0, page_num, page_size)
+
+                    fulltext = fulltext_available(cursor, tables)
+                    conditions, params = LogService.build_log_filters(
+                        keyword, module, status, username, action, start_time, end_time, fulltext
+                    )
+                    where_clause = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+                    # 按月表分别统计并缓存：往月的表不再写入，翻页和切换当月筛选时不会重复统计
+                    total = 0
+                    estimated = False
+                    for table in tables:
+                        table_total, table_estimated = count_rows(table, where_clause, params, cursor)
+                        total += table_total
+                        estimated = estimated or table_estimated
 
                     offset = (page_num - 1) * page_size
-                    data_sql = f"""
-                        SELECT id, userId, username, module, action, detail, status,
-                               ip, userAgent, requestMethod, requestPath, createTime
-                        FROM py_operation_logs
-                        {where_clause}
-                        ORDER BY createTime DESC
-                        LIMIT %s OFFSET %s
-                    """
-                    params_with_page = params + [page_size, offset]
-                    print(f"执行SQL: {data_sql}, 参数: {params_with_page}")
-                    cursor.execute(data_sql, params_with_page)
+                    data_sql = "SELECT * FROM (" + " UNION ALL ".join(
+                        f"(SELECT {LOG_LIST_COLUMNS} FROM `{table}` {where_clause} "
+                        f"ORDER BY createTime DESC, id DESC LIMIT %s)" for table in tables
+                    ) + ") t ORDER BY createTime DESC, id DESC LIMIT %s OFFSET %s"
+                    data_params = (params + [offset + page_size]) * len(tables) + [page_size, offset]
+                    print(f"执行SQL: {data_sql}, 参数: {data_params}")
+                    cursor.execute(data_sql, data_params)
                     rows = cursor.fetchall()
 
                     for row in rows:
                         if isinstance(row.get('createTime'), datetime):
                             row['createTime'] = row['createTime'].strftime('%Y-%m-%d %H:%M:%S')
 
-                    return page_response(rows, total, page_num, page_size)
+                    return page_response(rows, total, page_num, page_size, estimated)
         except Exception as e:
             print(f"获取操作日志失败: {str(e)}")
             return error(f"获取操作日志失败: {str(e)}")
-
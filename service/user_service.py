@@ -1,6 +1,7 @@
 from utils.db_utils import execute_query, execute_insert, execute_update, execute_delete
+from utils.cache_utils import count_rows, invalidate_table_counts
 from utils.file_utils import allowed_file, save_file
-from utils.auth_utils import hash_password
+from utils.auth_utils import hash_password, invalidate_user
 import time
 import logging
 import os
@@ -37,10 +38,8 @@ class UserService:
             if where_conditions:
                 where_clause = "WHERE " + " AND ".join(where_conditions)
             
-            # 查询总数
-            count_sql = f"SELECT COUNT(*) as total FROM py_user {where_clause}"
-            count_result = execute_query(count_sql, params)
-            total = count_result[0]['total'] if count_result else 0
+            # 查询总数（按筛选条件缓存，用户变更时失效）
+            total, _ = count_rows('py_user', where_clause, params)
             
             # 查询用户列表
             offset = (page - 1) * limit
@@ -124,6 +123,8 @@ class UserService:
             result = execute_update(sql, params)
             
             if result > 0:
+                invalidate_table_counts('py_user')
+                invalidate_user(user_id)
                 logger.info(f"用户 {user_id} 信息更新成功")
                 return True
             return False
@@ -139,6 +140,8 @@ class UserService:
             result = execute_delete(sql, (user_id,))
             
             if result > 0:
+                invalidate_table_counts('py_user')
+                invalidate_user(user_id)
                 logger.info(f"用户 {user_id} 删除成功")
                 return True
             return False
@@ -223,6 +226,7 @@ class UserService:
             result = execute_update(update_sql, (avatar_url, current_time, user_id))
             
             if result > 0:
+                invalidate_user(user_id)
                 logger.info(f"用户 {user_id} 头像上传成功")
                 return avatar_url
             return None
@@ -260,6 +264,7 @@ class UserService:
                 data.get('content'), data.get('remarks'), data.get('role') or 'user',
                 data.get('status', 'active'), current_time, current_time
             ))
+            invalidate_table_counts('py_user')
             
             logger.info(f"用户 {data['username']} 添加成功")
             return True
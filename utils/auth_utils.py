@@ -1,11 +1,79 @@
 import time
 import logging
+import threading
 from functools import wraps
 from flask import session, request, jsonify, g
+from utils.db_utils import execute_query
 from utils.response import error
+from utils.session_store import get_session_store
 
 logger = logging.getLogger(__name__)
 
+# 会话中保存的用户字段：会话键 -> 用户记录字段
+SESSION_USER_FIELDS = {'username': 'username', 'nickname': 'nickname', 'role': 'role', 'avatar': 'avatar'}
+USER_RECORD_SQL = "SELECT id, username, nickname, avatar, role, status FROM py_user WHERE id = %s"
+
+# 进程内用户记录缓存：用户ID -> (版本号, 用户记录)；版本号保存在会话存储中，修改/删除用户时加1
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+def get_cached_user(user_id):
+    """
+    获取用户记录：缓存的版本号与会话存储中的一致时直接返回，否则查询数据库并缓存
+    
+    Returns:
+        dict: 用户记录，用户不存在时返回 None
+    """
+    version = get_session_store().user_version(user_id)
+    with _user_cache_lock:
+        cached = _user_cache.get(user_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    
+    rows = execute_query(USER_RECORD_SQL, (user_id,))
+    user = rows[0] if rows else None
+    with _user_cache_lock:
+        # 查询期间版本号又变化时，缓存的是旧版本号，下次检查会重新查询
+        _user_cache[user_id] = (version, user)
+    return user
+
+def invalidate_user(user_id):
+    """用户被修改或删除后调用：版本号加1，所有进程中缓存的该用户记录随之失效"""
+    try:
+        user_id = int(user_id)
+        get_session_store().bump_user_version(user_id)
+        with _user_cache_lock:
+            _user_cache.pop(user_id, None)
+    except Exception as e:
+        logger.error(f"使用户缓存失效失败: {e}")
+
+def load_session_user():
+    """
+    当前会话对应的最新用户记录；未登录、用户已删除或被禁用时返回 None（后两种情况同时清除会话）
+    用户的角色、昵称、头像有变化时同步到会话中
+    """
+    user_id = session.get('user_id')
+    if user_id is None:
+        return None
+    
+    try:
+        user = get_cached_user(user_id)
+    except Exception as e:
+        # 数据库暂时不可用时沿用会话中的信息
+        logger.error(f"获取用户信息失败: {e}")
+        return {'id': user_id, 'status': 'active',
+                **{field: session.get(key) for key, field in SESSION_USER_FIELDS.items()}}
+    
+    if not user or user.get('status') != 'active':
+        logger.warning(f"用户 {session.get('username')} 已被删除或禁用，会话失效")
+        session.clear()
+        return None
+    
+    for key, field in SESSION_USER_FIELDS.items():
+        if session.get(key) != user[field]:
+            session[key] = user[field]
+    return user
+
 def hash_password(password):
     """密码不加密，直接返回原密码"""
     return password
@@ -14,7 +82,7 @@ def login_required(f):
     """登录验证装饰器"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        if load_session_user() is None:
             logger.warning("用户未登录，访问被拒绝")
             return jsonify(error("请先登录", 401))
         return f(*args, **kwargs)
@@ -24,11 +92,12 @@ def admin_required(f):
     """管理员权限验证装饰器"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        user = load_session_user()
+        if user is None:
             logger.warning("用户未登录，访问被拒绝")
             return jsonify(error("请先登录", 401))
         
-        user_role = session.get('role')
+        user_role = user['role']
         if user_role != 'admin':
             logger.warning(f"用户 {session.get('username')} 权限不足，需要管理员权限")
             return jsonify(error("权限不足", 403))
@@ -40,11 +109,12 @@ def operation_required(f):
     """操作员权限验证装饰器（操作员及以上权限）"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        user = load_session_user()
+        if user is None:
             logger.warning("用户未登录，访问被拒绝")
             return jsonify(error("请先登录", 401))
 
-        user_role = session.get('role')
+        user_role = user['role']
         if user_role not in ['admin', 'operation']:
             logger.warning(f"用户 {session.get('username')} 权限不足，需要操作员或管理员权限")
             return jsonify(error("权限不足", 403))
@@ -56,11 +126,12 @@ def teacher_required(f):
     """教师权限验证装饰器"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
+        user = load_session_user()
+        if user is None:
             logger.warning("用户未登录，访问被拒绝")
             return jsonify(error("请先登录", 401))
 
-        user_role = session.get('role')
+        user_role = user['role']
         if user_role not in ['admin', 'teacher']:
             logger.warning(f"用户 {session.get('username')} 权限不足，需要教师或管理员权限")
             return jsonify(error("权限不足", 403))
@@ -70,7 +141,7 @@ def teacher_required(f):
 
 def get_current_user():
     """获取当前登录用户信息"""
-    if 'user_id' in session:
+    if load_session_user() is not None:
         return {
             'id': session.get('user_id'),
             'username': session.get('username'),
@@ -81,7 +152,9 @@ def get_current_user():
     return None
 
 def set_user_session(user):
-    """设置用户会话"""
+    """设置用户会话（登录时更换会话ID）"""
+    if hasattr(session, 'regenerate'):
+        session.regenerate()
     session['user_id'] = user['id']
     session['username'] = user['username']
     session['nickname'] = user['nickname']
@@ -0,0 +1,79 @@
+"""
+内存位图索引
+对低基数列的每个取值保存一个位图（按行打包为 uint8 的 NumPy 数组，每字节8行），
+任意等值筛选组合先按位与得到行掩码，再与各列的位图按位与后用查表法统计1的个数，得到各列的分布。
+"""
+import numpy as np
+import pandas as pd
+
+# 0~255 每个字节中1的个数
+POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+
+def popcount(bits, axis=-1):
+    """打包位图中1的个数"""
+    return POPCOUNT_TABLE[bits].sum(axis=axis, dtype=np.int64)
+
+
+class BitmapIndex:
+    """一组列的位图索引（构建后只读，可在多个线程间共享）"""
+
+    def __init__(self, columns):
+        """
+        Args:
+            columns: 列名 -> 该列所有行的取值（各列长度相同，None/NaN 表示空值）
+        """
+        self.size = len(next(iter(columns.values()))) if columns else 0
+        self.nbytes = (self.size + 7) // 8
+        # 末尾不足一个字节的填充位为0，全1掩码也要去掉这些位
+        self.all_rows = np.packbits(np.ones(self.size, dtype=bool))
+        self.columns = {}
+        for name, values in columns.items():
+            codes, uniques = pd.factorize(pd.Series(values, dtype=object), use_na_sentinel=True)
+            one_hot = codes[None, :] == np.arange(len(uniques))[:, None]
+            self.columns[name] = {
+                'values': [value.item() if hasattr(value, 'item') else value for value in uniques],
+                'bitmaps': np.packbits(one_hot, axis=1).reshape(len(uniques), self.nbytes),
+                'nulls': np.packbits(codes == -1),
+            }
+
+    def mask(self, filters=None, not_null=()):
+        """
+        等值筛选条件对应的行掩码
+
+        Args:
+            filters: 列名 -> 取值；取值不存在时结果为空
+            not_null: 需要排除空值的列
+        """
+        result = self.all_rows.copy()
+        for name, value in (filters or {}).items():
+            column = self.columns[name]
+            try:
+                position = column['values'].index(value)
+            except ValueError:
+                return np.zeros(self.nbytes, dtype=np.uint8)
+            np.bitwise_and(result, column['bitmaps'][position], out=result)
+        for name in not_null:
+            np.bitwise_and(result, ~self.columns[name]['nulls'], out=result)
+        return result
+
+    def count(self, mask):
+        """掩码中的行数"""
+        return int(popcount(mask))
+
+    def distribution(self, name, mask, include_null=False):
+        """
+        某列在掩码范围内的取值分布
+
+        Returns:
+            list: [(取值, 行数)]，按取值排序，不含行数为0的取值
+        """
+        column = self.columns[name]
+        counts = popcount(column['bitmaps'] & mask)
+        result = [(value, int(count)) for value, count in zip(column['values'], counts) if count]
+        result.sort(key=lambda item: (isinstance(item[0], str), item[0]))
+        if include_null:
+            null_count = int(popcount(column['nulls'] & mask))
+            if null_count:
+                result.insert(0, (None, null_count))
+        return result
@@ -0,0 +1,132 @@
+"""
+列表总数缓存
+分页列表翻页时筛选条件不变，总数按 (表名, WHERE 子句, 参数) 缓存，避免每翻一页都重新 COUNT(*)。
+缓存项按表名打标签，本进程写入某张表后调用 invalidate_table_counts 使该表的缓存失效；
+其他进程（如数据导入脚本）的写入靠过期时间兜底。
+大表可开启估算模式：EXPLAIN 估计的行数超过阈值时直接返回估算值，不做精确统计。
+"""
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from config.config import COUNT_CACHE_TTL, COUNT_CACHE_MAX_ENTRIES, COUNT_ESTIMATE_MODE, COUNT_ESTIMATE_THRESHOLD
+from utils.db_utils import execute_query, logger
+
+
+class TTLCache:
+    """带过期时间和标签失效的 LRU 缓存（线程安全）"""
+
+    def __init__(self, ttl=60, max_entries=1000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, tags, value)
+        self._stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, key):
+        """命中返回 (True, value)，未命中或已过期返回 (False, None)"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._stats['misses'] += 1
+                return False, None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return True, entry[2]
+
+    def set(self, key, value, tags=()):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, frozenset(tags), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, tag):
+        """删除带有该标签的所有缓存项"""
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if tag in entry[1]]
+            for key in keys:
+                del self._entries[key]
+            if keys:
+                self._stats['invalidations'] += len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self._stats, entries=len(self._entries))
+
+
+count_cache = TTLCache(COUNT_CACHE_TTL, COUNT_CACHE_MAX_ENTRIES)
+
+
+def _query(cursor, sql, params):
+    if cursor is None:
+        return execute_query(sql, params)
+    cursor.execute(sql, params)
+    return cursor.fetchall()
+
+
+def estimate_rows(table, where_clause='', params=(), cursor=None):
+    """用 EXPLAIN 的 rows * filtered 估算满足条件的行数"""
+    plan = _query(cursor, f"EXPLAIN SELECT 1 FROM {table} {where_clause}", list(params))
+    if not plan:
+        return 0
+    row = plan[0]
+    rows = row.get('rows') or 0
+    filtered = row.get('filtered')
+    if filtered is not None:
+        rows = rows * float(filtered) / 100
+    return int(rows)
+
+
+def count_rows(table, where_clause='', params=(), cursor=None, estimate=None):
+    """
+    统计满足条件的行数（带缓存）
+
+    Args:
+        table: 表名（同时作为失效标签）
+        where_clause: 完整的 WHERE 子句（可为空）
+        params: WHERE 子句的参数
+        cursor: 已打开的游标，不传时使用 execute_query
+        estimate: 是否允许返回估算值，None 表示按 COUNT_ESTIMATE_MODE 配置
+
+    Returns:
+        tuple: (total, estimated)
+    """
+    params = tuple(params)
+    key = (table, re.sub(r'\s+', ' ', where_clause).strip(), params)
+    hit, value = count_cache.get(key)
+    if hit:
+        return value
+
+    if estimate is None:
+        estimate = COUNT_ESTIMATE_MODE == 'explain'
+
+    value = None
+    if estimate:
+        try:
+            approx = estimate_rows(table, where_clause, params, cursor)
+            if approx >= COUNT_ESTIMATE_THRESHOLD:
+                value = (approx, True)
+        except Exception as e:
+            logger.warning(f"估算 {table} 行数失败，改为精确统计: {e}")
+
+    if value is None:
+        count_sql = f"SELECT COUNT(*) as total FROM {table} {where_clause}"
+        print(f"执行SQL: {count_sql}, 参数: {list(params)}")
+        result = _query(cursor, count_sql, list(params))
+        value = (result[0]['total'] if result else 0, False)
+
+    count_cache.set(key, value, tags=(table,))
+    return value
+
+
+def invalidate_table_counts(table):
+    """表数据变化后调用，使该表的总数缓存失效"""
+    count_cache.invalidate(table)
@@ -0,0 +1,81 @@
+"""
+查询筛选组合使用记录
+列表和分析接口每次查询时记录 (接口, 表, 等值筛选列, 排序列, 涉及的列) 组合的次数和一条示例SQL，
+定期追加写入 JSON Lines 文件，供 bean/index_advisor.py 分析并建议复合索引/覆盖索引。
+记录只在内存中计数，写文件在达到间隔后由下一次记录顺带完成（进程退出时也会写入）。
+"""
+import atexit
+import json
+import os
+import threading
+import time
+
+from config.config import FILTER_USAGE_ENABLED, FILTER_USAGE_FILE, FILTER_USAGE_FLUSH_INTERVAL
+from utils.db_utils import logger
+
+_lock = threading.Lock()
+_usage = {}  # 组合 -> {'count': n, 'sql': 示例SQL, 'params': 示例参数}
+_last_flush = time.monotonic()
+
+
+def record_filter_usage(endpoint, table, sql, params=(), equality=(), order=(), columns=()):
+    """
+    记录一次查询的筛选组合
+
+    Args:
+        endpoint: 接口标识，如 'survey.list'
+        table: 查询的表
+        sql: 实际执行的SQL（用于 EXPLAIN）
+        params: SQL 参数
+        equality: 等值筛选的列
+        order: ORDER BY 的列（列表接口）
+        columns: 查询涉及的全部列（聚合查询用于建议覆盖索引，第一列为分组列）
+    """
+    if not FILTER_USAGE_ENABLED:
+        return
+    key = (endpoint, table, tuple(equality), tuple(order), tuple(columns))
+    with _lock:
+        entry = _usage.get(key)
+        if entry is None:
+            _usage[key] = {'count': 1, 'sql': sql, 'params': list(params)}
+        else:
+            entry['count'] += 1
+            entry['sql'] = sql
+            entry['params'] = list(params)
+        due = time.monotonic() - _last_flush >= FILTER_USAGE_FLUSH_INTERVAL
+    if due:
+        flush_filter_usage()
+
+
+def flush_filter_usage():
+    """把内存中累计的次数追加写入文件并清零"""
+    global _usage, _last_flush
+    with _lock:
+        usage, _usage = _usage, {}
+        _last_flush = time.monotonic()
+    if not usage:
+        return
+
+    try:
+        directory = os.path.dirname(FILTER_USAGE_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(FILTER_USAGE_FILE, 'a', encoding='utf-8') as f:
+            for (endpoint, table, equality, order, columns), entry in usage.items():
+                f.write(json.dumps({
+                    'endpoint': endpoint,
+                    'table': table,
+                    'equality': list(equality),
+                    'order': list(order),
+                    'columns': list(columns),
+                    'count': entry['count'],
+                    'sql': entry['sql'],
+                    'params': entry['params'],
+                    'time': time.strftime('%Y-%m-%d %H:%M:%S')
+                }, ensure_ascii=False, default=str))
+                f.write('\n')
+    except Exception as e:
+        logger.warning(f"写入筛选组合记录失败: {e}")
+
+
+atexit.register(flush_filter_usage)
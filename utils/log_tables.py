@@ -0,0 +1,339 @@
+"""
+操作日志按月分表
+日志按 createTime 写入 py_operation_logs_YYYYMM 月表（以 py_operation_logs 为模板 CREATE TABLE LIKE 创建），
+查询时只访问时间范围覆盖到的月表；超过保留期的月表导出为 gzip 压缩的 JSON Lines 文件后删除。
+检索索引在新建月表时和执行保留策略时（后台线程）创建，查询请求中只读取索引状态，不执行 DDL。
+"""
+import gzip
+import json
+import os
+import re
+import threading
+import time
+from datetime import datetime, date, timedelta
+
+import pymysql
+
+from utils.cache_utils import invalidate_table_counts
+from utils.db_utils import get_db_connection, logger
+
+TEMPLATE_TABLE = 'py_operation_logs'
+LOG_TABLE_PREFIX = 'py_operation_logs_'
+LOG_TABLE_PATTERN = re.compile(r'^py_operation_logs_(\d{6})$')
+
+LOG_COLUMNS = ('id', 'userId', 'username', 'action', 'module', 'detail', 'status', 'ip',
+               'userAgent', 'requestMethod', 'requestPath', 'createTime')
+
+INSERT_LOG_SQL = """
+    INSERT INTO `{table}`
+    (userId, username, action, module, detail, status, ip, userAgent, requestMethod, requestPath, createTime)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+# 日志检索使用的索引（模板表和每个月表上都需要）
+LOG_SEARCH_INDEXES = [
+    ('ft_logs_detail_path',
+     "ALTER TABLE `{table}` ADD FULLTEXT INDEX ft_logs_detail_path (detail, requestPath) WITH PARSER ngram"),
+    ('idx_logs_create_time', "ALTER TABLE `{table}` ADD INDEX idx_logs_create_time (createTime)"),
+]
+
+TABLE_LIST_TTL = 60  # 月表列表缓存时间（秒），索引不可用的表也按这个间隔重新检查
+RETENTION_LOCK_NAME = 'py_operation_logs_retention'
+
+_lock = threading.Lock()
+_created_tables = set()
+_index_status = {}  # 表名 -> (全文索引是否可用, 检查时间)
+_table_list = {'tables': None, 'loaded': 0.0}
+
+
+def month_start(moment):
+    """所在月份的第一天零点"""
+    return datetime(moment.year, moment.month, 1)
+
+
+def add_months(moment, months):
+    """月份加减（moment 为某月第一天）"""
+    index = moment.year * 12 + moment.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def log_table_name(moment):
+    """日志时间对应的月表名"""
+    return f"{LOG_TABLE_PREFIX}{moment:%Y%m}"
+
+
+def list_log_tables(cursor, refresh=False):
+    """已存在的月表（按月份升序），结果缓存 TABLE_LIST_TTL 秒"""
+    with _lock:
+        if not refresh and _table_list['tables'] is not None \
+                and time.monotonic() - _table_list['loaded'] < TABLE_LIST_TTL:
+            return list(_table_list['tables'])
+
+    cursor.execute("""
+        SELECT TABLE_NAME FROM INFORMATION_SCHEMA.TABLES
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME LIKE 'py\\_operation\\_logs\\_%'
+    """)
+    tables = sorted(row['TABLE_NAME'] for row in cursor.fetchall() if LOG_TABLE_PATTERN.match(row['TABLE_NAME']))
+    with _lock:
+        _table_list['tables'] = tables
+        _table_list['loaded'] = time.monotonic()
+    return list(tables)
+
+
+def tables_for_range(cursor, start_time=None, end_time=None):
+    """
+    时间范围 [start_time, end_time) 覆盖到的已存在月表（按月份降序，最新的在前），
+    未指定的一端不限制（都未指定时返回全部月表）
+    """
+    first = log_table_name(start_time) if start_time else ''
+    last = log_table_name(end_time - timedelta(microseconds=1)) if end_time else '~'
+    return [table for table in reversed(list_log_tables(cursor)) if first <= table <= last]
+
+
+def existing_indexes(cursor, tables):
+    """各表已有的索引名：表名 -> 索引名集合"""
+    indexes = {table: set() for table in tables}
+    if not tables:
+        return indexes
+    placeholders = ', '.join(['%s'] * len(tables))
+    cursor.execute(f"""
+        SELECT DISTINCT TABLE_NAME, INDEX_NAME FROM INFORMATION_SCHEMA.STATISTICS
+        WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN ({placeholders})
+    """, list(tables))
+    for row in cursor.fetchall():
+        indexes[row['TABLE_NAME']].add(row['INDEX_NAME'])
+    return indexes
+
+
+def create_search_indexes(cursor, table, existing=None):
+    """
+    在表上补建缺少的日志检索索引（DDL，只在建表和执行保留策略时调用，不在查询请求中执行）。
+    单个索引创建失败（如权限不足、不支持 ngram）只跳过该索引。
+
+    Returns:
+        bool: 全文索引是否可用（不可用时检索退回 LIKE）
+    """
+    if existing is None:
+        existing = existing_indexes(cursor, [table])[table]
+    fulltext = True
+    for index_name, ddl in LOG_SEARCH_INDEXES:
+        if index_name in existing:
+            continue
+        sql = ddl.format(table=table)
+        try:
+            logger.info(f"创建操作日志索引: {sql}")
+            cursor.execute(sql)
+        except Exception as e:
+            logger.warning(f"创建操作日志检索索引失败({table}.{index_name}): {str(e)}")
+            if index_name == LOG_SEARCH_INDEXES[0][0]:
+                fulltext = False
+    with _lock:
+        _index_status.pop(table, None)
+    return fulltext
+
+
+def migrate_search_indexes(cursor):
+    """为模板表和所有月表补建缺少的检索索引，返回补建过索引的表"""
+    tables = [TEMPLATE_TABLE] + list_log_tables(cursor, refresh=True)
+    indexes = existing_indexes(cursor, tables)
+    required = {index_name for index_name, _ in LOG_SEARCH_INDEXES}
+    migrated = [table for table in tables if not required <= indexes[table]]
+    for table in migrated:
+        create_search_indexes(cursor, table, indexes[table])
+    return migrated
+
+
+def fulltext_available(cursor, tables):
+    """
+    这些表是否都有全文索引（只读取 INFORMATION_SCHEMA，不执行 DDL）。
+    可用的结果一直缓存，不可用的结果缓存 TABLE_LIST_TTL 秒，保留策略补建索引后会重新检查。
+    """
+    now = time.monotonic()
+    with _lock:
+        unknown = [table for table in tables
+                   if table not in _index_status
+                   or (not _index_status[table][0] and now - _index_status[table][1] >= TABLE_LIST_TTL)]
+    if unknown:
+        fulltext_index = LOG_SEARCH_INDEXES[0][0]
+        indexes = existing_indexes(cursor, unknown)
+        with _lock:
+            for table in unknown:
+                _index_status[table] = (fulltext_index in indexes[table], now)
+    with _lock:
+        return all(_index_status[table][0] for table in tables)
+
+
+def ensure_log_table(cursor, table):
+    """
+    确保月表存在：以模板表创建，并把自增起点接在上一张表之后，使日志 id 跨月表保持递增
+    """
+    if table in _created_tables:
+        return
+
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS `{table}` LIKE {TEMPLATE_TABLE}")
+    # 月表继承模板表的索引；模板表还没有检索索引时直接在（几乎为空的）新月表上补建
+    create_search_indexes(cursor, table)
+
+    previous = [t for t in list_log_tables(cursor, refresh=True) if t < table]
+    source = previous[-1] if previous else TEMPLATE_TABLE
+    cursor.execute(f"SELECT MAX(id) AS maxId FROM `{source}`")
+    max_id = cursor.fetchone().get('maxId')
+    if max_id:
+        # 表中已有更大的 id 时 InnoDB 会忽略这个设置
+        cursor.execute(f"ALTER TABLE `{table}` AUTO_INCREMENT = {int(max_id) + 1}")
+
+    with _lock:
+        _created_tables.add(table)
+
+
+def insert_log_rows(cursor, rows):
+    """
+    按 createTime 把日志写入对应月表
+
+    Args:
+        rows: 与 INSERT_LOG_SQL 占位符顺序一致的参数元组列表（最后一项为 createTime）
+
+    Returns:
+        list: 写入的月表（调用方提交后应使这些表的总数缓存失效）
+    """
+    groups = {}
+    for row in rows:
+        groups.setdefault(log_table_name(row[-1]), []).append(row)
+    for table, group in groups.items():
+        ensure_log_table(cursor, table)
+        cursor.executemany(INSERT_LOG_SQL.format(table=table), group)
+    return list(groups)
+
+
+def migrate_legacy_logs(conn):
+    """把模板表中分表之前写入的日志按月搬到月表（保留原 id），返回搬迁条数"""
+    moved = 0
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT DISTINCT DATE_FORMAT(createTime, '%Y%m') AS month FROM {TEMPLATE_TABLE}")
+        months = sorted(row['month'] for row in cursor.fetchall() if row['month'])
+        columns = ', '.join(LOG_COLUMNS)
+        for month in months:
+            start = datetime.strptime(month, '%Y%m')
+            end = add_months(start, 1)
+            table = log_table_name(start)
+            ensure_log_table(cursor, table)
+            cursor.execute(
+                f"INSERT INTO `{table}` ({columns}) SELECT {columns} FROM {TEMPLATE_TABLE} "
+                f"WHERE createTime >= %s AND createTime < %s", (start, end)
+            )
+            cursor.execute(f"DELETE FROM {TEMPLATE_TABLE} WHERE createTime >= %s AND createTime < %s", (start, end))
+            conn.commit()
+            invalidate_table_counts(table)
+            moved += cursor.rowcount
+            logger.info(f"操作日志 {month} 已从 {TEMPLATE_TABLE} 搬到 {table}: {cursor.rowcount} 条")
+    return moved
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.strftime('%Y-%m-%d %H:%M:%S')
+    return str(value)
+
+
+def archive_log_table(conn, table, archive_dir):
+    """
+    将月表流式导出为 gzip 压缩的 JSON Lines 文件，核对行数后删除该表
+
+    Returns:
+        dict: 归档文件路径和行数
+    """
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, f"{table}.jsonl.gz")
+    temp_path = f"{path}.tmp"
+
+    rows = 0
+    with conn.cursor(pymysql.cursors.SSDictCursor) as cursor:
+        cursor.execute(f"SELECT {', '.join(LOG_COLUMNS)} FROM `{table}` ORDER BY id")
+        with gzip.open(temp_path, 'wt', encoding='utf-8') as f:
+            for row in cursor:
+                f.write(json.dumps(row, ensure_ascii=False, default=_json_default))
+                f.write('\n')
+                rows += 1
+
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM `{table}`")
+        total = cursor.fetchone().get('total', 0)
+        if total != rows:
+            os.remove(temp_path)
+            raise RuntimeError(f"{table} 归档行数不一致: 导出{rows}条，表中{total}条")
+        os.replace(temp_path, path)
+        cursor.execute(f"DROP TABLE `{table}`")
+        conn.commit()
+
+    with _lock:
+        _created_tables.discard(table)
+        _index_status.pop(table, None)
+        _table_list['tables'] = None
+    invalidate_table_counts(table)
+    logger.info(f"操作日志 {table} 已归档到 {path}（{rows}条）并删除")
+    return {'table': table, 'file': path, 'rows': rows}
+
+
+def apply_retention(retention_months, archive_dir):
+    """
+    执行保留策略：先搬迁模板表中的旧日志并补建检索索引，再归档并删除早于保留期的月表。
+    多个进程同时执行时用 MySQL 命名锁保证只有一个在处理。
+
+    Returns:
+        dict: 搬迁条数、补建索引的表和归档结果；未拿到锁时返回 None
+    """
+    with get_db_connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT GET_LOCK(%s, 0) AS locked", (RETENTION_LOCK_NAME,))
+            if not cursor.fetchone().get('locked'):
+                return None
+        try:
+            migrated = migrate_legacy_logs(conn)
+            cutoff = log_table_name(add_months(month_start(datetime.now()), -retention_months))
+            with conn.cursor() as cursor:
+                indexed = migrate_search_indexes(cursor)
+                expired = [table for table in list_log_tables(cursor, refresh=True) if table < cutoff]
+            archived = [archive_log_table(conn, table, archive_dir) for table in expired]
+            return {'migrated': migrated, 'indexed': indexed, 'archived': archived}
+        finally:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT RELEASE_LOCK(%s)", (RETENTION_LOCK_NAME,))
+
+
+class LogRetentionScheduler:
+    """后台定时执行日志保留策略"""
+
+    def __init__(self, retention_months, archive_dir, interval):
+        self.retention_months = retention_months
+        self.archive_dir = archive_dir
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='operation-log-retention', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                apply_retention(self.retention_months, self.archive_dir)
+            except Exception as e:
+                logger.error(f"执行操作日志保留策略失败: {e}")
+            self._stopped.wait(self.interval)
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_retention_scheduler():
+    """获取全局保留策略调度器（首次使用时启动）"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                from config.config import LOG_RETENTION_MONTHS, LOG_ARCHIVE_DIR, LOG_RETENTION_CHECK_INTERVAL
+                _scheduler = LogRetentionScheduler(LOG_RETENTION_MONTHS, LOG_ARCHIVE_DIR,
+                                                   LOG_RETENTION_CHECK_INTERVAL)
+    return _scheduler
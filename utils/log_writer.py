@@ -0,0 +1,129 @@
+"""
+操作日志异步批量写入
+请求线程只把日志放入内存中的有界队列，由后台线程每隔固定时间或攒够一批后用多行INSERT写入数据库。
+队列满时短暂等待（背压），仍然写不进去则丢弃并计数；进程退出时写完队列中剩余的日志。
+"""
+import atexit
+import queue
+import threading
+import time
+
+from utils.db_utils import get_db_connection, logger
+from utils.cache_utils import invalidate_table_counts
+from utils.log_tables import insert_log_rows
+
+
+class AsyncLogWriter:
+    """操作日志异步写入器"""
+
+    def __init__(self, queue_size=10000, batch_size=200, flush_interval_ms=500, enqueue_timeout_ms=5):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.enqueue_timeout = enqueue_timeout_ms / 1000
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopped = threading.Event()
+        self._lock = threading.Lock()
+        self._stats = {'enqueued': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+        self._thread = threading.Thread(target=self._run, name='operation-log-writer', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def submit(self, row):
+        """
+        请求线程调用：放入队列，队列满时最多等待 enqueue_timeout，仍满则丢弃
+
+        Args:
+            row: 与 INSERT_LOG_SQL 占位符顺序一致的参数元组（createTime 在入队时确定）
+
+        Returns:
+            bool: 是否成功入队
+        """
+        if self._stopped.is_set():
+            return False
+        try:
+            self._queue.put(row, timeout=self.enqueue_timeout)
+        except queue.Full:
+            with self._lock:
+                self._stats['dropped'] += 1
+            return False
+        with self._lock:
+            self._stats['enqueued'] += 1
+        return True
+
+    def get_stats(self):
+        """获取写入统计"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self._queue.qsize()
+        return stats
+
+    def stop(self, timeout=5):
+        """停止后台线程，并写入队列中剩余的日志"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        """后台线程：攒够 batch_size 条或距上次写入超过 flush_interval 时写入一批"""
+        batch = []
+        deadline = time.monotonic() + self.flush_interval
+        while not self._stopped.is_set():
+            try:
+                batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+            except queue.Empty:
+                pass
+
+            if len(batch) >= self.batch_size or (batch and time.monotonic() >= deadline):
+                self._flush(batch)
+                batch = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+        # 退出前写完剩余日志
+        while True:
+            try:
+                batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """按月表分组，每组用一条多行INSERT写入（PyMySQL 的 executemany 会合并为多行VALUES）"""
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    tables = insert_log_rows(cursor, batch)
+                    conn.commit()
+            for table in tables:
+                invalidate_table_counts(table)
+            with self._lock:
+                self._stats['written'] += len(batch)
+                self._stats['batches'] += 1
+        except Exception as e:
+            # 日志写入失败不影响主流程
+            logger.error(f"批量写入操作日志失败({len(batch)}条): {e}")
+            with self._lock:
+                self._stats['failed'] += len(batch)
+
+
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def get_log_writer():
+    """获取全局日志写入器（首次使用时创建，避免在 Flask 重载器的父进程中启动线程）"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                from config.config import LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL_MS, LOG_ENQUEUE_TIMEOUT_MS
+                _writer = AsyncLogWriter(LOG_QUEUE_SIZE, LOG_BATCH_SIZE, LOG_FLUSH_INTERVAL_MS,
+                                         LOG_ENQUEUE_TIMEOUT_MS)
+    return _writer
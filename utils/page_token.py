@@ -0,0 +1,53 @@
+"""
+游标分页令牌
+令牌是对 {上一页最后一条记录的id, 页码, 总数, 筛选条件指纹} 的 base64 编码，并附带 HMAC 签名，
+客户端只能原样传回，不能修改其中的内容。
+"""
+import base64
+import hashlib
+import hmac
+import json
+
+from config.config import SECRET_KEY
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+
+def _sign(body):
+    return hmac.new(SECRET_KEY.encode('utf-8'), body, hashlib.sha256).digest()[:12]
+
+
+def filter_fingerprint(filters):
+    """筛选条件指纹，用于校验令牌是否属于当前的筛选条件"""
+    normalized = json.dumps(filters or {}, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+
+def encode_page_token(payload):
+    """生成分页令牌"""
+    body = json.dumps(payload, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    return f"{_b64encode(body)}.{_b64encode(_sign(body))}"
+
+
+def decode_page_token(token):
+    """
+    解析分页令牌
+
+    Raises:
+        ValueError: 令牌格式错误或签名不匹配
+    """
+    try:
+        body_text, signature_text = token.split('.', 1)
+        body = _b64decode(body_text)
+        signature = _b64decode(signature_text)
+    except Exception:
+        raise ValueError("分页令牌格式错误")
+    if not hmac.compare_digest(signature, _sign(body)):
+        raise ValueError("分页令牌无效")
+    return json.loads(body)
@@ -14,9 +14,9 @@ def error(message="Error", code=400):
         "data": None
     }
 
-def page_response(rows, total, page, limit):
-    """分页响应 - 分页接口"""
-    return {
+def page_response(rows, total, page, limit, estimated=False):
+    """分页响应 - 分页接口（estimated 为 True 时 total 是估算值，data 中附带 totalEstimated）"""
+    result = {
         "code": 200,
         "message": "OK",
         "data": {
@@ -26,6 +26,9 @@ def page_response(rows, total, page, limit):
             "rows": rows
         }
     }
+    if estimated:
+        result["data"]["totalEstimated"] = True
+    return result
 
 def convert_pagination_params(request_args):
     """转换分页参数：将前端的pageNum/pageSize转换为后端的page/limit"""
@@ -0,0 +1,248 @@
+"""
+服务端会话存储
+Cookie 中只保存签名后的会话ID，会话数据保存在服务端（内存或本地 SQLite 文件），
+同时保存每个用户的版本号：修改或删除用户时版本号加1，
+auth_utils 据此判断进程内缓存的用户记录是否过期，不需要每个请求都查询数据库。
+    - memory: 进程内字典，适合单进程运行；
+    - sqlite: 本地 SQLite 文件，同一台机器上的多个工作进程共享会话和用户版本号。
+"""
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+from utils.db_utils import logger
+
+# 会话有效期内，距上次写入超过这么多秒才延长过期时间（避免每个请求都写存储）
+SESSION_REFRESH_INTERVAL = 60
+# 清理过期会话的间隔（秒）
+SESSION_CLEANUP_INTERVAL = 600
+
+
+class MemorySessionStore:
+    """进程内会话存储"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}  # 会话ID -> (过期时间, 数据)
+        self._user_versions = {}
+        self._last_cleanup = time.time()
+
+    def load(self, sid):
+        """返回 (数据, 过期时间)，不存在或已过期时返回 (None, None)"""
+        with self._lock:
+            entry = self._sessions.get(sid)
+        if entry is None or entry[0] < time.time():
+            return None, None
+        return dict(entry[1]), entry[0]
+
+    def save(self, sid, data, expires):
+        now = time.time()
+        with self._lock:
+            self._sessions[sid] = (expires, dict(data))
+            if now - self._last_cleanup >= SESSION_CLEANUP_INTERVAL:
+                self._sessions = {k: v for k, v in self._sessions.items() if v[0] >= now}
+                self._last_cleanup = now
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def user_version(self, user_id):
+        with self._lock:
+            return self._user_versions.get(user_id, 0)
+
+    def bump_user_version(self, user_id):
+        with self._lock:
+            self._user_versions[user_id] = self._user_versions.get(user_id, 0) + 1
+            return self._user_versions[user_id]
+
+
+class SQLiteSessionStore:
+    """本地 SQLite 文件会话存储（每个线程一个连接）"""
+
+    def __init__(self, path):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self._local = threading.local()
+        self._last_cleanup = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires REAL NOT NULL
+            )
+        """)
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires)")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS user_versions (
+                user_id INTEGER PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        """)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            self._local.conn = conn
+        return conn
+
+    def load(self, sid):
+        row = self._conn().execute(
+            "SELECT data, expires FROM sessions WHERE sid = ?", (sid,)
+        ).fetchone()
+        if row is None or row[1] < time.time():
+            return None, None
+        return json.loads(row[0]), row[1]
+
+    def save(self, sid, data, expires):
+        conn = self._conn()
+        conn.execute(
+            "INSERT OR REPLACE INTO sessions (sid, data, expires) VALUES (?, ?, ?)",
+            (sid, json.dumps(data, ensure_ascii=False, default=str), expires)
+        )
+        now = time.time()
+        if now - self._last_cleanup >= SESSION_CLEANUP_INTERVAL:
+            self._last_cleanup = now
+            conn.execute("DELETE FROM sessions WHERE expires < ?", (now,))
+        conn.commit()
+
+    def delete(self, sid):
+        conn = self._conn()
+        conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+        conn.commit()
+
+    def user_version(self, user_id):
+        row = self._conn().execute(
+            "SELECT version FROM user_versions WHERE user_id = ?", (user_id,)
+        ).fetchone()
+        return row[0] if row else 0
+
+    def bump_user_version(self, user_id):
+        conn = self._conn()
+        conn.execute("""
+            INSERT INTO user_versions (user_id, version) VALUES (?, 1)
+            ON CONFLICT(user_id) DO UPDATE SET version = version + 1
+        """, (user_id,))
+        conn.commit()
+        return self.user_version(user_id)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """服务端会话：与 Flask 默认会话用法相同，修改后由会话接口写回存储"""
+
+    def __init__(self, initial=None, sid=None, expires=None, new=False):
+        def on_update(this):
+            this.modified = True
+
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.expires = expires
+        self.new = new
+        self.modified = False
+        self.old_sid = None
+
+    def regenerate(self):
+        """更换会话ID（登录时调用，防止会话固定攻击），旧会话在保存时删除"""
+        if self.old_sid is None and not self.new:
+            self.old_sid = self.sid
+        self.sid = secrets.token_urlsafe(32)
+        self.modified = True
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """把会话数据保存在服务端存储中的会话接口"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='server-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(app.config['SESSION_COOKIE_NAME'])
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                try:
+                    data, expires = self.store.load(sid)
+                except Exception as e:
+                    logger.error(f"读取会话失败: {e}")
+                    data, expires = None, None
+                if data is not None:
+                    return ServerSession(data, sid=sid, expires=expires)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = app.config['SESSION_COOKIE_NAME']
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if session.old_sid:
+            self.store.delete(session.old_sid)
+            session.old_sid = None
+
+        if not session:
+            if session.modified and not session.new:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        lifetime = app.permanent_session_lifetime.total_seconds()
+        now = time.time()
+        refresh = (session.permanent and self.should_set_cookie(app, session)
+                   and session.expires is not None
+                   and now + lifetime - session.expires >= SESSION_REFRESH_INTERVAL)
+        if not (session.modified or refresh):
+            return
+
+        session.expires = now + lifetime
+        self.store.save(session.sid, dict(session), session.expires)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid.encode()).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app)
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_session_store():
+    """获取全局会话存储（首次使用时按 SESSION_STORE 配置创建）"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                from config.config import SESSION_STORE, SESSION_SQLITE_PATH
+                if SESSION_STORE == 'sqlite':
+                    _store = SQLiteSessionStore(SESSION_SQLITE_PATH)
+                else:
+                    _store = MemorySessionStore()
+    return _store
+
+
+def init_session(app):
+    """让应用使用服务端会话"""
+    app.session_interface = ServerSideSessionInterface(get_session_store())
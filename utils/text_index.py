@@ -0,0 +1,169 @@
+"""
+内存倒排索引（关键词检索）
+文本先去掉HTML标签并转为小写，中文按单字和相邻两字（bigram）切分，英文和数字按整词切分。
+查询时整个关键词作为一个短语（与 LIKE '%关键词%' 的语义一致）：中文取 bigram（单字查询取单字），
+英文词按前缀匹配词表（短语开头的英文词可能从词中间开始，按包含匹配词表），各词的文档集合取交集后，
+再用文档原文确认短语确实出现，最后按词频 * IDF 打分排序（标题中的命中权重更高）。
+关键词中没有可索引的字符（如只有俄文、日文假名、全角字母或标点）时无法用索引检索，由调用方退回 LIKE。
+"""
+import bisect
+import html
+import math
+import re
+import threading
+
+TAG_RE = re.compile(r'<[^>]+>')
+TOKEN_RE = re.compile(r'[㐀-䶿一-鿿]+|[a-z0-9]+')
+TITLE_WEIGHT = 3
+
+
+def normalize_text(text, lower=True):
+    """去掉HTML标签、还原实体并（默认）转为小写"""
+    if not text:
+        return ''
+    text = html.unescape(TAG_RE.sub(' ', text))
+    return text.lower() if lower else text
+
+
+def _is_cjk(run):
+    return run[0] >= '㐀'
+
+
+def tokenize(text):
+    """建索引用的切分：中文单字 + bigram，英文/数字整词"""
+    tokens = []
+    for run in TOKEN_RE.findall(text):
+        if _is_cjk(run):
+            tokens.extend(run)
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+        else:
+            tokens.append(run)
+    return tokens
+
+
+def query_tokens(text):
+    """查询用的切分：中文取 bigram（只有一个字时取单字），英文/数字整词（按前缀匹配）"""
+    tokens = []
+    for run in TOKEN_RE.findall(text):
+        if _is_cjk(run):
+            tokens.extend([run] if len(run) == 1 else [run[i:i + 2] for i in range(len(run) - 1)])
+        else:
+            tokens.append(run)
+    return tokens
+
+
+class InvertedIndex:
+    """倒排索引（线程安全，支持增量增删文档）"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.postings = {}  # 词 -> {文档id: 权重}
+        self.documents = {}  # 文档id -> {'text': 归一化文本, 'tokens': 词集合, 'meta': 附加信息}
+        self._vocabulary = None  # 排好序的英文/数字词表（前缀匹配用），文档变化后重建
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add(self, doc_id, title, content, meta=None):
+        """添加或替换一个文档"""
+        title_text = normalize_text(title)
+        content_text = normalize_text(content)
+        weights = {}
+        for token in tokenize(title_text):
+            weights[token] = weights.get(token, 0) + TITLE_WEIGHT
+        for token in tokenize(content_text):
+            weights[token] = weights.get(token, 0) + 1
+
+        with self._lock:
+            self._remove(doc_id)
+            for token, weight in weights.items():
+                self.postings.setdefault(token, {})[doc_id] = weight
+            self.documents[doc_id] = {
+                'text': f"{title_text}\n{content_text}",
+                'tokens': set(weights),
+                'meta': meta or {}
+            }
+            self._vocabulary = None
+
+    def remove(self, doc_id):
+        with self._lock:
+            self._remove(doc_id)
+            self._vocabulary = None
+
+    def _remove(self, doc_id):
+        document = self.documents.pop(doc_id, None)
+        if document is None:
+            return
+        for token in document['tokens']:
+            postings = self.postings.get(token)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[token]
+
+    def _word_postings(self, word, contains=False):
+        """以 word 开头（contains 为 True 时为包含 word）的所有英文/数字词的文档权重（合并）"""
+        if self._vocabulary is None:
+            self._vocabulary = sorted(token for token in self.postings if not _is_cjk(token))
+        if contains:
+            matched = [token for token in self._vocabulary if word in token]
+        else:
+            start = bisect.bisect_left(self._vocabulary, word)
+            end = bisect.bisect_left(self._vocabulary, word + '\uffff', start)
+            matched = self._vocabulary[start:end]
+        merged = {}
+        for token in matched:
+            for doc_id, weight in self.postings[token].items():
+                merged[doc_id] = merged.get(doc_id, 0) + weight
+        return merged
+
+    def search(self, query, accept=None, pinned=None):
+        """
+        检索关键词（整个关键词作为一个短语，与 LIKE '%关键词%' 的匹配结果一致）
+
+        Args:
+            query: 关键词
+            accept: 按文档附加信息过滤的函数 meta -> bool
+            pinned: 按文档附加信息判断是否置顶的函数 meta -> bool，置顶文档排在前面
+
+        Returns:
+            list: 按（是否置顶、得分）从高到低排序的文档id；关键词中没有可索引的字符时返回 None
+        """
+        phrase = normalize_text(query).strip()
+        tokens = query_tokens(phrase)
+        if not tokens:
+            return None
+        # 短语开头的英文词在原文中可能从词中间开始（如 appiness），要按包含匹配
+        leading = None if _is_cjk(tokens[0]) or not phrase.startswith(tokens[0]) else tokens[0]
+
+        with self._lock:
+            groups = []
+            for token in dict.fromkeys(tokens):
+                if _is_cjk(token):
+                    postings = self.postings.get(token, {})
+                else:
+                    postings = self._word_postings(token, contains=token == leading)
+                if not postings:
+                    return []
+                groups.append(postings)
+
+            groups.sort(key=len)
+            candidates = set(groups[0])
+            for postings in groups[1:]:
+                candidates.intersection_update(postings)
+
+            total = len(self.documents)
+            scored = []
+            for doc_id in candidates:
+                document = self.documents[doc_id]
+                # 各词都命中不代表短语连续出现，用原文确认
+                if phrase not in document['text']:
+                    continue
+                if accept is not None and not accept(document['meta']):
+                    continue
+                score = sum(postings[doc_id] * math.log(1 + total / len(postings)) for postings in groups)
+                top = bool(pinned(document['meta'])) if pinned is not None else False
+                scored.append((top, score, doc_id))
+
+        scored.sort(key=lambda item: (not item[0], -item[1], -item[2]))
+        return [doc_id for _, _, doc_id in scored]
@@ -0,0 +1,87 @@
+"""
+公告浏览次数缓冲计数
+读取详情时只在内存中累加浏览次数，后台线程每隔 VIEW_COUNT_FLUSH_INTERVAL 秒
+用一次批量 UPDATE 把累计的增量写回数据库，避免热门公告每次阅读都抢同一行的行锁。
+多个工作进程各自缓冲、各自写入增量（viewCount = viewCount + n），结果仍然正确。
+"""
+import atexit
+import threading
+from collections import Counter
+
+from utils.db_utils import get_db_connection, logger
+
+UPDATE_VIEW_COUNT_SQL = "UPDATE py_announcements SET viewCount = viewCount + %s WHERE id = %s"
+
+
+class BufferedViewCounter:
+    """浏览次数缓冲计数器"""
+
+    def __init__(self, flush_interval=5):
+        self.flush_interval = flush_interval
+        self._lock = threading.Lock()
+        self._pending = Counter()
+        self._inflight = Counter()  # 正在写入数据库的增量，写入完成前仍计入返回值
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='announcement-view-counter', daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def increment(self, announcement_id, amount=1):
+        """累加浏览次数，返回该公告尚未写入数据库的增量"""
+        with self._lock:
+            self._pending[announcement_id] += amount
+            return self._pending[announcement_id] + self._inflight.get(announcement_id, 0)
+
+    def pending(self, announcement_id):
+        """尚未写入数据库的增量"""
+        with self._lock:
+            return self._pending.get(announcement_id, 0) + self._inflight.get(announcement_id, 0)
+
+    def stop(self, timeout=5):
+        """停止后台线程，并写入剩余的增量"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join(timeout=timeout)
+
+    def _run(self):
+        while not self._stopped.wait(self.flush_interval):
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """把累计的增量批量写入数据库；失败时放回，下次再写"""
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._inflight = pending
+        if not pending:
+            return
+
+        params = [(amount, announcement_id) for announcement_id, amount in pending.items()]
+        try:
+            with get_db_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.executemany(UPDATE_VIEW_COUNT_SQL, params)
+                    conn.commit()
+            with self._lock:
+                self._inflight = Counter()
+        except Exception as e:
+            logger.error(f"写入公告浏览次数失败({len(params)}条): {e}")
+            with self._lock:
+                self._inflight = Counter()
+                self._pending.update(pending)
+
+
+_counter = None
+_counter_lock = threading.Lock()
+
+
+def get_view_counter():
+    """获取全局浏览次数计数器（首次使用时创建）"""
+    global _counter
+    if _counter is None:
+        with _counter_lock:
+            if _counter is None:
+                from config.config import VIEW_COUNT_FLUSH_INTERVAL
+                _counter = BufferedViewCounter(VIEW_COUNT_FLUSH_INTERVAL)
+    return _counter